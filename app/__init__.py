@@ -1,18 +1,19 @@
-import os
 from dash import Dash
 import dash_bootstrap_components as dbc
 
-os.makedirs("app/cache_dir", exist_ok=True)
-
-import fastf1
-fastf1.Cache.enable_cache("app/cache_dir")
-
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
 app.title = "F1 Telemetry Comparison"
 server = app.server  # ← add this line
 
 from .layout import layout
 from .callbacks import register_callbacks
+from .jobs import background_manager
+from .metrics import register_metrics
+from .export import register_export
+from .startup import start_warmup
 
 app.layout = layout
-register_callbacks(app)
\ No newline at end of file
+register_callbacks(app, background_manager())
+register_metrics(server)
+register_export(server)
+start_warmup()
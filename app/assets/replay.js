@@ -0,0 +1,64 @@
+// Race replay playback. The interval only advances the slider here; each
+// slider position is turned into a frame (one position per car) by the
+// server, and drawn on top of the static base figure.
+
+(function () {
+    function clock(seconds) {
+        var s = Math.max(0, Math.floor(seconds));
+        var h = Math.floor(s / 3600), m = Math.floor(s / 60) % 60;
+        return h + ':' + String(m).padStart(2, '0') + ':' + String(s % 60).padStart(2, '0');
+    }
+
+    function step(nIntervals, nClicks, disabled, value, min, max, speed, interval) {
+        var triggered = dash_clientside.callback_context.triggered.map(function (t) {
+            return t.prop_id;
+        });
+        var noUpdate = dash_clientside.no_update;
+        if (triggered.indexOf('replay-play.n_clicks') !== -1) {
+            if (!disabled) {
+                return [noUpdate, true, '▶ Play'];
+            }
+            // Playing from the end starts over.
+            return [value >= max ? min : noUpdate, false, '⏸ Pause'];
+        }
+        if (disabled) {
+            return [noUpdate, noUpdate, noUpdate];
+        }
+        var next = Math.min(value + speed * interval / 1000, max);
+        if (next >= max) {
+            return [max, true, '▶ Play'];
+        }
+        return [next, noUpdate, noUpdate];
+    }
+
+    function render(frame, base) {
+        if (!base || !base.figure) {
+            return {};
+        }
+        var layout = Object.assign({}, base.figure.layout, {uirevision: 'replay'});
+        if (!frame || !frame.drivers) {
+            return {data: base.figure.data, layout: layout};
+        }
+        var lap = Math.max.apply(null, frame.lap.concat([0]));
+        layout.title = {text: 'Race Replay - ' + clock(frame.t) + (lap ? ' (lap ' + lap + ')' : '')};
+        var cars = {
+            type: 'scatter',
+            mode: 'markers+text',
+            x: frame.x,
+            y: frame.y,
+            text: frame.drivers,
+            textposition: 'top center',
+            marker: {size: 12, color: base.colors, line: {width: 1, color: 'white'}},
+            hovertext: frame.drivers.map(function (d, i) {
+                return d + ' - lap ' + frame.lap[i];
+            }),
+            hoverinfo: 'text',
+            showlegend: false
+        };
+        return {data: base.figure.data.concat([cars]), layout: layout};
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        replay: {step: step, render: render}
+    });
+})();
@@ -0,0 +1,75 @@
+// Clientside rendering of the telemetry plot and track map. The server ships
+// every channel of the selected laps once (telemetry-data / track-map-data
+// stores, as plotly.js typed-array specs); switching the telemetry-type
+// dropdown only rebuilds the figure here, without a server round trip.
+
+(function () {
+    // Fresh spec objects per figure: plotly.js may decode specs in place,
+    // and the store data is reused on every channel switch.
+    function spec(s) {
+        return s ? {dtype: s.dtype, bdata: s.bdata} : [];
+    }
+
+    function plot(data, channel) {
+        if (!data || !data.traces || !data.traces.length) {
+            return {};
+        }
+        var traces = data.traces.map(function (t) {
+            return {
+                type: 'scattergl',
+                mode: 'lines',
+                name: t.name,
+                x: spec(t.x),
+                y: spec(t.y[channel]),
+                line: {color: t.color, dash: t.dash}
+            };
+        });
+        var layout = {
+            template: data.template,
+            title: {text: channel + ' vs Distance'},
+            xaxis: {title: {text: 'Distance'}},
+            yaxis: {title: {text: channel}},
+            legend: {title: {text: data.legend_title}},
+            uirevision: data.uirevision
+        };
+        if (data.x_range) {
+            layout.xaxis.range = data.x_range.slice();
+        }
+        return {data: traces, layout: layout};
+    }
+
+    function trackMap(data, channel) {
+        if (!data || !data.figure) {
+            return {};
+        }
+        // Driver lines on top of the base figure (outline, turn labels),
+        // with markers colored by, and hover showing, the selected channel.
+        var traces = data.traces.map(function (t, i) {
+            return {
+                type: 'scatter',
+                mode: 'lines+markers',
+                name: t.name,
+                x: spec(t.x),
+                y: spec(t.y),
+                line: {width: 3},
+                marker: {
+                    size: 4,
+                    color: spec(t.channels[channel]),
+                    colorscale: 'Viridis',
+                    showscale: i === 0,
+                    colorbar: {title: {text: channel}}
+                },
+                customdata: spec(t.channels[channel]),
+                hovertemplate: channel + ': %{customdata:.2f}<extra>' + t.name + '</extra>'
+            };
+        });
+        return {
+            data: data.figure.data.concat(traces),
+            layout: data.figure.layout
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        telemetry: {plot: plot, trackMap: trackMap}
+    });
+})();
@@ -0,0 +1,374 @@
+"""Size-capped management of the FastF1 disk cache.
+
+Every FastF1 session directory (``<cache>/<year>/<event>/<session>/``) is
+one cache entry, together with the derived store of the same session
+(snapshot, digest, telemetry shards). Entries are evicted least recently
+used first once the cache exceeds its budget; pinned events never are.
+FastF1's HTTP response cache counts against the budget too, and its
+expired responses are purged on every enforcement.
+Optionally, entries idle for a number of days have their pickles gzip'd and
+are inflated again on the next visit.
+
+    python -m app.cache_manager report
+    python -m app.cache_manager enforce
+    python -m app.cache_manager pin 2024 17
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import fastf1
+
+from .locks import LockTimeout, file_lock
+from .telemetry_store import telemetry_store
+
+BUDGET_MB = int(os.environ.get("F1_CACHE_BUDGET_MB", "5120"))
+# Days an entry must be idle before its pickles are compressed; 0 disables.
+COMPRESS_AFTER_DAYS = float(os.environ.get("F1_CACHE_COMPRESS_DAYS", "0"))
+# Pinned events as "year:round" pairs, in addition to those in PINS_FILE.
+PINNED = os.environ.get("F1_CACHE_PINNED", "")
+
+MARKER = ".f1dash.json"
+PINS_FILE = "pinned.json"
+# FastF1's requests-cache database of raw HTTP responses, <name>.sqlite.
+HTTP_CACHE = "fastf1_http_cache"
+TOUCH_INTERVAL = 60.0      # seconds between last-access updates of one entry
+ENFORCE_INTERVAL = 300.0   # seconds between automatic budget checks
+MIN_IDLE = 600.0           # never evict entries used in the last 10 minutes
+
+logger = logging.getLogger(__name__)
+
+_touched = {}
+_last_enforced = 0.0
+_lock = threading.Lock()
+
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+@dataclass
+class CacheEntry:
+    path: str
+    key: tuple            # (year, round, session type), None if never opened by the app
+    raw_bytes: int
+    derived_bytes: int
+    last_access: float
+    compressed: bool
+    pinned: bool
+
+    @property
+    def bytes(self):
+        return self.raw_bytes + self.derived_bytes
+
+
+def cache_root():
+    return fastf1.Cache._CACHE_DIR or os.path.join("app", "cache_dir")
+
+
+def _entry_dir(api_path):
+    return os.path.join(cache_root(), api_path[8:])
+
+
+def dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _read_marker(path):
+    try:
+        with open(os.path.join(path, MARKER)) as f:
+            return tuple(json.load(f)["key"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _swap(src, dst, opener_src, opener_dst):
+    # Rewrites one pickle (de)compressed, keeping its mtime so the session
+    # fingerprints of the derived stores stay valid.
+    st = os.stat(src)
+    tmp = f"{dst}.tmp-{os.getpid()}"
+    with opener_src(src, 'rb') as fin, opener_dst(tmp, 'wb') as fout:
+        shutil.copyfileobj(fin, fout)
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp, dst)
+    os.remove(src)
+
+
+def compress_entry(path):
+    with file_lock(os.path.join(path, ".lock")):
+        for name in os.listdir(path):
+            if name.endswith('.ff1pkl'):
+                _swap(os.path.join(path, name), os.path.join(path, name + '.gz'), open, gzip.open)
+
+
+def decompress_entry(path):
+    with file_lock(os.path.join(path, ".lock")):
+        for name in os.listdir(path):
+            if name.endswith('.ff1pkl.gz'):
+                _swap(os.path.join(path, name), os.path.join(path, name[:-3]), gzip.open, open)
+
+
+def open_entry(api_path, key=None):
+    # Called before FastF1 reads a session from its cache: inflates a
+    # compressed entry and records the access.
+    path = _entry_dir(api_path)
+    if not os.path.isdir(path):
+        return
+    if any(name.endswith('.ff1pkl.gz') for name in os.listdir(path)):
+        decompress_entry(path)
+    touch(api_path, key)
+
+
+def touch(api_path, key=None):
+    # Records an access as the mtime of the entry's marker file; the marker
+    # also maps the entry to its session key, i.e. to its derived store.
+    path = _entry_dir(api_path)
+    now = time.time()
+    with _lock:
+        if now - _touched.get(path, 0.0) < TOUCH_INTERVAL:
+            return
+        _touched[path] = now
+    marker = os.path.join(path, MARKER)
+    try:
+        if not os.path.exists(marker):
+            if key is None or not os.path.isdir(path):
+                return
+            with open(marker, 'w') as f:
+                json.dump({'key': list(key)}, f)
+        os.utime(marker)
+    except OSError as e:
+        logger.debug("Could not record access to %s: %s", path, e)
+
+
+def _file_pins():
+    try:
+        with open(os.path.join(cache_root(), PINS_FILE)) as f:
+            return {(int(y), int(r)) for y, r in json.load(f)}
+    except (OSError, ValueError):
+        return set()
+
+
+def _save_pins(pins):
+    path = os.path.join(cache_root(), PINS_FILE)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(sorted(pins), f)
+    os.replace(tmp, path)
+
+
+def pinned_events():
+    pins = _file_pins()
+    for item in filter(None, (p.strip() for p in PINNED.split(","))):
+        year, _, rnd = item.partition(":")
+        pins.add((int(year), int(rnd)))
+    return pins
+
+
+def pin(year, rnd):
+    _save_pins(_file_pins() | {(int(year), int(rnd))})
+
+
+def unpin(year, rnd):
+    _save_pins(_file_pins() - {(int(year), int(rnd))})
+
+
+def scan():
+    # FastF1 entries are the directories that hold its pickles, three levels
+    # below the cache root: <year>/<event>/<session>.
+    root = cache_root()
+    pins = pinned_events()
+    entries = []
+    for year in sorted(os.listdir(root)) if os.path.isdir(root) else ():
+        if not year.isdigit():
+            continue
+        for event in sorted(os.listdir(os.path.join(root, year))):
+            event_dir = os.path.join(root, year, event)
+            if not os.path.isdir(event_dir):
+                continue
+            for session in sorted(os.listdir(event_dir)):
+                path = os.path.join(event_dir, session)
+                if not os.path.isdir(path):
+                    continue
+                names = os.listdir(path)
+                if not any(n.endswith(('.ff1pkl', '.ff1pkl.gz')) for n in names):
+                    continue
+                key = _read_marker(path)
+                # Entries the app never opened fall back to their newest file.
+                stamped = [MARKER] if MARKER in names else names
+                last_access = max(os.path.getmtime(os.path.join(path, n)) for n in stamped)
+                derived = telemetry_store.session_dir(key) if key else None
+                entries.append(CacheEntry(
+                    path=path,
+                    key=key,
+                    raw_bytes=dir_bytes(path),
+                    derived_bytes=dir_bytes(derived) if derived else 0,
+                    last_access=last_access,
+                    compressed=any(n.endswith('.ff1pkl.gz') for n in names),
+                    pinned=bool(key) and (key[0], key[1]) in pins,
+                ))
+    return entries
+
+
+def _http_cache_path():
+    return os.path.join(cache_root(), f"{HTTP_CACHE}.sqlite")
+
+
+def http_cache_bytes():
+    # The database plus its journal files, if any.
+    total = 0
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            total += os.path.getsize(_http_cache_path() + suffix)
+        except OSError:
+            pass
+    return total
+
+
+def purge_http_cache():
+    # FastF1 keeps every raw response, the multi-MB car and position
+    # streams included, and never drops expired ones (it falls back to them
+    # when a request fails). The parsed pickles hold the same data, so
+    # expired responses are deleted and the database vacuumed. Returns the
+    # bytes freed.
+    if not os.path.exists(_http_cache_path()):
+        return 0
+    from requests_cache.backends.sqlite import SQLiteCache
+
+    before = http_cache_bytes()
+    cache = SQLiteCache(os.path.join(cache_root(), HTTP_CACHE))
+    try:
+        cache.delete(expired=True)
+    finally:
+        cache.close()
+    return max(before - http_cache_bytes(), 0)
+
+
+def evict_entry(entry):
+    shutil.rmtree(entry.path, ignore_errors=True)
+    if entry.key:
+        shutil.rmtree(telemetry_store.session_dir(entry.key), ignore_errors=True)
+    with _lock:
+        _touched.pop(entry.path, None)
+
+
+def enforce(budget_bytes=BUDGET_MB * 2**20, compress_after_days=COMPRESS_AFTER_DAYS, now=None):
+    # Compresses idle entries and purges expired HTTP responses, then
+    # evicts least recently used entries until the cache (HTTP cache
+    # included) fits the budget. Returns (compressed, evicted) entries.
+    now = time.time() if now is None else now
+    entries = scan()
+    compressed = []
+    if compress_after_days:
+        for entry in entries:
+            if not entry.compressed and now - entry.last_access > compress_after_days * 86400:
+                compress_entry(entry.path)
+                entry.raw_bytes = dir_bytes(entry.path)
+                entry.compressed = True
+                compressed.append(entry)
+
+    try:
+        freed = purge_http_cache()
+        if freed:
+            logger.info("Purged %.1f MB of expired responses from the HTTP cache", freed / 2**20)
+    except Exception as e:
+        logger.warning("Could not purge the HTTP cache: %s", e)
+
+    evicted = []
+    used = sum(e.bytes for e in entries) + http_cache_bytes()
+    for entry in sorted(entries, key=lambda e: e.last_access):
+        if used <= budget_bytes:
+            break
+        if entry.pinned or now - entry.last_access < MIN_IDLE:
+            continue
+        evict_entry(entry)
+        used -= entry.bytes
+        evicted.append(entry)
+        logger.info("Evicted cache entry %s (%.1f MB)", entry.path, entry.bytes / 2**20)
+    return compressed, evicted
+
+
+def maybe_enforce():
+    # Budget check after loads, at most every ENFORCE_INTERVAL per process
+    # and by one process at a time; runs off the request thread.
+    global _last_enforced
+    with _lock:
+        if time.monotonic() - _last_enforced < ENFORCE_INTERVAL:
+            return
+        _last_enforced = time.monotonic()
+
+    def run():
+        try:
+            with file_lock(os.path.join(cache_root(), ".cache_manager.lock"), timeout=0):
+                enforce()
+        except LockTimeout:
+            pass
+        except Exception as e:
+            logger.warning("Cache budget enforcement failed: %s", e)
+
+    threading.Thread(target=run, name="f1-cache-manager", daemon=True).start()
+
+
+def report(entries, budget_bytes=BUDGET_MB * 2**20, http_bytes=None):
+    lines = [f"{'entry':<60}{'session':<14}{'raw MB':>9}{'derived MB':>12}  {'last access':<17}flags"]
+    for e in sorted(entries, key=lambda e: e.last_access, reverse=True):
+        session = f"{e.key[0]}_{e.key[1]:02d}_{e.key[2]}" if e.key else "-"
+        flags = ",".join(f for f, on in (("pinned", e.pinned), ("gz", e.compressed)) if on)
+        lines.append(
+            f"{os.path.relpath(e.path, cache_root()):<60}{session:<14}{e.raw_bytes / 2**20:>9.1f}"
+            f"{e.derived_bytes / 2**20:>12.1f}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(e.last_access)):<17}"
+            f"{flags}"
+        )
+    http_bytes = http_cache_bytes() if http_bytes is None else http_bytes
+    lines.append(f"{os.path.basename(_http_cache_path()):<60}{'-':<14}{http_bytes / 2**20:>9.1f}")
+    total = sum(e.bytes for e in entries) + http_bytes
+    lines.append(f"{len(entries)} entries, {total / 2**20:.1f} MB of {budget_bytes / 2**20:.0f} MB budget")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("report", help="per-session disk usage and last access")
+    enforce_cmd = commands.add_parser("enforce", help="compress idle entries and evict down to the budget")
+    enforce_cmd.add_argument("--budget-mb", type=int, default=BUDGET_MB)
+    enforce_cmd.add_argument("--compress-after-days", type=float, default=COMPRESS_AFTER_DAYS)
+    for name in ("pin", "unpin"):
+        cmd = commands.add_parser(name, help=f"{name} an event (never evicted while pinned)")
+        cmd.add_argument("year", type=int)
+        cmd.add_argument("round", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "report":
+        print(report(scan()))
+    elif args.command == "enforce":
+        compressed, evicted = enforce(args.budget_mb * 2**20, args.compress_after_days)
+        print(f"Compressed {len(compressed)} and evicted {len(evicted)} entries "
+              f"({sum(e.bytes for e in evicted) / 2**20:.1f} MB freed)")
+        print(report(scan(), args.budget_mb * 2**20))
+    elif args.command == "pin":
+        pin(args.year, args.round)
+    else:
+        unpin(args.year, args.round)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
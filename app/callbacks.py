@@ -1,274 +1,383 @@
-from dash import Input, Output, State, MATCH
-import fastf1
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-
-
-def register_callbacks(app):
-    @app.callback(
-        [
-            Output('driver-dropdown', 'options'),
-            Output('driver-dropdown', 'value'),
-            Output('driver-dropdown', 'style'),
-            Output('driver-label', 'style'),
-            Output('telemetry-type', 'style'),
-            Output('telemetry-label', 'style'),
-            Output('session-store', 'children'),
-            Output('lap-dropdown', 'options'),
-            Output('lap-dropdown', 'value'),
-            Output('lap-dropdown', 'style'),
-            Output('lap-label', 'style'),
-            Output('lap-delta-table', 'data'),
-        ],
-        Input('load-button', 'n_clicks'),
-        State('year-input', 'value'),
-        State('round-input', 'value'),
-        State('session-type', 'value'),
+import logging
+
+from dash import ClientsideFunction, Input, Output, State, MATCH, ctx, no_update
+
+from .jobs import report_stage, reporting_progress
+from .metrics import instrument
+
+# Callback bodies live at module level so they can be driven directly, e.g.
+# by the benchmarks, without a running Dash app. The data modules (FastF1,
+# pandas, plotly) are imported in the callbacks, on first use, so that the
+# app can start serving before they are loaded; see app/startup.py.
+
+logger = logging.getLogger(__name__)
+
+
+def shared_figure(name, key, inputs, build, telemetry=False):
+    # Serves a builder's output through the figure cache shared by all users
+    # (app/figure_cache.py). ``inputs`` are the builder's arguments besides
+    # the session, as passed to it; driver and lap order stay significant
+    # since they decide trace colors and dashes. ``build`` is called with the
+    # session version, which it passes on to the builder's memo. Partial
+    # output is returned but cached nowhere.
+    from .digest import session_version, telemetry_version
+    from .figure_cache import figure_cache
+    from .figures import PartialResult
+
+    version = session_version(*key)
+    if telemetry and version is not None:
+        # The digest's fingerprint leaves the car and position data out; a
+        # re-download of those must not serve old telemetry figures.
+        version = telemetry_version(*key)
+    try:
+        return figure_cache.get_or_build(name, key, version, inputs, lambda: build(version))
+    except PartialResult as e:
+        return e.value
+
+
+@instrument("callback.load_session")
+def load_session(n_clicks, year, rnd, session_type, prefetch=False):
+    hidden_style = {'display': 'none'}
+    visible_style = {'display': 'block'}
+
+    if n_clicks == 0:
+        return [], [], hidden_style, hidden_style, hidden_style, hidden_style, "", [], [], hidden_style, hidden_style, []
+
+    from .digest import get_session_digest
+
+    try:
+        # Everything shown here comes from the session digest, so repeat
+        # visits to an event do not load the session at all.
+        digest = get_session_digest(year, rnd, session_type)
+        drivers = digest['drivers']
+
+        options = [{"label": d, "value": d} for d in drivers]
+        preselected = drivers[:2]
+
+        # Lap selection
+        lap_numbers = digest['lap_numbers']
+        lap_options = [{'label': f"Lap {lap}", 'value': lap} for lap in lap_numbers]
+        default_laps = lap_numbers[:2]
+
+        session_info = f"{year},{rnd},{session_type.upper()}"
+
+        if prefetch:
+            # Build the preselected drivers' telemetry shards up front, so
+            # the first plot after the load only has to mmap them.
+            from .extraction import ensure_shards
+            from .figures import parse_session_info
+            from .utils import get_cached_session
+
+            report_stage("telemetry")
+            session = get_cached_session(year, rnd, session_type)
+            failed = ensure_shards(parse_session_info(session_info), session, preselected)
+            for driver, message in failed.items():
+                logger.warning("Telemetry prefetch error for %s: %s", driver, message)
+
+        # Lap Delta Table
+        lap_delta_data = digest['lap_delta']
+
+        return (
+            options, preselected, visible_style, visible_style,
+            visible_style, visible_style, session_info,
+            lap_options, default_laps, visible_style, visible_style,
+            lap_delta_data
+        )
+
+    except Exception:
+        logger.exception("Error loading session")
+        return [], [], hidden_style, hidden_style, hidden_style, hidden_style, "", [], [], hidden_style, hidden_style, []
+
+
+def load_session_in_background(set_progress, n_clicks, year, rnd, session_type):
+    with reporting_progress(set_progress):
+        return load_session(n_clicks, year, rnd, session_type, prefetch=True)
+
+
+@instrument("callback.update_telemetry_data")
+def update_telemetry_data(drivers, laps, relayout_data, session_info):
+    if not drivers or not laps or not session_info:
+        return {}
+    from .downsample import relayout_x_range
+    from .figures import build_telemetry_data, parse_session_info
+
+    # Zooming re-queries the visible window at full resolution; other
+    # relayout events (autosize, drag mode, ...) leave the data alone.
+    x_range = relayout_x_range(relayout_data)
+    if x_range is None and relayout_data and not relayout_data.get('xaxis.autorange') \
+            and ctx.triggered_id == 'telemetry-plot':
+        return no_update
+    try:
+        key, drivers, laps = parse_session_info(session_info), tuple(drivers), tuple(int(lap) for lap in laps)
+        return shared_figure('telemetry', key, [drivers, laps, x_range],
+                             lambda version: build_telemetry_data(key, drivers, laps, x_range, version=version), telemetry=True)
+    except Exception:
+        logger.exception("Telemetry plot error")
+        return {}
+
+
+@instrument("callback.update_track_data")
+def update_track_data(drivers, mode, session_info):
+    if not session_info:
+        return {}
+    from .figures import build_dominance_data, build_track_data, parse_session_info
+
+    try:
+        key = parse_session_info(session_info)
+        if mode == 'dominance':
+            return shared_figure('dominance', key, [], lambda version: build_dominance_data(key, version=version), telemetry=True)
+        if not drivers:
+            return {}
+        drivers = tuple(drivers)
+        return shared_figure('track_map', key, [drivers], lambda version: build_track_data(key, drivers, version=version), telemetry=True)
+    except Exception:
+        logger.exception("Track map error")
+        return {}
+
+
+@instrument("callback.update_weather_plot")
+def update_weather_plot(session_info):
+    if not session_info:
+        return {}
+    from .figures import build_weather_figure, parse_session_info
+
+    try:
+        key = parse_session_info(session_info)
+        return shared_figure('weather', key, [], lambda version: build_weather_figure(key, version=version))
+    except Exception:
+        logger.exception("Weather plot error")
+        return {}
+
+
+@instrument("callback.update_sector_chart")
+def update_sector_chart(drivers, session_info):
+    if not drivers or not session_info:
+        return {}
+    from .figures import build_sector_chart, parse_session_info
+
+    try:
+        key, drivers = parse_session_info(session_info), tuple(drivers)
+        return shared_figure('sector_chart', key, [drivers], lambda version: build_sector_chart(key, drivers, version=version))
+    except Exception:
+        logger.exception("Sector comparison error")
+        return {}
+
+
+@instrument("callback.update_sector_table")
+def update_sector_table(drivers, session_info):
+    if not drivers or not session_info:
+        return []
+    from .figures import build_sector_table, parse_session_info
+
+    try:
+        key, drivers = parse_session_info(session_info), tuple(drivers)
+        return shared_figure('sector_table', key, [drivers], lambda version: build_sector_table(key, drivers, version=version))
+    except Exception:
+        logger.exception("Error building sector table")
+        return []
+
+
+@instrument("callback.update_replay_base")
+def update_replay_base(is_open, session_info):
+    # Built on first opening the replay card: the position index needs the
+    # position data of every driver.
+    if not is_open or not session_info:
+        return no_update, no_update, no_update, no_update
+    from .figures import build_replay_base, parse_session_info
+
+    try:
+        key = parse_session_info(session_info)
+        base = shared_figure('replay_base', key, [], lambda version: build_replay_base(key, version=version), telemetry=True)
+        return base, base['start'], base['end'], base['start']
+    except Exception:
+        logger.exception("Race replay error")
+        return {}, 0, 1, 0
+
+
+@instrument("callback.update_replay_frame")
+def update_replay_frame(t, session_info):
+    if t is None or not session_info:
+        return {}
+    from .figures import parse_session_info
+    from .race_replay import get_position_index
+
+    try:
+        return get_position_index(*parse_session_info(session_info)).frame(t)
+    except Exception:
+        logger.exception("Race replay frame error")
+        return {}
+
+
+@instrument("callback.update_season_view")
+def update_season_view(is_open, year):
+    # Reads the precomputed aggregates only; rounds are added to them by
+    # ``python -m app.season update`` (and prewarm.py).
+    if not is_open or not year:
+        return no_update, no_update, no_update, no_update
+    from .figures import build_season_figures
+    from .season import completed_rounds, load_season
+
+    try:
+        season = load_season(year)
+        done = completed_rounds(season)
+        if not done:
+            return {}, {}, {}, f"No season aggregates for {year} yet: run python -m app.season update {year}"
+        gap_fig, pace_fig, weather_fig = build_season_figures(int(year), season['updated'])
+        return gap_fig, pace_fig, weather_fig, f"{len(done)} rounds aggregated"
+    except Exception:
+        logger.exception("Season view error")
+        return {}, {}, {}, ""
+
+
+def toggle_collapse(n, is_open):
+    return not is_open
+
+
+LOAD_OUTPUTS = [
+    Output('driver-dropdown', 'options'),
+    Output('driver-dropdown', 'value'),
+    Output('driver-dropdown', 'style'),
+    Output('driver-label', 'style'),
+    Output('telemetry-type', 'style'),
+    Output('telemetry-label', 'style'),
+    Output('session-store', 'children'),
+    Output('lap-dropdown', 'options'),
+    Output('lap-dropdown', 'value'),
+    Output('lap-dropdown', 'style'),
+    Output('lap-label', 'style'),
+    Output('lap-delta-table', 'data'),
+]
+LOAD_ARGS = [
+    Input('load-button', 'n_clicks'),
+    State('year-input', 'value'),
+    State('round-input', 'value'),
+    State('session-type', 'value'),
+]
+
+
+def register_callbacks(app, manager=None):
+    if manager is None:
+        app.callback(LOAD_OUTPUTS, *LOAD_ARGS)(load_session)
+    else:
+        # Cold loads run in a job process with stage progress; picking a
+        # different event cancels the job in flight.
+        app.callback(
+            LOAD_OUTPUTS, *LOAD_ARGS,
+            background=True,
+            manager=manager,
+            prevent_initial_call=True,
+            running=[
+                (Output('load-button', 'disabled'), True, False),
+                (Output('load-progress', 'style'), {'display': 'flex'}, {'display': 'none'}),
+            ],
+            progress=[Output('load-progress', 'value'), Output('load-progress', 'label')],
+            progress_default=[0, ""],
+            cancel=[Input('year-input', 'value'), Input('round-input', 'value'), Input('session-type', 'value')],
+        )(load_session_in_background)
+
+    # Each output has its own callback with only the inputs it depends on,
+    # e.g. switching the telemetry channel leaves weather and sectors alone.
+    # The telemetry plot and track map ship all channels once; the channel
+    # dropdown only drives the clientside callbacks in assets/telemetry.js.
+    app.callback(
+        Output('telemetry-data', 'data'),
+        [Input('driver-dropdown', 'value'),
+         Input('lap-dropdown', 'value'),
+         Input('telemetry-plot', 'relayoutData')],
+        State('session-store', 'children')
+    )(update_telemetry_data)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='telemetry', function_name='plot'),
+        Output('telemetry-plot', 'figure'),
+        Input('telemetry-data', 'data'),
+        Input('telemetry-type', 'value'),
     )
-    def load_session(n_clicks, year, rnd, session_type):
-        hidden_style = {'display': 'none'}
-        visible_style = {'display': 'block'}
-
-        if n_clicks == 0:
-            return [], [], hidden_style, hidden_style, hidden_style, hidden_style, "", [], [], hidden_style, hidden_style, []
-
-        try:
-            session = fastf1.get_session(year, rnd, session_type.upper())
-            session.load()
-            drivers = session.laps['Driver'].unique()
-
-            options = [{"label": d, "value": d} for d in drivers]
-            preselected = drivers[:2].tolist()
-
-            # Lap selection
-            lap_numbers = session.laps['LapNumber'].unique()
-            lap_options = [{'label': f"Lap {int(lap)}", 'value': int(lap)} for lap in lap_numbers]
-            default_laps = [int(lap) for lap in lap_numbers[:2]]
-
-            session_info = f"{year},{rnd},{session_type.upper()}"
-
-            # Lap Delta Table
-            try:
-                fastest_laps = session.laps.pick_quicklaps().copy()
-                fastest_laps['LapTime'] = pd.to_timedelta(fastest_laps['LapTime'])
-
-                fastest_laps['LapTimeSeconds'] = fastest_laps['LapTime'].apply(lambda x: x.total_seconds())
-                fastest_laps = fastest_laps.sort_values('LapTimeSeconds')
-                best_time = fastest_laps.iloc[0]['LapTimeSeconds']
-                fastest_laps['Delta'] = fastest_laps['LapTimeSeconds'] - best_time
-
-                def format_laptime(td):
-                    total = td.total_seconds()
-                    minutes = int(total // 60)
-                    seconds = total % 60
-                    return f"{minutes}:{seconds:05.2f}"
-
-                fastest_laps['LapTimeStr'] = fastest_laps['LapTime'].apply(format_laptime)
-
-                #Compound column to final dict
-                lap_delta_data = fastest_laps[['Driver', 'LapTimeStr', 'Delta', 'Compound']].rename(
-                    columns={'LapTimeStr': 'LapTime'}
-                ).to_dict('records')
-
-            except Exception as e:
-                print(f"Lap delta build error: {e}")
-                lap_delta_data = []
-
-            return (
-                options, preselected, visible_style, visible_style,
-                visible_style, visible_style, session_info,
-                lap_options, default_laps, visible_style, visible_style,
-                lap_delta_data
-            )
-
-        except Exception as e:
-            print(f"Error loading session: {e}")
-            return [], [], hidden_style, hidden_style, hidden_style, hidden_style, "", [], [], hidden_style, hidden_style, []
-
-    # Callback to plot telemetry after driver selection
-    @app.callback(
-        [Output('telemetry-plot', 'figure'),
-         Output('track-map', 'figure'),
-         Output('weather-plot', 'figure'),
-         Output('sector-comparison-chart', 'figure'),
-         Output('sector-comparison-table', 'data')],
+
+    app.callback(
+        Output('track-map-data', 'data'),
         [Input('driver-dropdown', 'value'),
-         Input('telemetry-type', 'value'),
-         Input('lap-dropdown', 'value')],
+         Input('track-map-mode', 'value')],
         State('session-store', 'children')
+    )(update_track_data)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='telemetry', function_name='trackMap'),
+        Output('track-map', 'figure'),
+        Input('track-map-data', 'data'),
+        Input('telemetry-type', 'value'),
     )
-    def update_plot(drivers, telemetry_type, laps, session_info):
-        if not drivers or not laps or not session_info:
-            return {}, {}, {}, {}, []
-
-        year, rnd, session_type = session_info.split(',')
-        session = fastf1.get_session(int(year), int(rnd), session_type)
-        session.load()
-        all_tel = []
-        for driver in drivers:
-            for lap_num in laps:
-                try:
-                    lap = session.laps.pick_drivers(driver).pick_laps(int(lap_num))
-                    tel = lap.get_car_data().add_distance()
-                    tel['Driver'] = driver
-                    tel['Lap'] = f"Lap {lap_num}"
-                    all_tel.append(tel)
-                except Exception as e:
-                    print(f"Error getting telemetry for {driver} lap {lap_num}: {e}")
-
-        if all_tel:
-            df = pd.concat(all_tel)
-            fig1 = px.line(df, x='Distance', y=telemetry_type, color='Lap',
-                           line_dash='Driver' if len(drivers) > 1 else None,
-                           title=f"{telemetry_type} vs Distance")
-        else:
-            fig1 = {}
-
-        fig2 = go.Figure()
-        for driver in drivers:
-            try:
-                lap = session.laps.pick_drivers(driver).pick_fastest()
-                tel = lap.get_telemetry()
-                fig2.add_trace(go.Scatter(
-                    x=tel['X'],
-                    y=tel['Y'],
-                    mode='lines',
-                    name=driver,
-                    line=dict(width=3),
-                    text=[f"{telemetry_type}: {val:.2f}" for val in tel[telemetry_type]],
-                    hoverinfo="text+name"
-                ))
-            except Exception as e:
-                print(f"Track map error for {driver}: {e}")
-
-            # Turn labels
-            try:
-                corners = session.get_circuit_info().corners
-                for i, (_, row) in enumerate(corners.iterrows()):
-                    offset = 20 if i % 2 == 0 else -20  # Zigzag vertical position
-
-                    fig2.add_annotation(
-                        x=row['X'],
-                        y=row['Y'],
-                        text=f"Turn{int(row['Number'])}",
-                        showarrow=True,
-                        arrowhead=1,
-                        arrowsize=1,
-                        ax=20 if i % 2 == 0 else -20,
-                        ay=offset,
-                        font=dict(size=9, color="black"),
-                        bgcolor="rgba(255,255,255,0.6)",
-                        bordercolor="black",
-                        borderwidth=1.5,
-                        opacity=0.5
-                    )
-            except Exception as e:
-                print(f"Error adding turn labels: {e}")
-
-        fig2.update_layout(
-            title="Track Map - Fastest Laps Only",
-            xaxis_title="X",
-            yaxis_title="Y",
-            yaxis_scaleanchor="x",
-            width=1100,
-            height=900,
-            showlegend=True
-        )
 
-        # --- Weather plot ---
-        try:
-            weather_df = session.weather_data
-            weather_fig = px.line(weather_df, x='Time', y=['AirTemp', 'TrackTemp'],
-                                  labels={'value': 'Temperature (°C)', 'Time': 'Session Time'},
-                                  title="Air vs Track Temperature Over Time")
-        except Exception as e:
-            print(f"Weather plot error: {e}")
-            weather_fig = {}
-
-        # --- Sector Comparison ---
-        try:
-            sector_data = []
-
-            for driver in drivers:
-                lap = session.laps.pick_drivers(driver).pick_fastest()
-                s1 = lap['Sector1Time'].total_seconds()
-                s2 = lap['Sector2Time'].total_seconds()
-                s3 = lap['Sector3Time'].total_seconds()
-                sector_data.append({
-                    "Driver": driver,
-                    "Sector 1": s1,
-                    "Sector 2": s2,
-                    "Sector 3": s3
-                })
-
-            df_sectors = pd.DataFrame(sector_data)
-
-            sector_fig = px.bar(
-                df_sectors,
-                x='Driver',
-                y=['Sector 1', 'Sector 2', 'Sector 3'],
-                title="Sector Time Comparison (s)",
-                labels={"value": "Time (s)", "variable": "Sector"},
-                barmode="stack"
-            )
-
-            sector_fig.update_layout(legend_title_text='Sector')
-        except Exception as e:
-            print(f"Sector comparison error: {e}")
-            sector_fig = {}
-
-        # --- Sector Comparison Table ---
-        try:
-            sector_data = session.laps.pick_quicklaps().copy()
-            sector_data['Sector1Time'] = pd.to_timedelta(sector_data['Sector1Time'])
-            sector_data['Sector2Time'] = pd.to_timedelta(sector_data['Sector2Time'])
-            sector_data['Sector3Time'] = pd.to_timedelta(sector_data['Sector3Time'])
-
-            # Make an explicit copy here to avoid SettingWithCopyWarning
-            sector_data = sector_data[sector_data['Driver'].isin(drivers)].copy()
-
-            sector_data['Sector1Sec'] = sector_data['Sector1Time'].apply(lambda x: x.total_seconds())
-            sector_data['Sector2Sec'] = sector_data['Sector2Time'].apply(lambda x: x.total_seconds())
-            sector_data['Sector3Sec'] = sector_data['Sector3Time'].apply(lambda x: x.total_seconds())
-
-            # Get best per sector
-            best_s1 = sector_data['Sector1Sec'].min()
-            best_s2 = sector_data['Sector2Sec'].min()
-            best_s3 = sector_data['Sector3Sec'].min()
-
-            def fmt(td):  # Format timedelta
-                sec = td.total_seconds()
-                return f"{int(sec // 60)}:{sec % 60:05.2f}"
-
-            sector_table = []
-            for _, row in sector_data.iterrows():
-                sector_table.append({
-                    'Driver': row['Driver'],
-                    'Sector1': fmt(row['Sector1Time']),
-                    'DeltaS1': round(row['Sector1Sec'] - best_s1, 3),
-                    'BestS1': row['Sector1Sec'] == best_s1,  # Flag for best sector 1
-                    'Sector2': fmt(row['Sector2Time']),
-                    'DeltaS2': round(row['Sector2Sec'] - best_s2, 3),
-                    'BestS2': row['Sector2Sec'] == best_s2,
-                    'Sector3': fmt(row['Sector3Time']),
-                    'DeltaS3': round(row['Sector3Sec'] - best_s3, 3),
-                    'BestS3': row['Sector3Sec'] == best_s3,
-                })
-
-        except Exception as e:
-            print(f"Error building sector table: {e}")
-            sector_table = []
-
-        return fig1, fig2, weather_fig, sector_fig, sector_table
-
-    @app.callback(
-        Output({"type": "collapse-body", "section": MATCH}, "is_open"),
-        Input({"type": "collapse-toggle", "section": MATCH}, "n_clicks"),
-        State({"type": "collapse-body", "section": MATCH}, "is_open"),
+    app.callback(
+        Output('weather-plot', 'figure'),
+        Input('session-store', 'children')
+    )(update_weather_plot)
+
+    app.callback(
+        Output('sector-comparison-chart', 'figure'),
+        Input('driver-dropdown', 'value'),
+        State('session-store', 'children')
+    )(update_sector_chart)
+
+    app.callback(
+        Output('sector-comparison-table', 'data'),
+        Input('driver-dropdown', 'value'),
+        State('session-store', 'children')
+    )(update_sector_table)
+
+    # Race replay: the slider time is advanced client-side while playing;
+    # every position is a small server-side frame lookup.
+    app.callback(
+        [Output('replay-data', 'data'),
+         Output('replay-time', 'min'),
+         Output('replay-time', 'max'),
+         Output('replay-time', 'value')],
+        Input({"type": "collapse-body", "section": "replay"}, "is_open"),
+        Input('session-store', 'children'),
+    )(update_replay_base)
+
+    app.callback(
+        Output('replay-frame', 'data'),
+        Input('replay-time', 'value'),
+        State('session-store', 'children'),
+        prevent_initial_call=True
+    )(update_replay_frame)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='replay', function_name='step'),
+        [Output('replay-time', 'value', allow_duplicate=True),
+         Output('replay-interval', 'disabled'),
+         Output('replay-play', 'children')],
+        [Input('replay-interval', 'n_intervals'),
+         Input('replay-play', 'n_clicks')],
+        [State('replay-interval', 'disabled'),
+         State('replay-time', 'value'),
+         State('replay-time', 'min'),
+         State('replay-time', 'max'),
+         State('replay-speed', 'value'),
+         State('replay-interval', 'interval')],
         prevent_initial_call=True
     )
-    def toggle_collapse(n, is_open):
-        return not is_open
 
+    app.clientside_callback(
+        ClientsideFunction(namespace='replay', function_name='render'),
+        Output('replay-map', 'figure'),
+        Input('replay-frame', 'data'),
+        Input('replay-data', 'data'),
+    )
 
+    app.callback(
+        [Output('season-gap-plot', 'figure'),
+         Output('season-pace-plot', 'figure'),
+         Output('season-weather-plot', 'figure'),
+         Output('season-status', 'children')],
+        Input({"type": "collapse-body", "section": "season"}, "is_open"),
+        Input('year-input', 'value'),
+    )(update_season_view)
+
+    app.callback(
+        Output({"type": "collapse-body", "section": MATCH}, "is_open"),
+        Input({"type": "collapse-toggle", "section": MATCH}, "n_clicks"),
+        State({"type": "collapse-body", "section": MATCH}, "is_open"),
+        prevent_initial_call=True
+    )(toggle_collapse)
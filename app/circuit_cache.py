@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+
+from .utils import get_circuit_info
+
+CIRCUIT_DIR = os.path.join("app", "cache_dir", "circuits")
+
+_memory = {}
+_lock = threading.Lock()
+
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def circuit_key(session):
+    circuit = session.session_info['Meeting']['Circuit']
+    return f"{session.event.year}_{circuit['Key']}"
+
+
+def _path(key):
+    return os.path.join(CIRCUIT_DIR, f"{key}.json")
+
+
+def _read(key):
+    try:
+        with open(_path(key)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write(key, geometry):
+    os.makedirs(CIRCUIT_DIR, exist_ok=True)
+    tmp = f"{_path(key)}.tmp-{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(geometry, f)
+    os.replace(tmp, _path(key))
+
+
+def get_circuit_geometry(session, reference_tel=None):
+    # Corner positions and a track outline, computed once per circuit and
+    # year and kept both in memory and on disk. The outline is taken from the
+    # first reference lap offered, since it needs position telemetry.
+    key = circuit_key(session)
+    with _lock:
+        geometry = _memory.get(key) or _read(key)
+        if geometry is None:
+            corners = get_circuit_info(session).corners
+            geometry = {
+                'corners': {
+                    'x': corners['X'].astype(float).tolist(),
+                    'y': corners['Y'].astype(float).tolist(),
+                    'number': corners['Number'].astype(int).tolist(),
+                    'letter': corners['Letter'].fillna('').astype(str).tolist(),
+                },
+                'outline': None,
+            }
+            _write(key, geometry)
+        if geometry['outline'] is None and reference_tel is not None:
+            geometry['outline'] = {
+                'x': reference_tel['X'].astype(float).round(1).tolist(),
+                'y': reference_tel['Y'].astype(float).round(1).tolist(),
+            }
+            _write(key, geometry)
+        _memory[key] = geometry
+        return geometry
+
+
+def turn_annotations(geometry):
+    corners = geometry['corners']
+    return [
+        dict(
+            x=x,
+            y=y,
+            text=f"Turn{number}",
+            showarrow=True,
+            arrowhead=1,
+            arrowsize=1,
+            ax=20 if i % 2 == 0 else -20,
+            ay=20 if i % 2 == 0 else -20,  # Zigzag vertical position
+            font=dict(size=9, color="black"),
+            bgcolor="rgba(255,255,255,0.6)",
+            bordercolor="black",
+            borderwidth=1.5,
+            opacity=0.5
+        )
+        for i, (x, y, number) in enumerate(zip(corners['x'], corners['y'], corners['number']))
+    ]
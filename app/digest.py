@@ -0,0 +1,235 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .locks import file_lock
+from .session_cache import session_cache, session_key
+from .tables import lap_delta_records, quick_sector_seconds
+from .telemetry_store import TELEMETRY_FILES, session_fingerprint, telemetry_store
+from .utils import get_cached_session
+
+# Compact per-session summary (drivers, laps, lap-delta table, compounds,
+# fastest laps, quick-lap sectors, weather), written next to the session
+# snapshot and telemetry shards. Everything load_session and the summary
+# figures need comes from here, so repeat visits to an event skip
+# session.load() entirely. Built from laps and weather only, never telemetry.
+
+DIGEST_FILE = "digest.json.gz"
+DIGEST_VERSION = 1
+# Full fingerprint of the session, car and position data included, as last
+# seen by a worker that had the session in memory.
+FINGERPRINT_FILE = "fingerprint.json"
+# Digests kept in memory per process, least recently used dropped first; the
+# rest are a read of a small file away.
+MEMORY_ENTRIES = int(os.environ.get("F1_DIGEST_MEMORY_ENTRIES", "16"))
+
+logger = logging.getLogger(__name__)
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _digest_path(key):
+    return os.path.join(telemetry_store.session_dir(key), DIGEST_FILE)
+
+
+def _seconds(column):
+    return pd.to_timedelta(column).dt.total_seconds()
+
+
+def _floats(values):
+    # JSON has no NaN; missing times are stored as null.
+    return [None if np.isnan(v) else float(v) for v in np.asarray(values, dtype=np.float64)]
+
+
+def build_digest(session, fingerprint=None):
+    laps = session.laps
+    drivers = laps['Driver'].unique().tolist()
+
+    fastest = {}
+    compounds = {}
+    for driver in drivers:
+        driver_laps = laps.pick_drivers(driver)
+        # Compounds in stint order, one entry per stint.
+        stints = driver_laps['Compound'].astype(object).fillna('UNKNOWN')
+        compounds[driver] = stints[stints.ne(stints.shift())].tolist()
+        lap = driver_laps.pick_fastest()
+        if lap is None:
+            continue
+        fastest[driver] = {
+            'LapNumber': int(lap['LapNumber']),
+            **{name: _floats([pd.Timedelta(lap[f'{name}Time']).total_seconds()])[0]
+               for name in ('Lap', 'Sector1', 'Sector2', 'Sector3')},
+        }
+
+    try:
+        lap_delta = lap_delta_records(laps)
+    except Exception as e:
+        logger.warning("Lap delta build error: %s", e)
+        lap_delta = []
+
+    sectors = quick_sector_seconds(laps)
+    weather = session.weather_data
+    return {
+        'version': DIGEST_VERSION,
+        'fingerprint': fingerprint,
+        'drivers': drivers,
+        'lap_numbers': [int(n) for n in laps['LapNumber'].dropna().unique()],
+        'lap_delta': lap_delta,
+        'compounds': compounds,
+        'fastest': fastest,
+        'sectors': {
+            'Driver': sectors['Driver'].tolist(),
+            **{f'Sector{n}': _floats(sectors[f'Sector{n}']) for n in (1, 2, 3)},
+        },
+        'weather': {
+            'Time': _floats(_seconds(weather['Time'])),
+            'AirTemp': _floats(weather['AirTemp']),
+            'TrackTemp': _floats(weather['TrackTemp']),
+        },
+    }
+
+
+def _read(path):
+    try:
+        with gzip.open(path, 'rt') as f:
+            digest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable session digest %s: %s", path, e)
+        return None
+    return digest if digest.get('version') == DIGEST_VERSION else None
+
+
+def _write(path, digest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with gzip.open(tmp, 'wt') as f:
+        json.dump(digest, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _is_current(key, digest):
+    # Only checked when the session is already in memory anyway; reading a
+    # digest on its own must not need the session.
+    session = session_cache.peek(key)
+    if session is None:
+        return True
+    return digest['fingerprint'] == session_fingerprint(session, exclude=TELEMETRY_FILES)
+
+
+def _recall(key):
+    with _lock:
+        digest = _memory.get(key)
+        if digest is not None:
+            _memory.move_to_end(key)
+        return digest
+
+
+def _remember(key, digest):
+    with _lock:
+        _memory[key] = digest
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def get_session_digest(year, rnd, session_type):
+    key = session_key(year, rnd, session_type)
+    digest = _recall(key)
+    if digest is not None and _is_current(key, digest):
+        return digest
+
+    path = _digest_path(key)
+    digest = _read(path)
+    if digest is None or not _is_current(key, digest):
+        with file_lock(f"{path}.lock"):
+            digest = _read(path)
+            if digest is None or not _is_current(key, digest):
+                session = get_cached_session(*key)
+                digest = build_digest(session, session_fingerprint(session, exclude=TELEMETRY_FILES))
+                try:
+                    _write(path, digest)
+                except Exception as e:
+                    logger.warning("Could not write session digest %s: %s", path, e)
+    _remember(key, digest)
+    return digest
+
+
+def session_version(year, rnd, session_type):
+    # Fingerprint of the session's digest, read from memory or disk but
+    # never built: None until the session has been loaded once.
+    key = session_key(year, rnd, session_type)
+    digest = _recall(key)
+    if digest is None:
+        digest = _read(_digest_path(key))
+        if digest is None:
+            return None
+        _remember(key, digest)
+    if not _is_current(key, digest):
+        return None
+    return digest['fingerprint']
+
+
+def _read_fingerprint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['fingerprint']
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable session fingerprint %s: %s", path, e)
+        return None
+
+
+def _write_fingerprint(path, fingerprint):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, 'w') as f:
+        json.dump({'fingerprint': fingerprint}, f)
+    os.replace(tmp, path)
+
+
+def telemetry_version(year, rnd, session_type):
+    # Like session_version, but covering the telemetry too. A worker with
+    # the session in memory fingerprints it and records the result next to
+    # the digest; every other worker reads that record instead of attaching
+    # the session. Only when there is no record yet is the session loaded.
+    key = session_key(year, rnd, session_type)
+    path = os.path.join(telemetry_store.session_dir(key), FINGERPRINT_FILE)
+    session = session_cache.peek(key)
+    if session is None:
+        recorded = _read_fingerprint(path)
+        if recorded is not None:
+            return recorded
+        session = get_cached_session(*key)
+    fingerprint = session_fingerprint(session)
+    if fingerprint != _read_fingerprint(path):
+        try:
+            _write_fingerprint(path, fingerprint)
+        except Exception as e:
+            logger.warning("Could not write session fingerprint %s: %s", path, e)
+    return fingerprint
+
+
+def invalidate_digest(key=None):
+    with _lock:
+        if key is None:
+            _memory.clear()
+        else:
+            _memory.pop(key, None)
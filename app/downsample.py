@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+
+POINT_BUDGET = int(os.environ.get("F1_TRACE_POINT_BUDGET", "1500"))
+
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the first and last sample and, for
+    # each bucket in between, the sample forming the largest triangle with the
+    # previously kept point and the mean of the next bucket. Returns indices.
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean point of every bucket, computed up front with cumulative sums.
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    lo, hi = edges[:-1], edges[1:]
+    counts = hi - lo
+    mean_x = np.append((cx[hi] - cx[lo]) / counts, x[-1])
+    mean_y = np.append((cy[hi] - cy[lo]) / counts, y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        bx = x[lo[i]:hi[i]]
+        by = y[lo[i]:hi[i]]
+        area = np.abs((x[a] - mean_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (mean_y[i + 1] - y[a]))
+        a = lo[i] + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def window(x, x_range):
+    # Index slice of a monotonic x array covering the visible range, padded
+    # by one sample so lines run to the plot edges.
+    if x_range is None:
+        return slice(0, len(x))
+    start = max(int(np.searchsorted(x, x_range[0], side='left')) - 1, 0)
+    stop = min(int(np.searchsorted(x, x_range[1], side='right')) + 1, len(x))
+    return slice(start, stop)
+
+
+def reduce_trace(x, y, x_range=None, budget=POINT_BUDGET):
+    visible = window(x, x_range)
+    x = np.asarray(x[visible])
+    y = np.asarray(y[visible])
+    keep = lttb(x, y, budget)
+    return x[keep], y[keep]
+
+
+def reduce_channels(x, channels, x_range=None, budget=POINT_BUDGET):
+    # One shared set of samples for several channels over the same x: each
+    # channel keeps its LTTB points from an equal share of the budget, and
+    # the union is returned, so switching channels client-side needs no
+    # other x array and the total stays within ``budget``.
+    visible = window(x, x_range)
+    x = np.asarray(x[visible])
+    if len(x) <= budget:
+        return x, {name: np.asarray(values[visible]) for name, values in channels.items()}
+    share = max(budget // max(len(channels), 1), 3)
+    keep = np.unique(np.concatenate(
+        [lttb(x, np.asarray(values[visible]), share) for values in channels.values()]
+    ))
+    return x[keep], {name: np.asarray(values[visible])[keep] for name, values in channels.items()}
+
+
+def relayout_x_range(relayout_data):
+    # Visible x range from a graph's relayoutData, or None when the user is
+    # looking at the full trace.
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        lo, hi = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        lo, hi = relayout_data['xaxis.range']
+    else:
+        return None
+    # Round to whole meters so tiny pans hit the memoized figure.
+    return float(np.floor(lo)), float(np.ceil(hi))
@@ -0,0 +1,222 @@
+"""Streaming telemetry export for programmatic access.
+
+    GET /api/v1/sessions/<year>/<round>/<type>
+        drivers and lap numbers of a session (JSON)
+    GET /api/v1/sessions/<year>/<round>/<type>/telemetry
+        ?drivers=VER,HAM  (required)
+        &laps=1-5,12      (default: every lap)
+        &channels=Speed,Throttle  (default: all of EXPORT_CHANNELS)
+        &format=npz|arrow (default: npz)
+
+Telemetry is streamed one lap at a time from the memory-mapped store
+shards, so an export never holds more than one lap in memory:
+
+- ``npz``: a sequence of frames, each an 8-byte little-endian length
+  followed by a compressed .npz with the lap's channels plus ``Driver`` and
+  ``LapNumber``; read it back with ``iter_npz_stream``.
+- ``arrow``: an Arrow IPC stream with one record batch per lap (needs
+  pyarrow on the server).
+
+Responses carry an ETag derived from the session's cache fingerprint and
+the normalized query; a matching If-None-Match is answered with 304
+before any telemetry is streamed (the lap views are mmap'd, not read).
+"""
+import hashlib
+import io
+import json
+import struct
+from functools import lru_cache
+
+from .ranges import parse_range
+from .session_cache import session_key
+
+# The data modules (numpy, FastF1 via the store) are imported on the first
+# export, not when the routes are registered at startup; hence the store's
+# CHANNELS spelled out here.
+EXPORT_CHANNELS = ('Time', 'Distance', 'Speed', 'Throttle', 'Brake', 'RPM', 'nGear', 'DRS')
+EXPORT_VERSION = 1
+FORMATS = {
+    'npz': 'application/vnd.f1dash.npz-stream',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+FRAME_HEADER = struct.Struct('<Q')
+# Arrow IPC end-of-stream marker: continuation token and a zero length.
+ARROW_EOS = b'\xff\xff\xff\xff\x00\x00\x00\x00'
+
+
+@lru_cache(maxsize=1)
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:  # optional; the npz format needs nothing extra
+        return None
+    return pyarrow
+
+
+class ExportError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_laps(text, available):
+    # "1-5,12" -> [1, 2, 3, 4, 5, 12], limited to the session's laps
+    # ``available``.
+    if not available:
+        return []
+    known, first, last = set(available), min(available), max(available)
+    try:
+        laps = [lap for lap in parse_range(text, first, last) if lap in known]
+    except ValueError:
+        raise ExportError(f"Invalid laps: {text!r}")
+    if not laps:
+        raise ExportError(f"No laps {text!r} in this session (laps {first}-{last})", 404)
+    return laps
+
+
+def parse_query(args, digest):
+    drivers = [d.strip().upper() for d in args.get('drivers', '').split(',') if d.strip()]
+    if not drivers:
+        raise ExportError("drivers is required, e.g. drivers=VER,HAM")
+    unknown = [d for d in drivers if d not in digest['drivers']]
+    if unknown:
+        raise ExportError(f"Unknown drivers: {', '.join(unknown)}", 404)
+
+    laps = parse_laps(args['laps'], digest['lap_numbers']) if args.get('laps') else digest['lap_numbers']
+    channels = [c.strip() for c in args.get('channels', '').split(',') if c.strip()] or list(EXPORT_CHANNELS)
+    invalid = [c for c in channels if c not in EXPORT_CHANNELS]
+    if invalid:
+        raise ExportError(f"Unknown channels: {', '.join(invalid)} (available: {', '.join(EXPORT_CHANNELS)})")
+
+    fmt = args.get('format', 'npz')
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format {fmt!r} (available: {', '.join(FORMATS)})")
+    if fmt == 'arrow' and _pyarrow() is None:
+        raise ExportError("Arrow export needs pyarrow on the server; use format=npz", 406)
+    return list(dict.fromkeys(drivers)), laps, list(dict.fromkeys(channels)), fmt
+
+
+def export_etag(fingerprint, drivers, laps, channels, fmt):
+    query = json.dumps([EXPORT_VERSION, fingerprint, drivers, laps, channels, fmt])
+    return hashlib.sha1(query.encode()).hexdigest()
+
+
+def lap_slices(key, session, drivers, laps, channels):
+    # (driver, lap, {channel: mmap'd view}) of every requested lap a driver
+    # has telemetry for. Views only: no samples are read until streamed.
+    from .extraction import ensure_shards
+    from .telemetry_store import telemetry_store
+
+    failed = ensure_shards(key, session, drivers)
+    if failed:
+        raise ExportError("; ".join(f"{d}: {m}" for d, m in failed.items()), 500)
+    slices = []
+    for driver in drivers:
+        for lap in laps:
+            try:
+                data = telemetry_store.get_lap(key, session, driver, lap, channels)
+            except KeyError:
+                continue  # lap not driven, or without telemetry
+            if data is not None:
+                slices.append((driver, lap, data))
+    return slices
+
+
+def npz_stream(slices):
+    import numpy as np
+
+    for driver, lap, data in slices:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, Driver=np.array(driver), LapNumber=np.array(lap, dtype=np.int16), **data)
+        payload = buffer.getvalue()
+        yield FRAME_HEADER.pack(len(payload))
+        yield payload
+
+
+def iter_npz_stream(stream):
+    # Client-side reader for the npz format: yields one dict per lap.
+    import numpy as np
+
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header:
+            return
+        (length,) = FRAME_HEADER.unpack(header)
+        with np.load(io.BytesIO(stream.read(length))) as frame:
+            yield {name: frame[name] for name in frame.files}
+
+
+def arrow_stream(slices, channels):
+    import numpy as np
+
+    pa = _pyarrow()
+    schema = pa.schema(
+        [('Driver', pa.string()), ('LapNumber', pa.int16())] + [(c, pa.float32()) for c in channels]
+    )
+    yield schema.serialize().to_pybytes()
+    for driver, lap, data in slices:
+        rows = len(data[channels[0]])
+        batch = pa.record_batch(
+            [pa.array([driver] * rows, pa.string()), pa.array(np.full(rows, lap, dtype=np.int16))]
+            + [pa.array(np.asarray(data[c], dtype=np.float32)) for c in channels],
+            schema=schema,
+        )
+        yield batch.serialize().to_pybytes()
+    yield ARROW_EOS
+
+
+def register_export(server):
+    from flask import Response, jsonify, request
+
+    def error(e):
+        return jsonify({'error': str(e)}), e.status
+
+    def load(year, rnd, session_type):
+        from .digest import get_session_digest
+        from .utils import get_cached_session
+
+        key = session_key(year, rnd, session_type)
+        try:
+            return key, get_cached_session(*key), get_session_digest(*key)
+        except ValueError as e:
+            raise ExportError(str(e), 404)
+
+    @server.route("/api/v1/sessions/<int:year>/<int:rnd>/<session_type>")
+    def export_session(year, rnd, session_type):
+        try:
+            key, _, digest = load(year, rnd, session_type)
+        except ExportError as e:
+            return error(e)
+        return jsonify({
+            'session': list(key),
+            'drivers': digest['drivers'],
+            'lap_numbers': digest['lap_numbers'],
+            'channels': list(EXPORT_CHANNELS),
+            'formats': [f for f in FORMATS if f != 'arrow' or _pyarrow() is not None],
+        })
+
+    @server.route("/api/v1/sessions/<int:year>/<int:rnd>/<session_type>/telemetry")
+    def export_telemetry(year, rnd, session_type):
+        from .telemetry_store import session_fingerprint
+
+        try:
+            key, session, digest = load(year, rnd, session_type)
+            drivers, laps, channels, fmt = parse_query(request.args, digest)
+            slices = lap_slices(key, session, drivers, laps, channels)
+        except ExportError as e:
+            return error(e)
+
+        # Only after lap_slices: fetching the telemetry the shards are built
+        # from writes the car and position data into the FastF1 cache entry,
+        # which changes its fingerprint.
+        etag = export_etag(session_fingerprint(session), drivers, laps, channels, fmt)
+        if etag in request.if_none_match:
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+        body = npz_stream(slices) if fmt == 'npz' else arrow_stream(slices, channels)
+        filename = f"{key[0]}_{key[1]:02d}_{key[2]}_telemetry.{'arrows' if fmt == 'arrow' else 'npzs'}"
+        return Response(body, mimetype=FORMATS[fmt], headers={
+            'ETag': f'"{etag}"',
+            'Cache-Control': 'no-cache',
+            'Content-Disposition': f'attachment; filename="{filename}"',
+        })
@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .metrics import instrument
+from .session_cache import session_key
+from .telemetry_store import telemetry_store
+from .utils import ensure_driver_telemetry
+
+MAX_WORKERS = int(os.environ.get("F1_EXTRACT_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# Shared, bounded pool: concurrent callbacks queue behind each other instead
+# of each spinning up their own threads. Created on first use in each
+# process: a forked child (a background load job) inherits the parent's
+# pool but none of its threads, and work submitted to it would never run.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="f1-extract")
+        return _executor
+
+
+def _reset_pool():
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_pool)
+
+
+@dataclass
+class ExtractionResult:
+    data: dict = field(default_factory=dict)    # request -> result
+    errors: dict = field(default_factory=dict)  # request -> error message
+
+
+@instrument("extract.shards")
+def ensure_shards(session_info, session, drivers):
+    # Drivers without a store shard get their telemetry loaded together (one
+    # read of the raw api data for the whole batch) and their shards built
+    # in parallel. Returns the drivers that failed, with the reason.
+    key = session_key(*session_info)
+    missing = [d for d in drivers if not telemetry_store.has_driver(key, session, d)]
+    if not missing:
+        return {}
+    try:
+        ensure_driver_telemetry(session_info, session, missing)
+    except Exception as e:
+        return {d: f"telemetry load failed: {e}" for d in missing}
+
+    failed = {}
+    builds = {d: _pool().submit(telemetry_store.build_driver, key, session, d) for d in missing}
+    for driver, future in builds.items():
+        try:
+            future.result()
+        except Exception as e:
+            failed[driver] = f"telemetry extraction failed: {e}"
+    return failed
+
+
+@instrument("extract.laps")
+def extract_laps(session_info, session, requests, channels):
+    # Batch of (driver, lap) requests, each resolved as a slice of the
+    # driver's memory-mapped store shard.
+    key = session_key(*session_info)
+    result = ExtractionResult()
+    failed = ensure_shards(session_info, session, list(dict.fromkeys(d for d, _ in requests)))
+    for request in requests:
+        driver, lap = request
+        if driver in failed:
+            result.errors[request] = failed[driver]
+            continue
+        try:
+            result.data[request] = telemetry_store.get_lap(key, session, driver, lap, channels)
+        except Exception as e:
+            result.errors[request] = str(e)
+    return result
+
+
+@instrument("extract.fastest_laps")
+def extract_fastest_laps(session_info, session, drivers, channels=()):
+    # Track position of each driver's fastest lap, with ``channels``
+    # resampled onto the position samples.
+    key = session_key(*session_info)
+    result = ExtractionResult()
+    failed = ensure_shards(session_info, session, list(drivers))
+    for driver in drivers:
+        if driver in failed:
+            result.errors[driver] = failed[driver]
+            continue
+        try:
+            lap = session.laps.pick_drivers(driver).pick_fastest()
+            result.data[driver] = telemetry_store.get_lap_positions(
+                key, session, driver, lap['LapNumber'], channels
+            )
+        except Exception as e:
+            result.errors[driver] = str(e)
+    return result
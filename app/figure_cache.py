@@ -0,0 +1,222 @@
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from plotly.utils import PlotlyJSONEncoder
+
+from .telemetry_store import telemetry_store
+
+# Content-addressed cache of callback outputs, shared by every user of a
+# worker (memory tier) and by every worker of a machine (disk tier). An
+# entry is addressed by the callback's normalized inputs plus the version of
+# the session it was drawn from, so identical comparisons (the front row of
+# the latest race, say) are built once and a new session version never
+# serves an old figure. Entries are kept pre-serialized as gzip'd JSON: a
+# hit is a decompress and a parse, and the memory budget counts compressed
+# bytes. The disk tier lives in each session's derived store directory, so
+# the disk cache manager evicts it together with the session.
+
+MEMORY_MB = float(os.environ.get("F1_FIGURE_CACHE_MB", "64"))
+DISK_MB = float(os.environ.get("F1_FIGURE_CACHE_DISK_MB", "512"))
+TTL = float(os.environ.get("F1_FIGURE_CACHE_TTL", str(24 * 3600)))
+
+FIGURE_DIR = "figures"
+FIGURE_CACHE_VERSION = 1
+ENFORCE_INTERVAL = 60.0  # seconds between disk budget checks of one process
+
+logger = logging.getLogger(__name__)
+
+
+def figure_key(name, version, inputs):
+    # ``inputs`` must already be normalized (see the callbacks): equal
+    # requests have to serialize to the same JSON.
+    text = json.dumps([FIGURE_CACHE_VERSION, name, version, inputs], separators=(',', ':'))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def encode(value):
+    # mtime=0 keeps the blob a pure function of the value.
+    text = json.dumps(value, cls=PlotlyJSONEncoder, separators=(',', ':'))
+    return gzip.compress(text.encode(), compresslevel=6, mtime=0)
+
+
+def decode(blob):
+    return json.loads(gzip.decompress(blob))
+
+
+class FigureCache:
+    """Memory and disk tiers of pre-serialized callback outputs."""
+
+    def __init__(self, memory_mb=MEMORY_MB, disk_mb=DISK_MB, ttl=TTL, clock=time.time):
+        self.max_memory_bytes = int(memory_mb * 1024 * 1024)
+        self.max_disk_bytes = int(disk_mb * 1024 * 1024)
+        self.ttl = ttl
+        self.enabled = True
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._entries = OrderedDict()  # figure key -> (stored at, blob)
+        self._bytes = 0
+        self._last_enforced = 0.0
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def _path(self, session, key):
+        return os.path.join(telemetry_store.session_dir(session), FIGURE_DIR, f"{key}.json.gz")
+
+    def get_or_build(self, name, session, version, inputs, build):
+        # Output of ``build()`` for ``inputs`` of session ``session`` at
+        # ``version``. Without a version (the session has no digest yet)
+        # nothing is cached. Exceptions from ``build`` propagate and are
+        # not cached.
+        if not self.enabled or version is None:
+            return build()
+        key = figure_key(name, version, inputs)
+        blob = self._get_memory(key)
+        if blob is None:
+            blob = self._get_disk(self._path(session, key))
+            if blob is not None:
+                self._put_memory(key, blob)
+        if blob is not None:
+            return decode(blob)
+
+        with self._lock:
+            self.misses += 1
+        value = build()
+        blob = encode(value)
+        self._put_memory(key, blob)
+        self._put_disk(self._path(session, key), blob)
+        return value
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored, blob = entry
+            if self._clock() - stored > self.ttl:
+                del self._entries[key]
+                self._bytes -= len(blob)
+                return None
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return blob
+
+    def _put_memory(self, key, blob):
+        if len(blob) > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._entries[key] = (self._clock(), blob)
+            self._bytes += len(blob)
+            while self._bytes > self.max_memory_bytes:
+                _, (_, old) = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+                self.evictions += 1
+
+    def _get_disk(self, path):
+        # A file's mtime is when it was written (for the TTL), its atime
+        # when it was last served (for the size eviction).
+        if self.max_disk_bytes <= 0:
+            return None
+        try:
+            st = os.stat(path)
+            now = self._clock()
+            if now - st.st_mtime > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                blob = f.read()
+            os.utime(path, (now, st.st_mtime))
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Ignoring unreadable cached figure %s: %s", path, e)
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return blob
+
+    def _put_disk(self, path, blob):
+        if self.max_disk_bytes <= 0 or len(blob) > self.max_disk_bytes:
+            return
+        # Content addressed: concurrent writers of one key write the same
+        # bytes, so an atomic replace is all the coordination needed.
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(blob)
+            now = self._clock()
+            os.utime(tmp, (now, now))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not write cached figure %s: %s", path, e)
+            return
+        with self._lock:
+            due = now - self._last_enforced >= ENFORCE_INTERVAL
+            if due:
+                self._last_enforced = now
+        if due:
+            self.enforce_disk()
+
+    def enforce_disk(self):
+        # Drops expired figures of every session, then the least recently
+        # served ones until the disk tier fits its budget. Returns the
+        # number of files removed.
+        now = self._clock()
+        files = []
+        for path in glob.glob(os.path.join(telemetry_store.root, "*", FIGURE_DIR, "*.json.gz")):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_atime, st.st_mtime, st.st_size, path))
+
+        removed = 0
+        total = sum(size for _, _, size, _ in files)
+        for atime, mtime, size, path in sorted(files):
+            if now - mtime <= self.ttl and total <= self.max_disk_bytes:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def clear(self):
+        # Memory tier only; disk entries expire or are evicted by budget.
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+figure_cache = FigureCache()
+os.register_at_fork(after_in_child=figure_cache.after_fork)
@@ -0,0 +1,391 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .circuit_cache import get_circuit_geometry, turn_annotations
+from .digest import get_session_digest
+from .downsample import reduce_channels
+from .extraction import extract_fastest_laps, extract_laps
+from .figure_cache import figure_cache
+from .metrics import instrument, registry
+from .minisectors import MINISECTORS, minisector_dominance
+from .race_replay import get_position_index
+from .season import completed_rounds, load_season
+from .session_cache import session_key
+from .tables import sector_table_from_seconds
+from .typed_arrays import encode_channel
+from .utils import get_cached_session
+
+# Every builder takes only the inputs its output depends on and is memoized
+# on them, so changing one dropdown only rebuilds the figures that use it.
+# ``version`` is the version of the session the output is drawn from (see
+# callbacks.shared_figure); it is part of the memo key only, so a session
+# that changed on disk is rebuilt rather than served from the memo.
+# Builders raise on failure; exceptions are not memoized, so a failed build
+# is retried on the next interaction. Output that misses part of the
+# requested data (a driver whose telemetry failed to extract) is raised as
+# PartialResult for the same reason: it is shown, but never memoized.
+MEMO_SIZE = 64
+LINE_DASHES = ('solid', 'dot', 'dash', 'longdash', 'dashdot', 'longdashdot')
+COMPOUND_COLORS = {
+    'SOFT': '#da291c', 'MEDIUM': '#ffd12e', 'HARD': '#cccccc',
+    'INTERMEDIATE': '#43b02a', 'WET': '#0067ad', 'UNKNOWN': '#888888',
+}
+# Channels offered by the telemetry-type dropdown.
+PLOT_CHANNELS = ('Speed', 'Throttle', 'Brake', 'RPM', 'nGear', 'DRS')
+
+logger = logging.getLogger(__name__)
+
+
+class PartialResult(Exception):
+    def __init__(self, value, errors):
+        super().__init__(f"{len(errors)} extraction errors")
+        self.value = value
+        self.errors = errors
+
+
+def parse_session_info(session_info):
+    return session_key(*session_info.split(','))
+
+
+def log_errors(stage, extracted):
+    for request, message in extracted.errors.items():
+        logger.warning("%s extraction failed for %s: %s", stage, request, message)
+    if extracted.errors:
+        registry.inc("f1_extraction_errors_total", len(extracted.errors), stage=stage)
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("figure.telemetry")
+def build_telemetry_data(session_info, drivers, laps, x_range=None, version=None):
+    # Every plotted channel of the selected laps, reduced to one shared
+    # point budget per trace and sent as typed arrays. The figure itself is
+    # drawn client-side (assets/telemetry.js), so switching channels never
+    # comes back to the server. When zoomed, only the visible distance
+    # window is reduced, which gives full resolution up close.
+    session = get_cached_session(*session_info)
+    requests = [(driver, lap_num) for driver in drivers for lap_num in laps]
+    extracted = extract_laps(session_info, session, requests, ('Distance',) + PLOT_CHANNELS)
+    log_errors("telemetry", extracted)
+
+    colors = px.colors.qualitative.Plotly
+    traces = []
+    for d, driver in enumerate(drivers):
+        for n, lap_num in enumerate(laps):
+            tel = extracted.data.get((driver, lap_num))
+            if tel is None:
+                continue
+            x, channels = reduce_channels(tel['Distance'], {c: tel[c] for c in PLOT_CHANNELS}, x_range)
+            traces.append({
+                'name': f"Lap {lap_num}, {driver}" if len(drivers) > 1 else f"Lap {lap_num}",
+                'color': colors[n % len(colors)],
+                'dash': LINE_DASHES[d % len(LINE_DASHES)],
+                'x': encode_channel('Distance', x),
+                'y': {c: encode_channel(c, values) for c, values in channels.items()},
+            })
+
+    if not traces:
+        data = {}
+    else:
+        data = {
+            'traces': traces,
+            'legend_title': 'Lap, Driver' if len(drivers) > 1 else 'Lap',
+            # Keep the user's zoom when the data is swapped for a re-query.
+            'uirevision': f"{session_info}{drivers}{laps}",
+            'x_range': list(x_range) if x_range is not None else None,
+            'template': _template_json(),
+        }
+    if extracted.errors:
+        raise PartialResult(data, extracted.errors)
+    return data
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("figure.track_map")
+def build_track_data(session_info, drivers, version=None):
+    # Track position of each driver's fastest lap with every plotted channel
+    # resampled onto it. The base figure (turn labels, outline) is built
+    # here; driver traces and channel coloring are added client-side.
+    session = get_cached_session(*session_info)
+    extracted = extract_fastest_laps(session_info, session, drivers, PLOT_CHANNELS)
+    log_errors("track map", extracted)
+
+    traces = []
+    reference_tel = None
+    for driver in drivers:
+        tel = extracted.data.get(driver)
+        if tel is None:
+            continue
+        traces.append({
+            'name': driver,
+            'x': encode_channel('X', tel['X']),
+            'y': encode_channel('Y', tel['Y']),
+            'channels': {c: encode_channel(c, tel[c]) for c in PLOT_CHANNELS},
+        })
+        if reference_tel is None:
+            reference_tel = tel
+
+    fig = _track_base_figure(session, reference_tel, "Track Map - Fastest Laps Only")
+    data = {'figure': fig.to_plotly_json(), 'traces': traces}
+    if extracted.errors:
+        raise PartialResult(data, extracted.errors)
+    return data
+
+
+def _track_base_figure(session, reference_tel, title):
+    fig = go.Figure()
+    # Turn labels, fetched once per circuit and applied in one layout update
+    try:
+        geometry = get_circuit_geometry(session, reference_tel)
+        fig.update_layout(annotations=turn_annotations(geometry))
+        if geometry['outline'] is not None:
+            # Faint outline underneath the driver lines
+            fig.add_trace(go.Scatter(
+                x=geometry['outline']['x'],
+                y=geometry['outline']['y'],
+                mode='lines',
+                line=dict(width=10, color='rgba(128,128,128,0.3)'),
+                hoverinfo='skip',
+                showlegend=False
+            ))
+    except Exception as e:
+        logger.warning("Error adding turn labels: %s", e)
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="X",
+        yaxis_title="Y",
+        yaxis_scaleanchor="x",
+        width=1100,
+        height=900,
+        showlegend=True
+    )
+    return fig
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("figure.dominance")
+def build_dominance_data(session_info, n=MINISECTORS, version=None):
+    # Track map colored by the fastest driver through each minisector, over
+    # the fastest laps of the whole field. Independent of the selected
+    # drivers, so it is built once per session; shaped like the
+    # build_track_data output with the drawing done here.
+    fastest = get_session_digest(*session_info)['fastest']
+    session = get_cached_session(*session_info)
+    dominance = minisector_dominance(
+        session_info, session, {driver: lap['LapNumber'] for driver, lap in fastest.items()}, n
+    )
+    drivers, times, winners = dominance['drivers'], dominance['times'], dominance['winners']
+    reference_tel = {'X': dominance['X'], 'Y': dominance['Y']}
+    fig = _track_base_figure(session, reference_tel, f"Track Map - Minisector Dominance ({n} minisectors)")
+
+    # Gap of each minisector's winner to the next quickest driver.
+    ordered = np.sort(times, axis=0)
+    gaps = ordered[1] - ordered[0] if len(drivers) > 1 else np.zeros(n)
+    index = dominance['minisector']
+    # Segment boundaries along the reference lap; every segment also takes
+    # the first point of the next one so the colored line is continuous.
+    starts = np.searchsorted(index, np.arange(n), side='left')
+    stops = np.minimum(np.searchsorted(index, np.arange(n), side='right') + 1, len(index))
+
+    colors = px.colors.qualitative.Plotly
+    for d, driver in enumerate(drivers):
+        won = [k for k, winner in enumerate(winners) if winner == driver]
+        if not won:
+            continue
+        x, y, text = [], [], []
+        for k in won:
+            count = stops[k] - starts[k]
+            label = f"Minisector {k + 1}: {driver} {times[d, k]:.3f}s (-{gaps[k]:.3f}s)"
+            x += dominance['X'][starts[k]:stops[k]].tolist() + [None]
+            y += dominance['Y'][starts[k]:stops[k]].tolist() + [None]
+            text += [label] * count + [None]
+        fig.add_trace(go.Scatter(
+            x=x, y=y,
+            mode='lines',
+            name=f"{driver} ({len(won)})",
+            line=dict(width=6, color=colors[d % len(colors)]),
+            text=text,
+            hoverinfo='text',
+        ))
+    fig.update_layout(legend_title_text="Fastest driver (minisectors)")
+    data = {'figure': fig.to_plotly_json(), 'traces': []}
+    if dominance['errors']:
+        raise PartialResult(data, dominance['errors'])
+    return data
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("figure.replay_base")
+def build_replay_base(session_info, version=None):
+    # Static part of the replay view: track outline and turn labels with
+    # the axes fixed to the extent of all car positions, plus the session
+    # time range. Car markers are drawn client-side from each frame.
+    index = get_position_index(*session_info)
+    session = get_cached_session(*session_info)
+    fastest = get_session_digest(*session_info)['fastest']
+    timed = [d for d in fastest if fastest[d]['Lap'] is not None]
+    reference_tel = None
+    errors = {}
+    if timed:
+        reference = min(timed, key=lambda d: fastest[d]['Lap'])
+        extracted = extract_fastest_laps(session_info, session, [reference])
+        log_errors("replay", extracted)
+        reference_tel, errors = extracted.data.get(reference), extracted.errors
+    fig = _track_base_figure(session, reference_tel, "Race Replay")
+    if len(index.x):
+        margin = 0.05 * max(float(np.ptp(index.x)), float(np.ptp(index.y)))
+        fig.update_layout(
+            xaxis_range=[float(index.x.min()) - margin, float(index.x.max()) + margin],
+            yaxis_range=[float(index.y.min()) - margin, float(index.y.max()) + margin],
+            showlegend=False,
+        )
+    colors = px.colors.qualitative.Plotly
+    data = {
+        'figure': fig.to_plotly_json(),
+        'drivers': index.drivers,
+        'colors': [colors[d % len(colors)] for d in range(len(index.drivers))],
+        'start': index.start,
+        'end': index.end,
+    }
+    if errors:
+        raise PartialResult(data, errors)
+    return data
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("figure.season")
+def build_season_figures(year, updated):
+    # Season trends from the per-round aggregates (app/season.py); never
+    # loads a session. ``updated`` is the aggregates' timestamp, so the memo
+    # is refreshed when rounds are added.
+    rounds = completed_rounds(load_season(year))
+    labels = [f"R{r} {agg['event']}" if agg.get('event') else f"R{r}" for r, agg in rounds]
+
+    gap_fig = go.Figure()
+    drivers = sorted({d for _, agg in rounds for d in agg['gap_to_pole']})
+    colors = px.colors.qualitative.Plotly
+    for d, driver in enumerate(drivers):
+        gap_fig.add_trace(go.Scatter(
+            x=labels, y=[agg['gap_to_pole'].get(driver) for _, agg in rounds],
+            mode='lines+markers', name=driver, line=dict(color=colors[d % len(colors)]),
+        ))
+    gap_fig.update_layout(title=f"{year} Qualifying Gap to Pole", yaxis_title="Gap (s)",
+                          xaxis_title="Round", legend_title_text="Driver")
+
+    # Race pace per compound relative to each round's overall median, as
+    # absolute lap times are not comparable between circuits.
+    pace_fig = go.Figure()
+    compounds = sorted({c for _, agg in rounds for c in agg['race_pace']['field']})
+    for compound in compounds:
+        deltas = []
+        for _, agg in rounds:
+            pace = agg['race_pace']
+            entry = pace['field'].get(compound)
+            deltas.append(round(entry['median'] - pace['median'], 3) if entry and pace['median'] else None)
+        pace_fig.add_trace(go.Scatter(
+            x=labels, y=deltas, mode='lines+markers', name=compound,
+            line=dict(color=COMPOUND_COLORS.get(compound, COMPOUND_COLORS['UNKNOWN'])),
+        ))
+    pace_fig.update_layout(title=f"{year} Race Pace by Compound (vs. race median)",
+                           yaxis_title="Median lap delta (s)", xaxis_title="Round",
+                           legend_title_text="Compound")
+
+    # Race pace against qualifying pace puts every circuit on one scale.
+    points = [(label, agg) for label, (_, agg) in zip(labels, rounds)
+              if agg['pole'] and agg['race_pace']['median'] and agg['weather']['track_temp'] is not None]
+    weather_fig = go.Figure(go.Scatter(
+        x=[agg['weather']['track_temp'] for _, agg in points],
+        y=[round((agg['race_pace']['median'] / agg['pole'] - 1) * 100, 2) for _, agg in points],
+        mode='markers+text',
+        text=[label for label, _ in points],
+        textposition='top center',
+        marker=dict(size=10, color=[agg['weather']['air_temp'] for _, agg in points],
+                    colorscale='Thermal', showscale=True, colorbar=dict(title="Air (°C)")),
+    ))
+    weather_fig.update_layout(title=f"{year} Track Temperature vs Race Pace",
+                              xaxis_title="Mean track temperature (°C)",
+                              yaxis_title="Median race lap vs pole (%)")
+    return gap_fig, pace_fig, weather_fig
+
+
+@lru_cache(maxsize=1)
+def _template_json():
+    return go.Figure().layout.template.to_plotly_json()
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("figure.weather")
+def build_weather_figure(session_info, version=None):
+    weather = get_session_digest(*session_info)['weather']
+    weather_df = pd.DataFrame({
+        'Time': pd.to_timedelta(pd.Series(weather['Time'], dtype='float64'), unit='s'),
+        'AirTemp': pd.Series(weather['AirTemp'], dtype='float64'),
+        'TrackTemp': pd.Series(weather['TrackTemp'], dtype='float64'),
+    })
+    return px.line(weather_df, x='Time', y=['AirTemp', 'TrackTemp'],
+                   labels={'value': 'Temperature (°C)', 'Time': 'Session Time'},
+                   title="Air vs Track Temperature Over Time")
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("figure.sector_chart")
+def build_sector_chart(session_info, drivers, version=None):
+    fastest = get_session_digest(*session_info)['fastest']
+    sector_data = []
+
+    for driver in drivers:
+        lap = fastest.get(driver)
+        if lap is None:
+            continue  # no timed lap
+        sector_data.append({
+            "Driver": driver,
+            "Sector 1": lap['Sector1'],
+            "Sector 2": lap['Sector2'],
+            "Sector 3": lap['Sector3']
+        })
+
+    df_sectors = pd.DataFrame(sector_data)
+
+    sector_fig = px.bar(
+        df_sectors,
+        x='Driver',
+        y=['Sector 1', 'Sector 2', 'Sector 3'],
+        title="Sector Time Comparison (s)",
+        labels={"value": "Time (s)", "variable": "Sector"},
+        barmode="stack"
+    )
+
+    sector_fig.update_layout(legend_title_text='Sector')
+    return sector_fig
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+@instrument("table.sectors")
+def build_sector_table(session_info, drivers, version=None):
+    sectors = pd.DataFrame(get_session_digest(*session_info)['sectors'])
+    return sector_table_from_seconds(sectors, drivers)
+
+
+MEMOIZED_BUILDERS = {
+    'telemetry': build_telemetry_data,
+    'track_map': build_track_data,
+    'dominance': build_dominance_data,
+    'replay_base': build_replay_base,
+    'season': build_season_figures,
+    'weather': build_weather_figure,
+    'sector_chart': build_sector_chart,
+    'sector_table': build_sector_table,
+}
+
+
+def clear_memo():
+    # In-process memos only: the figure cache's disk tier is shared with the
+    # other workers and keyed on the session version anyway.
+    for builder in MEMOIZED_BUILDERS.values():
+        builder.cache_clear()
+    figure_cache.clear()
@@ -0,0 +1,91 @@
+import importlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from dash import DiskcacheManager
+
+# Long session loads run as Dash background callbacks on a local, disk-backed
+# job manager, so a cold load holds a job process instead of a web worker.
+# The job warms the on-disk tiers (session snapshot, telemetry shards) that
+# the web workers then attach to.
+
+JOBS_DIR = os.environ.get("F1_JOBS_DIR", os.path.join("app", "cache_dir", "jobs"))
+
+LOAD_STAGES = ("timing", "laps", "weather", "telemetry")
+STAGE_LABELS = {
+    "timing": "Resolving event schedule",
+    "laps": "Loading timing and laps",
+    "weather": "Loading weather",
+    "telemetry": "Preparing telemetry",
+}
+
+logger = logging.getLogger(__name__)
+
+_progress = ContextVar("load_progress", default=None)
+
+
+class LazyDiskcacheManager(DiskcacheManager):
+    # DiskcacheManager whose job cache (a directory and a SQLite database)
+    # is opened on first use rather than when the callbacks are registered,
+    # so importing the app creates nothing on disk.
+
+    def __init__(self, directory, cache_by=None, expire=None):
+        # Missing job dependencies surface here, not in the first job.
+        for module in ("diskcache", "multiprocess", "psutil"):
+            importlib.import_module(module)
+
+        self.directory = directory
+        self.expire = expire
+        self._handle = None
+        self._handle_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+        # DiskcacheManager.__init__ would open the cache right away.
+        super(DiskcacheManager, self).__init__(cache_by)
+
+    def _after_fork(self):
+        self._handle_lock = threading.Lock()
+
+    @property
+    def handle(self):
+        with self._handle_lock:
+            if self._handle is None:
+                import diskcache
+                self._handle = diskcache.Cache(self.directory)
+            return self._handle
+
+    def make_job_fn(self, fn, progress, key=None):
+        def job_fn(*args):
+            return DiskcacheManager.make_job_fn(self, fn, progress, key)(*args)
+        return job_fn
+
+
+def background_manager():
+    # DiskcacheManager needs dash[diskcache] (diskcache, multiprocess,
+    # psutil). Without it the load runs in the request as before.
+    try:
+        return LazyDiskcacheManager(JOBS_DIR)
+    except ImportError as e:
+        logger.info("Background callbacks disabled, session loads run in the request: %s", e)
+        return None
+
+
+@contextmanager
+def reporting_progress(set_progress):
+    # Routes report_stage() calls made while loading to the background
+    # callback's ``set_progress``.
+    token = _progress.set(set_progress)
+    try:
+        yield
+    finally:
+        _progress.reset(token)
+
+
+def report_stage(stage):
+    set_progress = _progress.get()
+    if set_progress is None:
+        return
+    done = LOAD_STAGES.index(stage)
+    set_progress((int(100 * done / len(LOAD_STAGES)), STAGE_LABELS[stage]))
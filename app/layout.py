@@ -53,6 +53,8 @@ layout = dbc.Container([
                     dbc.Button("Load Session", id='load-button', n_clicks=0, color='danger'),
                 ], width=2,className="d-flex align-items-end")
             ], className="mb-3"),
+            dbc.Progress(id='load-progress', value=0, label="", striped=True, animated=True,
+                         color='danger', style={'display': 'none'}),
         ])
     ], color="dark", className="mb-4"),
 
@@ -88,6 +90,9 @@ layout = dbc.Container([
     ], className="mb-4"),
 
     html.Div(id='session-store', style={'display': 'none'}),
+    # All channels of the selected laps, switched client-side.
+    dcc.Store(id='telemetry-data'),
+    dcc.Store(id='track-map-data'),
 
     # Plot
     dbc.Row([
@@ -128,12 +133,99 @@ layout = dbc.Container([
                 ),
                 dbc.Collapse(
                     dbc.CardBody([
+                        dbc.RadioItems(
+                            id='track-map-mode',
+                            options=[
+                                {'label': 'Selected drivers', 'value': 'drivers'},
+                                {'label': 'Minisector dominance (all drivers)', 'value': 'dominance'}
+                            ],
+                            value='drivers',
+                            inline=True,
+                            className="mb-2"
+                        ),
                         dcc.Graph(id='track-map')
                     ]),
                     id={"type": "collapse-body", "section": "track"},
                     is_open=True
                 )
             ], color="dark", inverse=True, className="shadow-sm mb-4")
+        ], width=12),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader(
+                    dbc.Row([
+                        dbc.Col(html.H5("Race Replay", className="mb-0"), width="auto"),
+                        dbc.Col(
+                            html.Button("▼", id={"type": "collapse-toggle", "section": "replay"}, className="btn btn-sm btn-secondary",
+                                        n_clicks=0),
+                            width="auto",
+                            style={"textAlign": "right"}
+                        )
+                    ], justify="between")
+                ),
+                dbc.Collapse(
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col(
+                                html.Button("▶ Play", id='replay-play', className="btn btn-sm btn-primary", n_clicks=0),
+                                width="auto"
+                            ),
+                            dbc.Col(
+                                dcc.Dropdown(
+                                    id='replay-speed',
+                                    options=[
+                                        {'label': '1x', 'value': 1},
+                                        {'label': '4x', 'value': 4},
+                                        {'label': '16x', 'value': 16},
+                                        {'label': '64x', 'value': 64}
+                                    ],
+                                    value=16,
+                                    clearable=False,
+                                    style={'width': '90px', 'color': 'black'}
+                                ),
+                                width="auto"
+                            ),
+                            dbc.Col(
+                                dcc.Slider(id='replay-time', min=0, max=1, value=0, step=0.25, marks=None,
+                                           updatemode='drag'),
+                            )
+                        ], align="center", className="mb-2"),
+                        dcc.Graph(id='replay-map'),
+                        dcc.Interval(id='replay-interval', interval=250, disabled=True),
+                        dcc.Store(id='replay-data'),
+                        dcc.Store(id='replay-frame')
+                    ]),
+                    id={"type": "collapse-body", "section": "replay"},
+                    # Opening the card builds the session's position index.
+                    is_open=False
+                )
+            ], color="dark", inverse=True, className="shadow-sm mb-4")
+        ], width=12),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader(
+                    dbc.Row([
+                        dbc.Col(html.H5("Season Trends", className="mb-0"), width="auto"),
+                        dbc.Col(
+                            html.Button("▼", id={"type": "collapse-toggle", "section": "season"}, className="btn btn-sm btn-secondary",
+                                        n_clicks=0),
+                            width="auto",
+                            style={"textAlign": "right"}
+                        )
+                    ], justify="between")
+                ),
+                dbc.Collapse(
+                    dbc.CardBody([
+                        html.Div(id='season-status', className="text-muted mb-2"),
+                        dcc.Graph(id='season-gap-plot'),
+                        dcc.Graph(id='season-pace-plot'),
+                        dcc.Graph(id='season-weather-plot')
+                    ]),
+                    id={"type": "collapse-body", "section": "season"},
+                    # Season of the year input, from the precomputed aggregates.
+                    is_open=False
+                )
+            ], color="dark", inverse=True, className="shadow-sm mb-4")
         ], width=12),
             dbc.Col(
                 dbc.Card([
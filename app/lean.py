@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# Lean in-memory form of a loaded session for memory-constrained hosts:
+# telemetry keeps only the columns the views read, downcast to float32/int8,
+# and the repeated strings of the lap table become categoricals.
+
+CAR_COLUMNS = {
+    'SessionTime': None,
+    'Speed': np.float32,
+    'RPM': np.float32,
+    'Throttle': np.float32,
+    'Brake': bool,
+    'nGear': np.int8,
+    'DRS': np.int8,
+}
+POS_COLUMNS = {
+    'SessionTime': None,
+    'X': np.float32,
+    'Y': np.float32,
+}
+CATEGORICAL_LAP_COLUMNS = ('Driver', 'Compound', 'Team')
+
+
+def _slim(frame, columns):
+    keep = [c for c in columns if c in frame.columns]
+    frame = frame.loc[:, keep]
+    dtypes = {c: dtype for c, dtype in columns.items() if dtype is not None and c in keep}
+    return frame.astype(dtypes) if dtypes else frame
+
+
+def slim_car_data(tel):
+    return _slim(tel, CAR_COLUMNS)
+
+
+def slim_pos_data(tel):
+    return _slim(tel, POS_COLUMNS)
+
+
+def _downcast_floats(frame):
+    floats = frame.select_dtypes(include='float64').columns
+    return frame.astype({c: np.float32 for c in floats}) if len(floats) else frame
+
+
+def slim_laps(laps):
+    laps = _downcast_floats(laps)
+    categorical = {c: 'category' for c in CATEGORICAL_LAP_COLUMNS
+                   if c in laps.columns and not isinstance(laps[c].dtype, pd.CategoricalDtype)}
+    return laps.astype(categorical) if categorical else laps
+
+
+def slim_session(session):
+    # In place, on the private slots FastF1 fills during load().
+    if getattr(session, '_laps', None) is not None:
+        session._laps = slim_laps(session._laps)
+    weather = getattr(session, '_weather_data', None)
+    if weather is not None:
+        session._weather_data = _downcast_floats(weather)
+    for attr, slim in (('_car_data', slim_car_data), ('_pos_data', slim_pos_data)):
+        telemetry = getattr(session, attr, None)
+        if telemetry:
+            setattr(session, attr, {drv: slim(tel) for drv, tel in telemetry.items()})
+    return session
@@ -0,0 +1,36 @@
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines; gunicorn deployments are POSIX
+    fcntl = None
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+@contextmanager
+def file_lock(path, timeout=300.0, poll=0.1):
+    # Inter-process exclusive lock on ``path`` (created if missing), used so
+    # only one gunicorn worker builds a given on-disk snapshot while the
+    # others wait and then read it.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+") as handle:
+        if fcntl is not None:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() > deadline:
+                        raise LockTimeout(f"Timed out waiting for {path}")
+                    time.sleep(poll)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
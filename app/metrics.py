@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Stage timings, sizes and cache counters for the hot paths, exposed in the
+# Prometheus text format on /metrics. Stdlib only, so the dashboard does not
+# grow a hard dependency on prometheus_client.
+
+TRACE_MEMORY = os.environ.get("F1_METRICS_TRACEMALLOC", "0") == "1"
+TIMING_HEADER = os.environ.get("F1_TIMING_HEADER", "0") == "1"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Registry:
+    """Thread-safe store of counters, gauges and histograms."""
+
+    def __init__(self):
+        self._counters = {}    # (name, labels) -> value
+        self._gauges = {}      # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> _Histogram
+        self._help = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collect):
+        # ``collect()`` yields (name, kind, help, labels, value) samples read
+        # at scrape time, for state that already lives elsewhere (cache stats).
+        self._collectors.append(collect)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render(self):
+        families = {}
+
+        def family(name, kind, text=None):
+            if name not in families:
+                kind, text = self._help.get(name, (kind, text or name))
+                families[name] = [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            return families[name]
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                family(name, "counter").append(f"{name}{_labels(dict(labels))} {value}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                family(name, "gauge").append(f"{name}{_labels(dict(labels))} {value}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                lines = family(name, "histogram")
+                labels = dict(labels)
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {h.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+
+        for collect in self._collectors:
+            for name, kind, text, labels, value in collect():
+                family(name, kind, text).append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.after_fork)
+registry.describe("f1_stage_duration_seconds", "histogram", "Wall time of instrumented stages")
+registry.describe("f1_stage_errors_total", "counter", "Instrumented stages that raised")
+registry.describe("f1_stage_peak_alloc_bytes", "gauge", "Peak Python allocation of the last run of a stage")
+registry.describe("f1_payload_bytes", "histogram", "Serialized size of callback responses, by output")
+registry.describe("f1_http_request_duration_seconds", "histogram", "Wall time of HTTP requests")
+
+_local = threading.local()
+
+
+@contextmanager
+def timed(stage):
+    # Times the block under ``stage`` and counts it as an error if it raises.
+    # With F1_METRICS_TRACEMALLOC=1 the outermost stage on a thread also
+    # records its peak allocation; tracemalloc is process wide, so peaks of
+    # concurrent requests overlap and are an upper bound.
+    outermost = TRACE_MEMORY and not getattr(_local, "depth", 0)
+    if outermost:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    _local.depth = getattr(_local, "depth", 0) + 1
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        registry.inc("f1_stage_errors_total", stage=stage)
+        raise
+    finally:
+        registry.observe("f1_stage_duration_seconds", time.perf_counter() - start, stage=stage)
+        _local.depth -= 1
+        if outermost:
+            registry.set("f1_stage_peak_alloc_bytes", tracemalloc.get_traced_memory()[1], stage=stage)
+
+
+def instrument(stage):
+    # Decorator form of ``timed``.
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _cache_samples():
+    # Hit/miss counters kept by the caches themselves, read at scrape time.
+    from .figure_cache import figure_cache
+    from .figures import MEMOIZED_BUILDERS
+    from .session_cache import process_rss, session_cache
+    from .utils import session_loads
+
+    stats = session_cache.stats()
+    for result, field in (("hit", "hits"), ("miss", "misses")):
+        yield ("f1_session_cache_requests_total", "counter", "Session cache lookups",
+               {"result": result}, stats[field])
+    yield ("f1_session_cache_evictions_total", "counter", "Sessions evicted from the cache", {}, stats["evictions"])
+    yield ("f1_session_cache_bytes", "gauge", "Estimated size of cached sessions", {}, stats["bytes"])
+    yield ("f1_session_cache_entries", "gauge", "Sessions in the cache", {}, stats["entries"])
+    yield ("f1_session_cache_ceiling_evictions_total", "counter",
+           "Sessions evicted because the process exceeded its memory ceiling", {}, stats["ceiling_evictions"])
+    rss = process_rss()
+    if rss is not None:
+        yield ("f1_process_resident_bytes", "gauge", "Resident memory of this process", {}, rss)
+
+    loads = session_loads.stats()
+    yield ("f1_session_loads_total", "counter", "Session loads executed", {}, loads["executions"])
+    yield ("f1_session_loads_coalesced_total", "counter", "Requests that joined an in-flight load", {},
+           loads["coalesced"])
+
+    figures = figure_cache.stats()
+    for result, field in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses")):
+        yield ("f1_figure_cache_requests_total", "counter", "Shared figure cache lookups",
+               {"result": result}, figures[field])
+    yield ("f1_figure_cache_evictions_total", "counter", "Figures evicted from the shared figure cache", {},
+           figures["evictions"])
+    yield ("f1_figure_cache_bytes", "gauge", "Compressed size of the figure cache's memory tier", {},
+           figures["bytes"])
+
+    for name, builder in MEMOIZED_BUILDERS.items():
+        info = builder.cache_info()
+        for result, value in (("hit", info.hits), ("miss", info.misses)):
+            yield ("f1_figure_memo_requests_total", "counter", "Figure memo lookups",
+                   {"builder": name, "result": result}, value)
+
+
+def register_metrics(server):
+    # /metrics for Prometheus, plus an opt-in timing header (F1_TIMING_HEADER=1)
+    # for eyeballing individual requests in the browser dev tools.
+    from flask import Response, g, request
+
+    registry.add_collector(_cache_samples)
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None or request.path == "/metrics":
+            return response
+        elapsed = time.perf_counter() - start
+        # Route patterns rather than raw paths keep label cardinality bounded.
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        registry.observe("f1_http_request_duration_seconds", elapsed, route=route)
+        if request.path.endswith("/_dash-update-component") and response.status_code == 200:
+            # Dash has already serialized the figure; its size comes for free.
+            body = request.get_json(silent=True) or {}
+            registry.observe("f1_payload_bytes", response.calculate_content_length() or 0,
+                             buckets=BYTES_BUCKETS, output=body.get("output", "unknown"))
+        if TIMING_HEADER:
+            response.headers["Server-Timing"] = f"app;dur={elapsed * 1000:.1f}"
+            response.headers["X-Response-Time"] = f"{elapsed * 1000:.1f}ms"
+        return response
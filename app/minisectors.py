@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+
+from .extraction import ensure_shards
+from .metrics import instrument
+from .session_cache import session_key
+from .telemetry_store import telemetry_store
+
+# Minisector dominance: the lap is split into N equal-distance minisectors
+# and every minisector goes to the driver whose fastest lap got through it
+# quickest. Only Distance/Time of one lap per driver are read from the
+# store shards, so it covers the whole field cheaply.
+MINISECTORS = int(os.environ.get("F1_MINISECTORS", "25"))
+
+
+def crossing_times(laps, n):
+    # ``laps`` is a list of (distance, lap time) arrays, one per driver.
+    # Each lap gets its own [0, 1] distance scale (integrated lap distances
+    # differ by a few metres between drivers) and is shifted by 2 * i, so
+    # all laps form one increasing axis and a single np.interp yields the
+    # time at which every driver crosses every minisector edge.
+    edges = np.linspace(0.0, 1.0, n + 1)
+    xs, ts = [], []
+    for i, (distance, time) in enumerate(laps):
+        # Every lap starts at distance 0 at lap time 0.
+        xs += [[2.0 * i], distance / distance[-1] + 2.0 * i]
+        ts += [[0.0], time]
+    queries = (edges + 2.0 * np.arange(len(laps))[:, None]).ravel()
+    crossings = np.interp(queries, np.concatenate(xs), np.concatenate(ts))
+    return crossings.reshape(len(laps), n + 1)
+
+
+def minisector_index(fraction, n):
+    # Minisector of each point at ``fraction`` of the lap distance.
+    return np.clip((np.asarray(fraction) * n).astype(int), 0, n - 1)
+
+
+@instrument("minisectors.dominance")
+def minisector_dominance(session_info, session, fastest_laps, n=MINISECTORS):
+    # ``fastest_laps`` maps driver -> lap number. Returns the per-driver
+    # minisector times, the winner of every minisector and the track
+    # position of the overall fastest lap, tagged with its minisectors, plus
+    # the drivers whose telemetry failed to extract.
+    key = session_key(*session_info)
+    failed = ensure_shards(session_info, session, list(fastest_laps))
+    drivers, laps = [], []
+    for driver, lap_number in fastest_laps.items():
+        if driver in failed:
+            continue
+        try:
+            tel = telemetry_store.get_lap(key, session, driver, lap_number, ('Distance', 'Time'))
+        except KeyError:
+            continue
+        if tel is None or len(tel['Distance']) < 2 or not tel['Distance'][-1] > 0:
+            continue
+        drivers.append(driver)
+        laps.append((np.asarray(tel['Distance'], dtype=np.float64), np.asarray(tel['Time'], dtype=np.float64)))
+    if not drivers:
+        raise ValueError("No fastest-lap telemetry to compare")
+
+    times = np.diff(crossing_times(laps, n), axis=1)
+    winners = np.argmin(times, axis=0)
+    reference = drivers[int(np.argmin(times.sum(axis=1)))]
+    positions = telemetry_store.get_lap_positions(key, session, reference, fastest_laps[reference], ('Distance',))
+    distance = np.asarray(positions['Distance'], dtype=np.float64)
+    fraction = distance / distance[-1] if len(distance) and distance[-1] > 0 else np.zeros_like(distance)
+    return {
+        'drivers': drivers,
+        'times': times,
+        'winners': [drivers[w] for w in winners],
+        'reference': reference,
+        'X': np.asarray(positions['X']),
+        'Y': np.asarray(positions['Y']),
+        'minisector': minisector_index(fraction, n),
+        'errors': failed,
+    }
@@ -0,0 +1,255 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .digest import get_session_digest
+from .locks import file_lock
+from .metrics import instrument
+from .session_cache import session_cache, session_key
+from .telemetry_store import session_fingerprint, telemetry_store
+from .utils import ensure_driver_telemetry, get_cached_session
+
+# Time-indexed car positions of a whole session, for the replay view. Built
+# once from the position data of every driver and kept as flat, time-sorted
+# arrays on disk next to the telemetry shards; a frame at any session time
+# is then a binary search per driver plus a linear interpolation, never a
+# DataFrame filter.
+
+INDEX_FILE = "positions.npz"
+INDEX_VERSION = 1
+MEMORY_ENTRIES = 4
+# Cars without a position sample within this many seconds of the requested
+# time (in the garage, retired, data gaps) are left out of the frame.
+MAX_GAP = 5.0
+# Seconds a remembered index is served before its fingerprint is checked
+# again: a replay plays many frames a second, a fingerprint is a listdir and
+# a stat per cache file.
+FRESHNESS_INTERVAL = float(os.environ.get("F1_REPLAY_FRESHNESS_INTERVAL", "30"))
+
+logger = logging.getLogger(__name__)
+
+_memory = OrderedDict()  # session key -> (index, last freshness check)
+_lock = threading.Lock()
+
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+class PositionIndex:
+    # One contiguous block of samples per driver, in ``drivers`` order, with
+    # ``offsets`` delimiting the blocks (and ``lap_offsets`` the blocks of
+    # lap start times). Times are session seconds. Shifting every block by
+    # driver * span makes the whole key array sorted, so a single
+    # searchsorted locates one time in every driver's block at once.
+
+    def __init__(self, drivers, offsets, time, x, y, lap_offsets, lap_starts, lap_numbers, fingerprint):
+        self.drivers = list(drivers)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.time = np.asarray(time, dtype=np.float64)
+        self.x = np.asarray(x, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32)
+        self.lap_offsets = np.asarray(lap_offsets, dtype=np.int64)
+        self.lap_starts = np.asarray(lap_starts, dtype=np.float64)
+        self.lap_numbers = np.asarray(lap_numbers, dtype=np.int16)
+        self.fingerprint = fingerprint
+
+        self.start = float(self.time.min()) if len(self.time) else 0.0
+        self.end = float(self.time.max()) if len(self.time) else 0.0
+        # Shifts must keep lap starts (which may precede the first position
+        # sample) inside their driver's block as well.
+        every = np.concatenate([self.time, self.lap_starts])
+        self._origin = float(every.min()) if len(every) else 0.0
+        self.span = (float(every.max()) if len(every) else 0.0) - self._origin + 1.0
+        self._keys = self._shift(self.time, self.offsets)
+        self._lap_keys = self._shift(self.lap_starts, self.lap_offsets)
+
+    def _shift(self, values, offsets):
+        block = np.repeat(np.arange(len(self.drivers)), np.diff(offsets))
+        return values - self._origin + block * self.span
+
+    def _queries(self, t):
+        return t - self._origin + np.arange(len(self.drivers)) * self.span
+
+    def frame(self, t):
+        # Interpolated position of every car at session time ``t``; cars
+        # that are not on track have None coordinates.
+        t = float(t)
+        if not len(self.time):
+            return {'t': t, 'drivers': self.drivers, 'x': [], 'y': [], 'lap': []}
+        first, last = self.offsets[:-1], self.offsets[1:] - 1
+        has_data = last >= first
+        first_c, last_c = np.minimum(first, last), np.maximum(last, first)
+        hi = np.clip(np.searchsorted(self._keys, self._queries(t), side='left'), first_c, last_c)
+        lo = np.clip(hi - 1, first_c, last_c)
+
+        t_lo, t_hi = self.time[lo], self.time[hi]
+        dt = t_hi - t_lo
+        w = np.clip(np.divide(t - t_lo, dt, out=np.zeros_like(dt), where=dt > 0), 0.0, 1.0)
+        x = self.x[lo] + w * (self.x[hi] - self.x[lo])
+        y = self.y[lo] + w * (self.y[hi] - self.y[lo])
+        on_track = has_data & (t >= self.time[first_c]) & (t <= self.time[last_c]) & (dt <= MAX_GAP)
+
+        # Laps started by ``t``: the last lap start at or before it.
+        lap_first = self.lap_offsets[:-1]
+        started = np.searchsorted(self._lap_keys, self._queries(t), side='right') - lap_first
+        lap_index = np.clip(lap_first + started - 1, 0, max(len(self.lap_numbers) - 1, 0))
+        laps = np.where(started > 0, self.lap_numbers[lap_index] if len(self.lap_numbers) else 0, 0)
+
+        return {
+            't': t,
+            'drivers': self.drivers,
+            'x': [float(v) if ok else None for v, ok in zip(x, on_track)],
+            'y': [float(v) if ok else None for v, ok in zip(y, on_track)],
+            'lap': [int(v) for v in laps],
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(
+            tmp,
+            version=np.array(INDEX_VERSION),
+            fingerprint=np.array(self.fingerprint or ""),
+            drivers=np.array(self.drivers),
+            offsets=self.offsets,
+            time=self.time,
+            x=self.x,
+            y=self.y,
+            lap_offsets=self.lap_offsets,
+            lap_starts=self.lap_starts,
+            lap_numbers=self.lap_numbers,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != INDEX_VERSION:
+                    return None
+                return cls(
+                    data['drivers'].tolist(), data['offsets'], data['time'], data['x'], data['y'],
+                    data['lap_offsets'], data['lap_starts'], data['lap_numbers'], str(data['fingerprint']),
+                )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable position index %s: %s", path, e)
+            return None
+
+
+def _seconds(column):
+    return pd.to_timedelta(column).dt.total_seconds().to_numpy(dtype=np.float64)
+
+
+def build_position_index(session, drivers, fingerprint=None):
+    laps = session.laps
+    pos_data = session.pos_data
+    names, times, xs, ys, counts = [], [], [], [], []
+    lap_starts, lap_numbers, lap_counts = [], [], []
+    for driver in drivers:
+        driver_laps = laps.pick_drivers(driver)
+        if driver_laps.empty:
+            continue
+        pos = pos_data.get(driver_laps['DriverNumber'].iloc[0])
+        if pos is None:
+            continue
+        t = _seconds(pos['SessionTime'])
+        x = pos['X'].to_numpy(dtype=np.float32)
+        y = pos['Y'].to_numpy(dtype=np.float32)
+        valid = ~(np.isnan(t) | np.isnan(x) | np.isnan(y))
+        order = np.argsort(t[valid], kind='stable')
+        names.append(driver)
+        times.append(t[valid][order])
+        xs.append(x[valid][order])
+        ys.append(y[valid][order])
+        counts.append(int(valid.sum()))
+
+        started = driver_laps[driver_laps['LapStartTime'].notna()]
+        starts = _seconds(started['LapStartTime'])
+        order = np.argsort(starts, kind='stable')
+        lap_starts.append(starts[order])
+        lap_numbers.append(started['LapNumber'].to_numpy(dtype=np.int16)[order])
+        lap_counts.append(len(starts))
+
+    def concat(parts, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+    return PositionIndex(
+        names,
+        np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]),
+        concat(times, np.float64), concat(xs, np.float32), concat(ys, np.float32),
+        np.concatenate([[0], np.cumsum(lap_counts, dtype=np.int64)]),
+        concat(lap_starts, np.float64), concat(lap_numbers, np.int16),
+        fingerprint,
+    )
+
+
+def _index_path(key):
+    return os.path.join(telemetry_store.session_dir(key), INDEX_FILE)
+
+
+def _is_current(key, index):
+    # As for the digest, only checked when the session is in memory anyway.
+    session = session_cache.peek(key)
+    return session is None or index.fingerprint == session_fingerprint(session)
+
+
+def _remember(key, index):
+    with _lock:
+        _memory[key] = (index, time.monotonic())
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+@instrument("replay.index")
+def get_position_index(year, rnd, session_type):
+    key = session_key(year, rnd, session_type)
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+    if entry is not None:
+        index, checked = entry
+        if time.monotonic() - checked < FRESHNESS_INTERVAL:
+            return index
+        if _is_current(key, index):
+            _remember(key, index)
+            return index
+
+    path = _index_path(key)
+    index = PositionIndex.load(path)
+    if index is None or not _is_current(key, index):
+        with file_lock(f"{path}.lock"):
+            index = PositionIndex.load(path)
+            if index is None or not _is_current(key, index):
+                session = get_cached_session(*key)
+                drivers = get_session_digest(*key)['drivers']
+                # Every driver's position data, loaded in one batch.
+                ensure_driver_telemetry(key, session, drivers)
+                index = build_position_index(session, drivers, session_fingerprint(session))
+                try:
+                    index.save(path)
+                except Exception as e:
+                    logger.warning("Could not write position index %s: %s", path, e)
+    _remember(key, index)
+    return index
+
+
+def invalidate_position_index(key=None):
+    with _lock:
+        if key is None:
+            _memory.clear()
+        else:
+            _memory.pop(key, None)
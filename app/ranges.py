@@ -0,0 +1,14 @@
+def parse_range(text, first=None, last=None):
+    # "2023", "1-5" or "1,3,7-9" -> sorted list of ints; ValueError when
+    # malformed. With bounds, every range is clipped to ``first``..``last``
+    # before it is expanded, so an absurd range costs no more than those.
+    values = set()
+    for part in filter(None, text.split(",")):
+        lo, _, hi = part.partition("-")
+        lo, hi = int(lo), int(hi or lo)
+        if first is not None:
+            lo = max(lo, first)
+        if last is not None:
+            hi = min(hi, last)
+        values.update(range(lo, hi + 1))
+    return sorted(values)
@@ -0,0 +1,205 @@
+"""Season-wide pace aggregates.
+
+Each round of a season is reduced to a few kilobytes: every driver's
+qualifying gap to pole, race pace per compound and the race weather. The
+aggregates of a year live in one JSON file; rounds are computed in a
+process pool and only rounds that are not in the file yet are computed,
+so adding a round after a race weekend leaves the others alone. The
+season view of the dashboard renders from this file only.
+
+    python -m app.season update 2024 --workers 4
+    python -m app.season update 2024 --rounds 18 --force
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .locks import file_lock
+from .ranges import parse_range
+
+SEASON_DIR = os.environ.get("F1_SEASON_DIR", os.path.join("app", "cache_dir", "season"))
+SEASON_VERSION = 1
+QUALI, RACE = "Q", "R"
+
+logger = logging.getLogger(__name__)
+
+
+def _season_path(year):
+    return os.path.join(SEASON_DIR, f"{int(year)}.json")
+
+
+def compound_pace(laps):
+    # Median quick-lap time per compound, for the field and per driver;
+    # in- and out-laps and laps slower than 107% of the best are left out.
+    quick = laps.pick_wo_box().pick_quicklaps()
+    frame = pd.DataFrame({
+        'Driver': quick['Driver'].astype(str).to_numpy(),
+        'Compound': quick['Compound'].astype(object).fillna('UNKNOWN').to_numpy(),
+        'LapTime': pd.to_timedelta(quick['LapTime']).dt.total_seconds().to_numpy(),
+    }).dropna(subset=['LapTime'])
+    field = frame.groupby('Compound')['LapTime'].agg(['median', 'size'])
+    drivers = frame.groupby(['Driver', 'Compound'])['LapTime'].median()
+    by_driver = {}
+    for (driver, compound), seconds in drivers.items():
+        by_driver.setdefault(driver, {})[compound] = round(float(seconds), 3)
+    return {
+        'field': {c: {'median': round(float(row['median']), 3), 'laps': int(row['size'])}
+                  for c, row in field.iterrows()},
+        'drivers': by_driver,
+        'median': round(float(frame['LapTime'].median()), 3) if len(frame) else None,
+    }
+
+
+def _mean(values):
+    values = np.asarray([v for v in values if v is not None], dtype=np.float64)
+    return round(float(values.mean()), 1) if len(values) else None
+
+
+def round_aggregates(year, rnd):
+    # Runs in a pool worker; importing app.utils enables the FastF1 cache.
+    from .digest import get_session_digest
+    from .utils import get_cached_session
+
+    result = {'status': 'ok', 'computed': time.time()}
+    quali = get_session_digest(year, rnd, QUALI)
+    laps = {d: lap['Lap'] for d, lap in quali['fastest'].items() if lap['Lap'] is not None}
+    pole = min(laps.values()) if laps else None
+    result['pole'] = pole
+    result['gap_to_pole'] = {d: round(t - pole, 3) for d, t in laps.items()}
+
+    race = get_session_digest(year, rnd, RACE)
+    session = get_cached_session(year, rnd, RACE)
+    result['event'] = getattr(session.event, 'EventName', None)
+    result['race_pace'] = compound_pace(session.laps)
+    result['weather'] = {
+        'air_temp': _mean(race['weather']['AirTemp']),
+        'track_temp': _mean(race['weather']['TrackTemp']),
+    }
+    return result
+
+
+def safe_round_aggregates(year, rnd):
+    try:
+        return round_aggregates(year, rnd)
+    except ValueError as e:
+        if "does not exist" not in str(e):
+            raise
+        return {'status': 'skipped', 'computed': time.time(), 'error': str(e)}
+
+
+def load_season(year):
+    try:
+        with open(_season_path(year)) as f:
+            season = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logger.warning("Ignoring unreadable season aggregates for %s: %s", year, e)
+        return None
+    return season if season.get('version') == SEASON_VERSION else None
+
+
+def _save_season(year, season):
+    path = _season_path(year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(season, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def past_rounds(year):
+    import fastf1
+
+    from .startup import ensure_cache
+
+    ensure_cache()
+    schedule = fastf1.get_event_schedule(year, include_testing=False)
+    past = schedule[schedule["EventDate"] < pd.Timestamp.now()]
+    return [int(r) for r in past["RoundNumber"]]
+
+
+def update_season(year, rounds=None, workers=0, force=False, work=safe_round_aggregates):
+    # Computes the rounds missing from the season file (all of ``rounds``
+    # with ``force``) and merges them in; every finished round is saved
+    # right away, so an interrupted update keeps its progress. Returns the
+    # updated season.
+    year = int(year)
+    rounds = past_rounds(year) if rounds is None else [int(r) for r in rounds]
+    path = _season_path(year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    season = load_season(year) or {'version': SEASON_VERSION, 'year': year, 'rounds': {}}
+    pending = [r for r in rounds if force or season['rounds'].get(str(r), {}).get('status') != 'ok']
+
+    def record(rnd, result):
+        # The lock covers one read-merge-write only, never the computation:
+        # a round takes minutes, and concurrent updaters (or a second
+        # year's update) must not wait on it, let alone time out. The file
+        # is re-read so rounds saved by another updater meanwhile are kept.
+        nonlocal season
+        with file_lock(f"{path}.lock"):
+            season = load_season(year) or {'version': SEASON_VERSION, 'year': year, 'rounds': {}}
+            season['rounds'][str(rnd)] = result
+            season['updated'] = time.time()
+            _save_season(year, season)
+        logger.info("Season %s round %s: %s", year, rnd, result['status'])
+
+    if workers <= 0:
+        for rnd in pending:
+            try:
+                result = work(year, rnd)
+            except Exception as e:
+                result = {'status': 'failed', 'computed': time.time(), 'error': str(e)}
+            record(rnd, result)
+    else:
+        # Spawned workers, as in prewarm.py.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(work, year, rnd): rnd for rnd in pending}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'status': 'failed', 'computed': time.time(), 'error': str(e)}
+                record(futures[future], result)
+    season.setdefault('updated', time.time())
+    return season
+
+
+def completed_rounds(season):
+    # (round number, aggregates) of every successfully computed round, in
+    # calendar order.
+    rounds = ((int(r), agg) for r, agg in (season or {}).get('rounds', {}).items())
+    return sorted(((r, agg) for r, agg in rounds if agg.get('status') == 'ok'), key=lambda item: item[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    update = commands.add_parser("update", help="compute the rounds missing from a season's aggregates")
+    update.add_argument("year", type=int)
+    update.add_argument("--rounds", help="e.g. 1-10 or 3,5,7 (default: every past round)")
+    update.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="worker processes; 0 runs in this process")
+    update.add_argument("--force", action="store_true", help="recompute rounds that are already done")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    rounds = parse_range(args.rounds) if args.rounds else None
+    season = update_season(args.year, rounds, args.workers, args.force)
+    done = completed_rounds(season)
+    print(f"{args.year}: {len(done)} rounds aggregated ({', '.join(str(r) for r, _ in done)})")
+    failed = [r for r, agg in season['rounds'].items() if agg['status'] == 'failed']
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
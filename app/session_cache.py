@@ -0,0 +1,171 @@
+import gc
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET_MB = int(os.environ.get("F1_SESSION_CACHE_MB", "1024"))
+# Resident memory of the whole process above which least recently used
+# sessions are evicted, independent of the estimate-based budget; 0 disables.
+MEMORY_CEILING_MB = int(os.environ.get("F1_MEMORY_CEILING_MB", "0"))
+
+
+def session_key(year, rnd, session_type):
+    return int(year), int(rnd), str(session_type).upper()
+
+
+def estimate_session_bytes(session):
+    # Rough footprint of the frames a loaded session holds on to. Attributes
+    # that were never loaded raise in FastF1, so only look at the private
+    # slots that are actually populated.
+    total = 0
+    for attr in ("_laps", "_weather_data", "_results"):
+        frame = getattr(session, attr, None)
+        if frame is not None and hasattr(frame, "memory_usage"):
+            total += int(frame.memory_usage(deep=True).sum())
+    for attr in ("_car_data", "_pos_data"):
+        for frame in (getattr(session, attr, None) or {}).values():
+            total += int(frame.memory_usage(deep=True).sum())
+    return total
+
+
+def process_rss():
+    # Resident set size of this process in bytes, or None where /proc is
+    # not available.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def release_telemetry(session):
+    # Drops the per-driver telemetry of an evicted session, so it is freed
+    # even while a request still holds on to the session object. Sessions
+    # that cannot reload it (bundles) keep theirs; load_driver_telemetry
+    # rebuilds it from the disk cache if a FastF1 session is used again.
+    if not getattr(session, "reloadable_telemetry", True):
+        return
+    for attr in ("_car_data", "_pos_data"):
+        if getattr(session, attr, None):
+            setattr(session, attr, {})
+
+
+class SessionCache:
+    """Process-wide LRU registry of loaded FastF1 sessions."""
+
+    def __init__(self, max_mb=DEFAULT_BUDGET_MB, memory_ceiling_mb=0, on_evict=None, rss=process_rss):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_rss_bytes = int(memory_ceiling_mb * 1024 * 1024)
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.ceiling_evictions = 0
+        self._rss = rss
+        self._entries = OrderedDict()  # key -> (session, size in bytes)
+        self._lock = threading.RLock()
+
+    def after_fork(self):
+        # A forked child (a background job) inherits the lock in whatever
+        # state the parent's threads left it.
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def current_bytes(self):
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        # Lookup without touching recency or the hit/miss counters.
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def put(self, key, session, size=None):
+        if size is None:
+            size = estimate_session_bytes(session)
+        with self._lock:
+            self._entries[key] = (session, size)
+            self._entries.move_to_end(key)
+            self._evict()
+        self._enforce_ceiling()
+
+    def get_or_load(self, key, loader):
+        session = self.get(key)
+        if session is None:
+            session = loader()
+            self.put(key, session)
+        return session
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(size for _, size in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "ceiling_evictions": self.ceiling_evictions,
+            }
+
+    def _evict(self):
+        # Always keep the most recently used session, even if it alone is
+        # larger than the budget; otherwise the caller would reload it on
+        # the very next interaction.
+        used = sum(size for _, size in self._entries.values())
+        while used > self.max_bytes and len(self._entries) > 1:
+            _, (session, size) = self._entries.popitem(last=False)
+            used -= size
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(session)
+
+    def _enforce_ceiling(self):
+        # Process memory only goes down once the evicted frames have been
+        # collected, so collect after every eviction before measuring again.
+        if not self.max_rss_bytes:
+            return
+        while True:
+            rss = self._rss()
+            if rss is None or rss <= self.max_rss_bytes:
+                return
+            with self._lock:
+                if len(self._entries) <= 1:
+                    return
+                _, (session, _) = self._entries.popitem(last=False)
+                self.evictions += 1
+                self.ceiling_evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(session)
+            del session
+            gc.collect()
+
+
+session_cache = SessionCache(memory_ceiling_mb=MEMORY_CEILING_MB, on_evict=release_telemetry)
+os.register_at_fork(after_in_child=session_cache.after_fork)
@@ -0,0 +1,64 @@
+import threading
+
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self.executions = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        # The first caller for ``key`` runs ``fn``; callers arriving while it
+        # runs wait for, and share, its result or exception.
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight load of {key}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def after_fork(self):
+        # In a forked child (a background job) the calls in flight in the
+        # parent never finish; later callers must not wait for them.
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
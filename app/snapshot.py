@@ -0,0 +1,65 @@
+import logging
+import os
+import pickle
+
+from .locks import file_lock
+from .telemetry_store import TELEMETRY_FILES, session_fingerprint, telemetry_store
+
+SNAPSHOT_FILE = "session.pkl"
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_path(key):
+    return os.path.join(telemetry_store.session_dir(key), SNAPSHOT_FILE)
+
+
+def _read(path, fingerprint):
+    try:
+        with open(path, 'rb') as f:
+            stored_fingerprint, session = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Truncated or written by another FastF1 version; rebuild it.
+        logger.warning("Ignoring unreadable session snapshot %s: %s", path, e)
+        return None
+    return session if stored_fingerprint == fingerprint else None
+
+
+def _write(path, session):
+    # Telemetry is never part of the snapshot; workers read it from the
+    # mmap'd store shards next to it.
+    fingerprint = session_fingerprint(session, exclude=TELEMETRY_FILES)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        pickle.dump((fingerprint, session), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def attach_session(key, session, load, loaded=None):
+    # Processed timing/laps/weather for ``session``, shared by all workers on
+    # the host. The first worker to get here runs ``load`` and writes the
+    # snapshot under a file lock; the rest unpickle it instead of parsing
+    # the FastF1 cache again. ``loaded(session)`` tells whether ``load``
+    # got everything it asked for; a partial session is returned to the
+    # caller but never snapshotted, so the next load retries it.
+    path = _snapshot_path(key)
+    fingerprint = session_fingerprint(session, exclude=TELEMETRY_FILES)
+    snapshot = _read(path, fingerprint)
+    if snapshot is not None:
+        return snapshot
+
+    with file_lock(f"{path}.lock"):
+        snapshot = _read(path, session_fingerprint(session, exclude=TELEMETRY_FILES))
+        if snapshot is not None:
+            return snapshot
+        load(session)
+        if loaded is not None and not loaded(session):
+            logger.warning("Not writing session snapshot %s: the session did not load completely", path)
+            return session
+        try:
+            _write(path, session)
+        except Exception as e:
+            logger.warning("Could not write session snapshot %s: %s", path, e)
+    return session
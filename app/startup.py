@@ -0,0 +1,71 @@
+import importlib
+import logging
+import os
+import threading
+
+# Startup is kept to Dash, Flask and the layout: FastF1, pandas and plotly
+# are imported by the callbacks on first use, and the FastF1 cache is only
+# set up when data is first loaded. To keep the first interaction from
+# paying for those imports, a warm-up thread loads them in the background
+# while the server is already accepting requests.
+
+CACHE_DIR = os.path.join("app", "cache_dir")
+WARMUP = os.environ.get("F1_WARMUP", "1") == "1"
+# Modules the callbacks import on first use, in dependency order.
+WARM_MODULES = (
+    "app.utils",
+    "app.digest",
+    "app.extraction",
+    "app.figures",
+    "app.race_replay",
+    "app.season",
+)
+
+logger = logging.getLogger(__name__)
+
+_cache_lock = threading.Lock()
+_cache_ready = False
+_warmup = None
+
+
+def _after_fork():
+    global _cache_lock
+    _cache_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def ensure_cache():
+    # Idempotent; called when app.utils (the FastF1 entry point of the app)
+    # is first imported, in web workers, job processes and CLIs alike.
+    global _cache_ready
+    if _cache_ready:
+        return
+    with _cache_lock:
+        if _cache_ready:
+            return
+        import fastf1
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fastf1.Cache.enable_cache(CACHE_DIR)
+        _cache_ready = True
+
+
+def warm_up():
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning("Warm-up import of %s failed: %s", name, e)
+
+
+def start_warmup():
+    # Daemon thread, so it never holds up shutdown; a no-op with F1_WARMUP=0
+    # or when already started.
+    global _warmup
+    if not WARMUP or _warmup is not None:
+        return _warmup
+    _warmup = threading.Thread(target=warm_up, name="f1-warmup", daemon=True)
+    _warmup.start()
+    return _warmup
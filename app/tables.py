@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Pure laps -> table-records functions. They take ``session.laps`` and do all
+# the work column-wise, so they can be benchmarked without a Dash app.
+
+
+def format_laptimes(seconds):
+    # "M:SS.ss" for a whole column at once; missing times become "".
+    seconds = np.asarray(seconds, dtype=np.float64)
+    valid = ~np.isnan(seconds)
+    minutes = np.floor_divide(np.where(valid, seconds, 0), 60).astype(np.int64)
+    rest = np.where(valid, np.mod(seconds, 60), 0)
+    out = np.char.add(np.char.add(minutes.astype(str), ":"), np.char.mod("%05.2f", rest))
+    return np.where(valid, out, "")
+
+
+def _seconds(column):
+    return pd.to_timedelta(column).dt.total_seconds().to_numpy()
+
+
+def lap_delta_records(laps):
+    quick = laps.pick_quicklaps()
+    lap_seconds = _seconds(quick['LapTime'])
+    order = np.argsort(lap_seconds, kind='stable')
+    lap_seconds = lap_seconds[order]
+
+    return pd.DataFrame({
+        'Driver': quick['Driver'].to_numpy()[order],
+        'LapTime': format_laptimes(lap_seconds),
+        'Delta': lap_seconds - lap_seconds[0],
+        'Compound': quick['Compound'].to_numpy()[order],
+    }).to_dict('records')
+
+
+def quick_sector_seconds(laps):
+    # Driver and sector times in seconds of every quick lap; all the sector
+    # table needs, in a form the session digest can store.
+    quick = laps.pick_quicklaps()
+    frame = {'Driver': quick['Driver'].to_numpy()}
+    for n in (1, 2, 3):
+        frame[f'Sector{n}'] = _seconds(quick[f'Sector{n}Time'])
+    return pd.DataFrame(frame)
+
+
+def sector_table_from_seconds(sectors, drivers):
+    sectors = sectors[sectors['Driver'].isin(drivers)]
+
+    table = {'Driver': sectors['Driver'].to_numpy()}
+    for n in (1, 2, 3):
+        seconds = sectors[f'Sector{n}'].to_numpy(dtype=np.float64)
+        best = np.nanmin(seconds) if np.isfinite(seconds).any() else np.nan
+        table[f'Sector{n}'] = format_laptimes(seconds)
+        table[f'DeltaS{n}'] = np.round(seconds - best, 3)
+        table[f'BestS{n}'] = seconds == best
+    columns = ['Driver', 'Sector1', 'DeltaS1', 'BestS1', 'Sector2', 'DeltaS2', 'BestS2',
+               'Sector3', 'DeltaS3', 'BestS3']
+    return pd.DataFrame(table)[columns].to_dict('records')
+
+
+def sector_table_records(laps, drivers):
+    return sector_table_from_seconds(quick_sector_seconds(laps), drivers)
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import fastf1
+import numpy as np
+
+from .locks import file_lock
+
+STORE_DIR = os.path.join("app", "cache_dir", "derived")
+CHANNELS = ('Distance', 'Speed', 'Throttle', 'Brake', 'RPM', 'nGear', 'DRS')
+DISCRETE_CHANNELS = ('Brake', 'nGear', 'DRS')
+# Position samples of each lap, stored next to the car channels so the track
+# map can be drawn from the store as well.
+POS_CHANNELS = ('X', 'Y')
+MANIFEST = "manifest.json"
+TELEMETRY_FILES = ('car_data.ff1pkl', 'position_data.ff1pkl')
+
+
+def session_fingerprint(session, exclude=()):
+    # Identifies the FastF1 cache entry a store was derived from. Any change
+    # to the pickled api responses (re-download, version bump) changes it.
+    # Sessions that did not come from FastF1 carry their own fingerprint.
+    if getattr(session, 'fingerprint', None):
+        return session.fingerprint
+    cache_dir = fastf1.Cache._CACHE_DIR
+    if not cache_dir:
+        return "uncached"
+    entry_dir = os.path.join(cache_dir, session.api_path[8:])
+    digest = hashlib.sha1()
+    try:
+        names = sorted(n for n in os.listdir(entry_dir) if n.endswith('.ff1pkl') and n not in exclude)
+    except FileNotFoundError:
+        return "uncached"
+    for name in names:
+        st = os.stat(os.path.join(entry_dir, name))
+        digest.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def lap_bounds(session_time_ns, starts_ns, ends_ns):
+    # Index ranges of every lap in a driver's time-sorted samples, resolved
+    # with one searchsorted call per edge instead of a mask per lap.
+    lo = np.searchsorted(session_time_ns, starts_ns, side='left')
+    hi = np.searchsorted(session_time_ns, ends_ns, side='right')
+    return lo, hi
+
+
+def lap_distance(speed, lap_time_s, offsets):
+    # Same integration as Telemetry.add_distance(), done for all laps of a
+    # driver at once: the first sample of a lap covers the time since the
+    # lap started, and the running sum restarts at every lap boundary.
+    starts = offsets[:-1]
+    counts = np.diff(offsets)
+    dt = np.diff(lap_time_s, prepend=0.0)
+    nonempty = starts[counts > 0]
+    dt[nonempty] = lap_time_s[nonempty]
+    total = np.cumsum(speed / 3.6 * dt)
+    before = np.concatenate([[0.0], total])[starts]
+    return total - np.repeat(before, counts)
+
+
+def _lap_samples(session_time, starts, ends):
+    # Gather index of every sample that belongs to a lap, in lap order, plus
+    # each sample's time since its lap started (seconds) and lap offsets.
+    lo, hi = lap_bounds(session_time, starts, ends)
+    counts = hi - lo
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    index = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - lo, counts)
+    lap_time_s = (session_time[index] - np.repeat(starts, counts)) / 1e9
+    return index, lap_time_s, offsets
+
+
+def _as_ns(column):
+    return column.to_numpy('timedelta64[ns]').astype(np.int64)
+
+
+def resample_onto(t_new, t, values, discrete=False):
+    # Channel values at other timestamps: linear for continuous channels,
+    # last known value for discrete ones (like Telemetry.merge_channels).
+    if discrete:
+        idx = np.clip(np.searchsorted(t, t_new, side='right') - 1, 0, len(t) - 1)
+        return values[idx]
+    return np.interp(t_new, t, values)
+
+
+class TelemetryStore:
+    """Per-session, per-driver float32 channel files indexed by lap."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self._manifests = {}
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def session_dir(self, key):
+        year, rnd, session_type = key
+        return os.path.join(self.root, f"{year}_{rnd:02d}_{session_type}")
+
+    def _driver_dir(self, key, driver):
+        return os.path.join(self.session_dir(key), driver)
+
+    def _manifest(self, key, driver, fingerprint):
+        path = self._driver_dir(key, driver)
+        cached = self._manifests.get(path)
+        if cached is not None and cached['fingerprint'] == fingerprint:
+            return cached
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if manifest.get('fingerprint') != fingerprint:
+            return None
+        self._manifests[path] = manifest
+        return manifest
+
+    def has_driver(self, key, session, driver):
+        return self._manifest(key, driver, session_fingerprint(session)) is not None
+
+    def build_driver(self, key, session, driver):
+        # Workers share shards through the filesystem; whoever gets the lock
+        # builds it, everyone else finds it done once the lock is released.
+        path = self._driver_dir(key, driver)
+        with file_lock(f"{path}.lock"):
+            fingerprint = session_fingerprint(session)
+            manifest = self._manifest(key, driver, fingerprint)
+            if manifest is None:
+                manifest = self._build_driver(path, session, driver, fingerprint)
+            return manifest
+
+    def _build_driver(self, path, session, driver, fingerprint):
+        laps = session.laps.pick_drivers(driver)
+        laps = laps[laps['LapStartTime'].notna() & laps['Time'].notna()]
+        number = laps['DriverNumber'].iloc[0]
+        car = session.car_data[number]
+        starts = _as_ns(laps['LapStartTime'])
+        ends = _as_ns(laps['Time'])
+
+        car_time = _as_ns(car['SessionTime'])
+        index, lap_time_s, offsets = _lap_samples(car_time, starts, ends)
+        speed = car['Speed'].to_numpy(dtype=np.float64)[index]
+        columns = {
+            'Distance': lap_distance(speed, lap_time_s, offsets),
+            'Time': lap_time_s,
+        }
+        for channel in CHANNELS[1:]:
+            columns[channel] = car[channel].to_numpy(dtype=np.float64)[index]
+
+        pos_offsets = np.zeros_like(offsets)
+        pos = session.pos_data.get(number) if getattr(session, '_pos_data', None) else None
+        if pos is not None and len(pos):
+            pos_index, pos_time_s, pos_offsets = _lap_samples(_as_ns(pos['SessionTime']), starts, ends)
+            columns['pos_Time'] = pos_time_s
+            for channel in POS_CHANNELS:
+                columns[f'pos_{channel}'] = pos[channel].to_numpy(dtype=np.float64)[pos_index]
+
+        lap_numbers = [str(int(n)) for n in laps['LapNumber']]
+        manifest = {
+            'fingerprint': fingerprint,
+            'channels': list(CHANNELS),
+            'laps': {n: [int(a), int(b)] for n, a, b in zip(lap_numbers, offsets[:-1], offsets[1:])},
+            'pos_laps': {
+                n: [int(a), int(b)] for n, a, b in zip(lap_numbers, pos_offsets[:-1], pos_offsets[1:])
+            } if 'pos_Time' in columns else {},
+        }
+
+        # Write into a scratch directory and swap it in, so readers never see
+        # a half-written shard.
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp, exist_ok=True)
+        for channel, values in columns.items():
+            np.save(os.path.join(tmp, f"{channel}.npy"), values.astype(np.float32))
+        with open(os.path.join(tmp, MANIFEST), 'w') as f:
+            json.dump(manifest, f)
+        with self._lock:
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+            self._manifests[path] = manifest
+        return manifest
+
+    def get_lap(self, key, session, driver, lap, channels=CHANNELS):
+        manifest = self._manifest(key, driver, session_fingerprint(session))
+        if manifest is None:
+            return None
+        bounds = manifest['laps'].get(str(int(lap)))
+        if bounds is None:
+            raise KeyError(f"No telemetry for {driver} lap {lap}")
+        start, stop = bounds
+        path = self._driver_dir(key, driver)
+        # mmap'd views: only the pages of the requested lap/channels are read.
+        return {channel: self._column(path, channel)[start:stop] for channel in channels}
+
+    def get_lap_positions(self, key, session, driver, lap, channels=()):
+        # X/Y of a lap with car channels resampled onto the position samples.
+        manifest = self._manifest(key, driver, session_fingerprint(session))
+        if manifest is None:
+            return None
+        bounds = manifest['pos_laps'].get(str(int(lap)))
+        if bounds is None:
+            raise KeyError(f"No position data for {driver} lap {lap}")
+        start, stop = bounds
+        path = self._driver_dir(key, driver)
+        pos_time = self._column(path, 'pos_Time')[start:stop]
+        data = {channel: self._column(path, f'pos_{channel}')[start:stop] for channel in POS_CHANNELS}
+        if channels:
+            car = self.get_lap(key, session, driver, lap, ('Time',) + tuple(channels))
+            for channel in channels:
+                data[channel] = resample_onto(
+                    pos_time, car['Time'], car[channel], discrete=channel in DISCRETE_CHANNELS
+                )
+        return data
+
+    def _column(self, path, channel):
+        return np.load(os.path.join(path, f"{channel}.npy"), mmap_mode='r')
+
+
+telemetry_store = TelemetryStore()
+os.register_at_fork(after_in_child=telemetry_store.after_fork)
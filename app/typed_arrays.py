@@ -0,0 +1,35 @@
+import base64
+
+import numpy as np
+
+# Telemetry channels shipped to the browser as plotly.js typed-array specs
+# ({"dtype", "bdata"}), which plotly.js decodes natively. Each channel uses
+# the smallest dtype that holds its range without losing resolution.
+CHANNEL_DTYPES = {
+    'Distance': 'f4',
+    'X': 'f4',
+    'Y': 'f4',
+    'Speed': 'u2',
+    'RPM': 'u2',
+    'Throttle': 'u1',
+    'Brake': 'u1',
+    'nGear': 'u1',
+    'DRS': 'u1',
+}
+
+
+def encode(values, dtype):
+    values = np.asarray(values)
+    target = np.dtype(f"<{dtype}")
+    if target.kind in 'iu':
+        info = np.iinfo(target)
+        values = np.clip(np.rint(np.nan_to_num(values.astype(np.float64))), info.min, info.max)
+    return {'dtype': dtype, 'bdata': base64.b64encode(values.astype(target).tobytes()).decode('ascii')}
+
+
+def encode_channel(channel, values):
+    return encode(values, CHANNEL_DTYPES.get(channel, 'f4'))
+
+
+def decode(spec):
+    return np.frombuffer(base64.b64decode(spec['bdata']), dtype=f"<{spec['dtype']}")
@@ -1,12 +1,359 @@
+import abc
+import json
+import os
+import shutil
+import threading
+from types import SimpleNamespace
+
 import fastf1
+import pandas as pd
+from fastf1 import api, mvapi
+from fastf1.core import Laps, Telemetry
 
-def get_session(year, rnd, session_type):
-    session = fastf1.get_session(year, rnd, session_type.upper())
+from . import cache_manager
+from .jobs import report_stage
+from .lean import slim_car_data, slim_pos_data, slim_session
+from .metrics import instrument
+from .session_cache import session_cache, session_key
+from .singleflight import SingleFlight
+from .snapshot import attach_session
+from .startup import ensure_cache
+
+LOAD_TIMEOUT = float(os.environ.get("F1_LOAD_TIMEOUT", "300"))
+BUNDLE_DIR = os.environ.get("F1_BUNDLE_DIR", os.path.join("app", "cache_dir", "bundles"))
+BUNDLE_META = "meta.json"
+BUNDLE_COMPRESSION = {'method': 'gzip', 'compresslevel': 1}
+
+_telemetry_lock = threading.Lock()
+session_loads = SingleFlight()
+
+
+def _after_fork():
+    # Loads in flight in the parent never finish in a forked child (a
+    # background job), and their locks stay held there.
+    global _telemetry_lock
+    _telemetry_lock = threading.Lock()
+    session_loads.after_fork()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+# First import of the app's FastF1 entry point: set up the disk cache now.
+ensure_cache()
+
+
+def _load_timing(session):
+    # Timing, laps and weather only. Car and position telemetry is the bulk
+    # of a race session and is pulled in per driver by load_driver_telemetry.
+    # Weather is loaded as its own step so background loads can report it.
+    report_stage("laps")
     session.load(
         laps=True,
-        telemetry=True,
-        weather=True,
+        telemetry=False,
+        weather=False,
         messages=False,
         livedata=None
     )
-    return session
\ No newline at end of file
+    report_stage("weather")
+    if session.f1_api_support:
+        session._load_weather_data(livedata=None)
+    slim_session(session)
+
+
+def _timing_loaded(session):
+    # FastF1 logs and swallows errors of the individual load steps
+    # (soft_exceptions); a step that failed leaves its attribute unset.
+    if not session.f1_api_support:
+        return True  # nothing beyond the session info was requested
+    return hasattr(session, '_laps') and hasattr(session, '_weather_data')
+
+
+class BundleSession:
+    # Session stand-in for data that did not come from fastf1.get_session:
+    # replayed bundles and synthetic benchmark sessions. It exposes the parts
+    # of fastf1.core.Session the app uses, with all telemetry preloaded.
+    # There is no api data to rebuild telemetry from, so it is kept when the
+    # session is evicted.
+    reloadable_telemetry = False
+
+    def __init__(self, year, rnd, session_type, laps, car_data, pos_data, weather_data,
+                 session_info, corners=None, fingerprint=None):
+        self.year, self.round, self.session_type = year, rnd, session_type
+        self.api_path = f"/static/bundle/{year}_{rnd}_{session_type}/"
+        self.event = SimpleNamespace(year=year)
+        self.session_info = session_info
+        self.corners = corners
+        self.fingerprint = fingerprint
+        self._laps = Laps(laps, session=self)
+        self._car_data = {
+            drv: Telemetry(frame, session=self, driver=drv) for drv, frame in car_data.items()
+        }
+        self._pos_data = {
+            drv: Telemetry(frame, session=self, driver=drv) for drv, frame in pos_data.items()
+        }
+        self._weather_data = weather_data
+        slim_session(self)
+
+    @property
+    def laps(self):
+        return self._laps
+
+    @property
+    def car_data(self):
+        return self._car_data
+
+    @property
+    def pos_data(self):
+        return self._pos_data
+
+    @property
+    def weather_data(self):
+        return self._weather_data
+
+
+class DataSource(abc.ABC):
+    name = None
+
+    @abc.abstractmethod
+    def load(self, year, rnd, session_type):
+        # The session for the key, with laps and weather loaded.
+        ...
+
+
+class FastF1Source(DataSource):
+    name = "fastf1"
+
+    def load(self, year, rnd, session_type):
+        report_stage("timing")
+        key = session_key(year, rnd, session_type)
+        session = fastf1.get_session(year, rnd, session_type.upper())
+        cache_manager.open_entry(session.api_path, key)
+        session = attach_session(key, session, _load_timing, _timing_loaded)
+        # No-op for fresh loads; snapshots written before slimming get it here.
+        slim_session(session)
+        cache_manager.maybe_enforce()
+        return session
+
+
+class ReplaySource(DataSource):
+    # Serves recorded bundles only; never touches the network.
+    name = "replay"
+
+    def __init__(self, bundle_dir):
+        self.bundle_dir = bundle_dir
+
+    def load(self, year, rnd, session_type):
+        return read_bundle(self.bundle_dir, session_key(year, rnd, session_type))
+
+
+class RecordingSource(DataSource):
+    # Replays a bundle when one exists, otherwise loads the session from
+    # FastF1 with all telemetry and records it for next time.
+    name = "record"
+
+    def __init__(self, bundle_dir, upstream=None):
+        self.bundle_dir = bundle_dir
+        self.upstream = upstream or FastF1Source()
+
+    def load(self, year, rnd, session_type):
+        key = session_key(year, rnd, session_type)
+        if has_bundle(self.bundle_dir, key):
+            return read_bundle(self.bundle_dir, key)
+        session = self.upstream.load(*key)
+        load_driver_telemetry(session, session.laps['Driver'].unique())
+        write_bundle(self.bundle_dir, key, session, get_circuit_info(session).corners)
+        return session
+
+
+_data_source = None
+
+
+def get_data_source():
+    global _data_source
+    if _data_source is None:
+        mode = os.environ.get("F1_DATA_SOURCE", "fastf1").lower()
+        if mode == "replay":
+            _data_source = ReplaySource(BUNDLE_DIR)
+        elif mode == "record":
+            _data_source = RecordingSource(BUNDLE_DIR)
+        elif mode == "fastf1":
+            _data_source = FastF1Source()
+        else:
+            raise ValueError(f"Unknown F1_DATA_SOURCE {mode!r}; expected fastf1, record or replay")
+    return _data_source
+
+
+def set_data_source(source):
+    global _data_source
+    _data_source = source
+
+
+def get_session(year, rnd, session_type):
+    return get_data_source().load(year, rnd, session_type)
+
+
+def get_cached_session(year, rnd, session_type):
+    # Both callbacks go through here so a session is only parsed once per
+    # process instead of on every dropdown change. Concurrent misses for the
+    # same session share a single load.
+    key = session_key(year, rnd, session_type)
+    session = session_cache.get(key)
+    if session is None:
+        session = session_loads.do(key, lambda: _load_into_cache(key), timeout=LOAD_TIMEOUT)
+    else:
+        cache_manager.touch(session.api_path, key)
+    return session
+
+
+@instrument("session.load")
+def _load_into_cache(key):
+    # A flight that finished just before this one started already filled it.
+    session = session_cache.peek(key)
+    if session is None:
+        session = get_session(*key)
+        session_cache.put(key, session)
+    return session
+
+
+@instrument("session.telemetry")
+def load_driver_telemetry(session, drivers):
+    # Mirrors Session._load_telemetry, but only builds Telemetry objects for
+    # the requested drivers. The raw api data comes from the FastF1 disk
+    # cache after the first download, so later drivers are cheap to add.
+    with _telemetry_lock:
+        if getattr(session, '_car_data', None) is None:
+            session._car_data = {}
+            session._pos_data = {}
+
+        laps = session.laps
+        numbers = laps.loc[laps['Driver'].isin(drivers), 'DriverNumber'].unique()
+        missing = [n for n in numbers if n not in session._car_data]
+        if not missing:
+            return False
+
+        # The entry may have been compressed while the session sat in memory.
+        cache_manager.open_entry(session.api_path)
+        try:
+            car_raw = api.car_data(session.api_path)
+        except api.SessionNotAvailableError:
+            car_raw = {}
+        try:
+            pos_raw = api.position_data(session.api_path)
+        except api.SessionNotAvailableError:
+            pos_raw = {}
+
+        if getattr(session, '_t0_date', None) is None:
+            session._calculate_t0_date(car_raw, pos_raw)
+            session._laps['LapStartDate'] = session._laps['LapStartTime'] + session.t0_date
+
+        for src, processed, slim in ((car_raw, session._car_data, slim_car_data),
+                                     (pos_raw, session._pos_data, slim_pos_data)):
+            for drv in missing:
+                if drv not in src:
+                    continue
+                tel = Telemetry(
+                    src[drv].drop(labels='Time', axis=1),
+                    session=session,
+                    driver=drv,
+                    drop_unknown_channels=True,
+                    _cast_default_cols=True
+                )
+                tel['Date'] = tel['Date'].dt.round('ms')
+                tel['Time'] = tel['Date'] - session.t0_date
+                tel['SessionTime'] = tel['Time']
+                processed[drv] = slim(tel)
+        return True
+
+
+def ensure_driver_telemetry(session_info, session, drivers):
+    if load_driver_telemetry(session, drivers):
+        # Re-measure so the cache budget accounts for the new telemetry.
+        session_cache.put(session_key(*session_info), session)
+
+
+def get_circuit_info(session):
+    # Session.get_circuit_info() also derives marker distances from the
+    # overall fastest lap, which would force that driver's telemetry to load.
+    if isinstance(session, BundleSession):
+        return SimpleNamespace(corners=session.corners)
+    circuit = session.session_info['Meeting']['Circuit']
+    circuit_key = circuit['Key']
+    if circuit_key == 149 and circuit['ShortName'] == 'Mugello':
+        circuit_key = 146
+    return mvapi.get_circuit_info(year=session.event.year, circuit_key=circuit_key)
+
+
+# --- Session bundles ---
+# One directory per session with the laps, weather, car and position data and
+# circuit corners it needs, as gzip'd pickles. Written by RecordingSource and
+# read back by ReplaySource/RecordingSource at disk speed.
+
+def _bundle_path(bundle_dir, key):
+    year, rnd, session_type = key
+    return os.path.join(bundle_dir, f"{year}_{rnd:02d}_{session_type}")
+
+
+def has_bundle(bundle_dir, key):
+    return os.path.exists(os.path.join(_bundle_path(bundle_dir, key), BUNDLE_META))
+
+
+def _stack_telemetry(telemetry):
+    frames = [pd.DataFrame(tel).assign(DriverNumber=drv) for drv, tel in telemetry.items()]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _split_telemetry(frame):
+    if frame.empty:
+        return {}
+    return {
+        drv: group.drop(columns='DriverNumber').reset_index(drop=True)
+        for drv, group in frame.groupby('DriverNumber', sort=False)
+    }
+
+
+def write_bundle(bundle_dir, key, session, corners):
+    path = _bundle_path(bundle_dir, key)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    frames = {
+        'laps': pd.DataFrame(session.laps),
+        'weather': pd.DataFrame(session.weather_data),
+        'car_data': _stack_telemetry(session.car_data),
+        'pos_data': _stack_telemetry(session.pos_data),
+        'corners': pd.DataFrame(corners),
+    }
+    for name, frame in frames.items():
+        frame.to_pickle(os.path.join(tmp, f"{name}.pkl.gz"), compression=BUNDLE_COMPRESSION)
+    circuit = session.session_info['Meeting']['Circuit']
+    meta = {
+        'year': key[0], 'round': key[1], 'session_type': key[2],
+        'circuit': {'Key': circuit['Key'], 'ShortName': circuit['ShortName']},
+    }
+    # Written last: a bundle without meta.json is incomplete.
+    with open(os.path.join(tmp, BUNDLE_META), 'w') as f:
+        json.dump(meta, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def read_bundle(bundle_dir, key):
+    path = _bundle_path(bundle_dir, key)
+    meta_path = os.path.join(path, BUNDLE_META)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No recorded bundle for {key} in {bundle_dir}")
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    def frame(name):
+        return pd.read_pickle(os.path.join(path, f"{name}.pkl.gz"), compression='gzip')
+
+    return BundleSession(
+        meta['year'], meta['round'], meta['session_type'],
+        laps=frame('laps'),
+        car_data=_split_telemetry(frame('car_data')),
+        pos_data=_split_telemetry(frame('pos_data')),
+        weather_data=frame('weather'),
+        session_info={'Meeting': {'Circuit': meta['circuit']}},
+        corners=frame('corners'),
+        fingerprint=f"bundle:{os.stat(meta_path).st_mtime_ns}",
+    )
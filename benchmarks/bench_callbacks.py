@@ -0,0 +1,175 @@
+"""Latency, peak-memory and payload benchmarks for the dashboard callbacks.
+
+Runs fully offline against a synthetic race (see benchmarks/synthetic.py):
+
+    python -m benchmarks.bench_callbacks                    # compare to baseline
+    python -m benchmarks.bench_callbacks --update-baseline  # record a new one
+
+Exits non-zero when a scenario regresses past the tolerance. Timings are
+machine dependent, so record the baseline on the machine you compare on.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from plotly.utils import PlotlyJSONEncoder
+
+from app import callbacks, circuit_cache, digest, figures
+from app.figure_cache import figure_cache
+from app.session_cache import session_cache, session_key
+from app.telemetry_store import telemetry_store
+from benchmarks.synthetic import build_session, synthetic_geometry
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+YEAR, RND, SESSION_TYPE = 2024, 1, "R"
+SESSION_INFO = f"{YEAR},{RND},{SESSION_TYPE}"
+
+
+def _payload_bytes(output):
+    return len(json.dumps(output, cls=PlotlyJSONEncoder))
+
+
+def scenarios(drivers):
+    two, four = list(drivers[:2]), list(drivers[:4])
+    twenty_pairs = (list(drivers[:4]), list(range(10, 15)))
+    return {
+        "load_session": lambda: _disk_digest(lambda: callbacks.load_session(1, YEAR, RND, SESSION_TYPE)),
+        "telemetry_2x2": lambda: callbacks.update_telemetry_data(two, [1, 2], None, SESSION_INFO),
+        "telemetry_4x5": lambda: callbacks.update_telemetry_data(
+            twenty_pairs[0], twenty_pairs[1], None, SESSION_INFO
+        ),
+        "telemetry_shared": lambda: _shared(
+            lambda: callbacks.update_telemetry_data(two, [1, 2], None, SESSION_INFO)
+        ),
+        "telemetry_zoomed": lambda: callbacks.update_telemetry_data(
+            two, [1, 2], {"xaxis.range[0]": 1000, "xaxis.range[1]": 1500}, SESSION_INFO
+        ),
+        "track_map_4": lambda: callbacks.update_track_data(four, 'drivers', SESSION_INFO),
+        "track_dominance": lambda: callbacks.update_track_data(None, 'dominance', SESSION_INFO),
+        "replay_frame": lambda: callbacks.update_replay_frame(1800.0, SESSION_INFO),
+        "weather": lambda: callbacks.update_weather_plot(SESSION_INFO),
+        "sector_chart_4": lambda: callbacks.update_sector_chart(four, SESSION_INFO),
+        "sector_table_4": lambda: callbacks.update_sector_table(four, SESSION_INFO),
+    }
+
+
+def _disk_digest(fn):
+    # A worker's first request for a session: the digest is read from disk,
+    # not served from the in-process memo that the warm-up call filled.
+    digest.invalidate_digest()
+    return fn()
+
+
+def _shared(fn):
+    # Through the shared figure cache, which the other scenarios bypass so
+    # that they time the builds themselves. Memos are cleared before every
+    # timed call, so this times a disk-tier hit.
+    enabled, figure_cache.enabled = figure_cache.enabled, True
+    try:
+        return fn()
+    finally:
+        figure_cache.enabled = enabled
+
+
+def measure(fn, iterations):
+    # Warm-up call builds the store shards; it is reported separately as the
+    # cold latency. Every timed call starts from cleared figure memos.
+    figures.clear_memo()
+    start = time.perf_counter()
+    output = fn()
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(iterations):
+        figures.clear_memo()
+        start = time.perf_counter()
+        output = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    figures.clear_memo()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "cold_ms": round(cold_ms, 2),
+        "p50_ms": round(float(np.percentile(timings, 50)), 2),
+        "p95_ms": round(float(np.percentile(timings, 95)), 2),
+        "max_ms": round(max(timings), 2),
+        "peak_kb": round(peak / 1024, 1),
+        "payload_kb": round(_payload_bytes(output) / 1024, 1),
+    }
+
+
+def install_session(session, tmp):
+    # Serve ``session`` from the session cache and keep every derived store
+    # inside ``tmp``, so runs start cold and never touch app/cache_dir.
+    telemetry_store.root = os.path.join(tmp, "derived")
+    telemetry_store._manifests.clear()
+    circuit_cache.CIRCUIT_DIR = os.path.join(tmp, "circuits")
+    session_cache.invalidate()
+    digest.invalidate_digest()
+    session_cache.put(session_key(YEAR, RND, SESSION_TYPE), session)
+    circuit_cache._memory[circuit_cache.circuit_key(session)] = synthetic_geometry()
+
+
+def run(iterations=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        session = build_session(YEAR, RND, SESSION_TYPE)
+        install_session(session, tmp)
+        drivers = list(session.laps['Driver'].unique())
+        enabled, figure_cache.enabled = figure_cache.enabled, False
+        try:
+            return {name: measure(fn, iterations) for name, fn in scenarios(drivers).items()}
+        finally:
+            figure_cache.enabled = enabled
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "peak_kb", "payload_kb"):
+            # Small absolute slack so sub-millisecond noise never fails a run.
+            limit = base[metric] * (1 + tolerance) + (1.0 if metric == "p50_ms" else 0.0)
+            if current[metric] > limit:
+                regressions.append(f"{name}.{metric}: {current[metric]} > {base[metric]} (+{tolerance:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    header = f"{'scenario':<18}{'cold ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak KB':>11}{'payload KB':>12}"
+    print(header)
+    for name, r in results.items():
+        print(f"{name:<18}{r['cold_ms']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['peak_kb']:>11}{r['payload_kb']:>12}")
+
+    if args.update_baseline or not os.path.exists(BASELINE):
+        with open(BASELINE, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {BASELINE}")
+        return 0
+
+    with open(BASELINE) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+from fastf1.core import Telemetry
+
+from app.utils import BundleSession
+
+# Offline stand-in for a loaded FastF1 session, sized like a real race:
+# 20 drivers x 60 laps with ~4 Hz car and position data.
+
+DRIVERS = [
+    ('VER', '1'), ('PER', '11'), ('HAM', '44'), ('RUS', '63'), ('LEC', '16'),
+    ('SAI', '55'), ('NOR', '4'), ('PIA', '81'), ('ALO', '14'), ('STR', '18'),
+    ('GAS', '10'), ('OCO', '31'), ('ALB', '23'), ('SAR', '2'), ('TSU', '22'),
+    ('RIC', '3'), ('BOT', '77'), ('ZHO', '24'), ('HUL', '27'), ('MAG', '20'),
+]
+COMPOUNDS = ['SOFT', 'MEDIUM', 'HARD']
+TRACK_LENGTH = 5000.0
+
+
+def _track_xy(fraction):
+    angle = 2 * np.pi * fraction
+    return 4000 * np.cos(angle) + 600 * np.cos(3 * angle), 2500 * np.sin(angle) + 400 * np.sin(5 * angle)
+
+
+def build_session(year=2024, rnd=1, session_type='R', n_drivers=20, n_laps=60, hz=4.0, seed=0):
+    rng = np.random.default_rng(seed)
+    lap_rows, car_data, pos_data = [], {}, {}
+    session_end = 0.0
+
+    for d, (abbr, number) in enumerate(DRIVERS[:n_drivers]):
+        lap_times = 90.0 + 0.3 * d + rng.normal(0, 0.6, n_laps)
+        lap_times[0] += 8.0  # standing start
+        starts = np.concatenate([[0.0], np.cumsum(lap_times)[:-1]]) + 60.0
+        best = np.inf
+        for n in range(n_laps):
+            s1, s2 = lap_times[n] * 0.31, lap_times[n] * 0.36
+            is_best = lap_times[n] < best
+            best = min(best, lap_times[n])
+            # Pit stops where the compound changes.
+            stint = (n * 3) // n_laps
+            pit_in = n + 1 < n_laps and ((n + 1) * 3) // n_laps != stint
+            pit_out = n > 0 and ((n - 1) * 3) // n_laps != stint
+            lap_rows.append({
+                'Driver': abbr, 'DriverNumber': number, 'Team': f"Team {d // 2}",
+                'LapNumber': float(n + 1),
+                'LapTime': lap_times[n], 'LapStartTime': starts[n], 'Time': starts[n] + lap_times[n],
+                'Sector1Time': s1, 'Sector2Time': s2, 'Sector3Time': lap_times[n] - s1 - s2,
+                'Compound': COMPOUNDS[stint], 'IsPersonalBest': bool(is_best),
+                'PitInTime': starts[n] + lap_times[n] if pit_in else np.nan,
+                'PitOutTime': starts[n] if pit_out else np.nan,
+            })
+
+        end = starts[-1] + lap_times[-1]
+        session_end = max(session_end, end + 60.0)
+        t = np.arange(starts[0], end, 1.0 / hz)
+        lap_idx = np.clip(np.searchsorted(starts, t, side='right') - 1, 0, n_laps - 1)
+        fraction = (t - starts[lap_idx]) / lap_times[lap_idx]
+        speed = 200 + 110 * np.sin(2 * np.pi * 6 * fraction) + rng.normal(0, 3, len(t))
+        throttle = np.clip((speed - 120) / 1.9, 0, 100)
+        car_data[number] = Telemetry({
+            'Date': pd.Timestamp(f"{year}-03-01 15:00") + pd.to_timedelta(t, unit='s'),
+            'SessionTime': pd.to_timedelta(t, unit='s'),
+            'Time': pd.to_timedelta(t, unit='s'),
+            'Speed': speed,
+            'RPM': 9000 + 30 * speed,
+            'nGear': np.clip((speed // 40).astype(int), 1, 8),
+            'Throttle': throttle,
+            'Brake': throttle < 5,
+            'DRS': np.where(fraction > 0.85, 12, 0),
+            'Source': 'car',
+        })
+
+        tp = t + 0.11
+        x, y = _track_xy(fraction)
+        pos_data[number] = Telemetry({
+            'Date': pd.Timestamp(f"{year}-03-01 15:00") + pd.to_timedelta(tp, unit='s'),
+            'SessionTime': pd.to_timedelta(tp, unit='s'),
+            'Time': pd.to_timedelta(tp, unit='s'),
+            'X': x, 'Y': y, 'Z': np.zeros_like(x),
+            'Status': 'OnTrack',
+            'Source': 'pos',
+        })
+
+    laps = pd.DataFrame(lap_rows)
+    for column in ('LapTime', 'LapStartTime', 'Time', 'Sector1Time', 'Sector2Time', 'Sector3Time',
+                   'PitInTime', 'PitOutTime'):
+        laps[column] = pd.to_timedelta(laps[column], unit='s')
+
+    weather_t = np.arange(0, session_end, 60.0)
+    weather = pd.DataFrame({
+        'Time': pd.to_timedelta(weather_t, unit='s'),
+        'AirTemp': 24 + np.sin(weather_t / 3000),
+        'TrackTemp': 38 + 3 * np.sin(weather_t / 2500),
+        'Humidity': 45.0, 'Pressure': 1012.0, 'Rainfall': False,
+        'WindDirection': 180, 'WindSpeed': 2.0,
+    })
+    return BundleSession(
+        year, rnd, session_type, laps, car_data, pos_data, weather,
+        session_info={'Meeting': {'Circuit': {'Key': 'synthetic', 'ShortName': 'Synthetic'}}},
+        corners=_corners(),
+    )
+
+
+def _corners():
+    fraction = np.linspace(0, 1, 12, endpoint=False)
+    x, y = _track_xy(fraction)
+    return pd.DataFrame({'X': x, 'Y': y, 'Number': np.arange(1, len(x) + 1), 'Letter': ''})
+
+
+def synthetic_geometry():
+    # Circuit geometry as stored by app.circuit_cache, so the track map never
+    # reaches for the network.
+    corners = _corners()
+    return {
+        'corners': {
+            'x': corners['X'].tolist(), 'y': corners['Y'].tolist(),
+            'number': corners['Number'].tolist(), 'letter': corners['Letter'].tolist(),
+        },
+        'outline': None,
+    }
@@ -0,0 +1,174 @@
+"""Prewarm the FastF1 cache and the dashboard's derived stores.
+
+Downloads and parses each session once, then writes everything the
+dashboard would otherwise build on the first visit: the session snapshot
+and digest, every driver's telemetry shard, the replay position index and
+the circuit geometry.
+
+    python prewarm.py --years 2024 --rounds 1-12 --sessions Q R --workers 4
+
+Finished sessions are recorded in a state file, so an interrupted run picks
+up where it stopped; pass --restart to redo everything. When both Q and R
+are prewarmed, the new rounds are also added to the season aggregates.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.ranges import parse_range
+
+STATE_FILE = os.path.join("app", "cache_dir", "prewarm_state.json")
+SESSION_TYPES = ("FP1", "FP2", "FP3", "SQ", "S", "Q", "R")
+DONE = ("ok", "skipped")
+
+
+def prewarm_session(year, rnd, session_type, telemetry=True):
+    # Runs in a pool worker; importing app.utils enables the FastF1 cache.
+    import fastf1
+    from app.cache_manager import dir_bytes
+    from app.circuit_cache import get_circuit_geometry
+    from app.digest import get_session_digest
+    from app.extraction import ensure_shards, extract_fastest_laps
+    from app.race_replay import get_position_index
+    from app.session_cache import session_key
+    from app.telemetry_store import telemetry_store
+    from app.utils import get_cached_session
+
+    key = session_key(year, rnd, session_type)
+    start = time.perf_counter()
+    try:
+        session = get_cached_session(*key)
+    except ValueError as e:
+        if "does not exist" not in str(e):
+            raise
+        # No such session at this event (e.g. no sprint weekend).
+        return {"status": "skipped", "seconds": 0.0, "bytes": 0, "error": str(e)}
+
+    digest = get_session_digest(*key)
+    errors = {}
+    if telemetry:
+        drivers = digest["drivers"]
+        errors = ensure_shards(key, session, drivers)
+        extracted = extract_fastest_laps(key, session, [d for d in drivers if d not in errors][:1])
+        get_circuit_geometry(session, next(iter(extracted.data.values()), None))
+        get_position_index(*key)
+
+    size = dir_bytes(telemetry_store.session_dir(key))
+    if fastf1.Cache._CACHE_DIR and getattr(session, "api_path", None):
+        size += dir_bytes(os.path.join(fastf1.Cache._CACHE_DIR, session.api_path[8:]))
+    return {
+        "status": "ok",
+        "seconds": round(time.perf_counter() - start, 2),
+        "bytes": size,
+        "error": "; ".join(f"{d}: {m}" for d, m in errors.items()) or None,
+    }
+
+
+def _job_id(year, rnd, session_type):
+    return f"{year}_{rnd:02d}_{session_type}"
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def run(jobs, workers, state_path, telemetry=True, work=prewarm_session, restart=False):
+    # ``jobs`` is a list of (year, round, session type). Returns the state
+    # entries of every job, including ones finished by an earlier run.
+    state = {} if restart else load_state(state_path)
+    pending = [job for job in jobs if state.get(_job_id(*job), {}).get("status") not in DONE]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Resuming: {skipped} of {len(jobs)} sessions already done")
+
+    def record(job, result):
+        state[_job_id(*job)] = result
+        save_state(state_path, state)
+        print(f"{_job_id(*job):<14}{result['status']:<9}{result['seconds']:>8.1f}s", flush=True)
+
+    if workers <= 0:
+        for job in pending:
+            try:
+                result = work(*job, telemetry)
+            except Exception as e:
+                result = {"status": "failed", "seconds": 0.0, "bytes": 0, "error": str(e)}
+            record(job, result)
+    else:
+        # Spawned rather than forked workers: the parent may already hold
+        # the app's thread pools and locks.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(work, *job, telemetry): job for job in pending}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"status": "failed", "seconds": 0.0, "bytes": 0, "error": str(e)}
+                record(futures[future], result)
+
+    return {_job_id(*job): state[_job_id(*job)] for job in jobs if _job_id(*job) in state}
+
+
+def report(results):
+    lines = [f"{'session':<14}{'status':<9}{'seconds':>9}{'MB':>9}  error"]
+    for job_id, r in sorted(results.items()):
+        lines.append(f"{job_id:<14}{r['status']:<9}{r['seconds']:>9.1f}{r['bytes'] / 2**20:>9.1f}  {r['error'] or ''}")
+    ok = [r for r in results.values() if r["status"] == "ok"]
+    lines.append(f"{len(ok)} ok, {sum(r['status'] == 'skipped' for r in results.values())} skipped, "
+                 f"{sum(r['status'] == 'failed' for r in results.values())} failed; "
+                 f"{sum(r['seconds'] for r in ok):.1f}s, {sum(r['bytes'] for r in ok) / 2**20:.1f} MB")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", required=True, help="e.g. 2024 or 2022-2024")
+    parser.add_argument("--rounds", help="e.g. 1-10 or 3,5,7 (default: every past round of each year)")
+    parser.add_argument("--sessions", nargs="+", default=["Q", "R"], choices=SESSION_TYPES)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="worker processes; 0 runs in this process")
+    parser.add_argument("--no-telemetry", action="store_true", help="skip telemetry shards, the replay index and circuit geometry")
+    parser.add_argument("--state", default=STATE_FILE)
+    parser.add_argument("--restart", action="store_true", help="ignore the state of earlier runs")
+    args = parser.parse_args(argv)
+
+    from app.season import past_rounds
+
+    jobs, seasons = [], {}
+    for year in parse_range(args.years):
+        rounds = parse_range(args.rounds) if args.rounds else past_rounds(year)
+        seasons[year] = rounds
+        jobs.extend((year, rnd, session_type) for rnd in rounds for session_type in args.sessions)
+
+    results = run(jobs, args.workers, args.state, telemetry=not args.no_telemetry, restart=args.restart)
+    print(report(results))
+
+    if {"Q", "R"} <= set(args.sessions):
+        # Adds the new rounds to the season aggregates; rounds already in
+        # there are not recomputed.
+        from app.season import completed_rounds, update_season
+
+        for year, rounds in seasons.items():
+            season = update_season(year, rounds, args.workers)
+            print(f"Season {year}: {len(completed_rounds(season))} rounds aggregated")
+    return 1 if any(r["status"] == "failed" for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
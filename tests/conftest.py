@@ -0,0 +1,44 @@
+import pytest
+
+from app import circuit_cache, digest, figures, race_replay
+from app.session_cache import session_cache, session_key
+from app.telemetry_store import telemetry_store
+from benchmarks.synthetic import build_session
+
+KEY = session_key(2024, 1, "R")
+
+
+def _clear_memos():
+    figures.clear_memo()
+    digest.invalidate_digest()
+    race_replay.invalidate_position_index()
+    session_cache.invalidate()
+
+
+@pytest.fixture
+def derived(tmp_path, monkeypatch):
+    # Every derived store (telemetry shards, digests, snapshots, figures,
+    # position indexes, circuit geometry) inside ``tmp_path``, and every
+    # in-process memo empty before and after the test.
+    monkeypatch.setattr(telemetry_store, "root", str(tmp_path / "derived"))
+    monkeypatch.setattr(telemetry_store, "_manifests", {})
+    monkeypatch.setattr(circuit_cache, "CIRCUIT_DIR", str(tmp_path / "circuits"))
+    monkeypatch.setattr(circuit_cache, "_memory", {})
+    _clear_memos()
+    yield tmp_path
+    _clear_memos()
+
+
+@pytest.fixture
+def install_session(derived):
+    # Serves a synthetic session from the session cache under ``key``.
+    def install(key=KEY, **kwargs):
+        session = build_session(*key, **kwargs)
+        session_cache.put(session_key(*key), session)
+        return session
+    return install
+
+
+@pytest.fixture
+def synthetic(install_session):
+    return install_session(n_drivers=3, n_laps=4)
@@ -0,0 +1,18 @@
+from benchmarks import bench_callbacks
+
+
+def test_every_scenario_produces_output(synthetic):
+    drivers = list(synthetic.laps['Driver'].unique())
+    for name, fn in bench_callbacks.scenarios(drivers).items():
+        if name == "telemetry_4x5":
+            continue  # needs more laps than the small fixture has
+        output = fn()
+        assert output, name
+        assert bench_callbacks._payload_bytes(output) > 0
+
+
+def test_compare_flags_regressions():
+    base = {"x": {"p50_ms": 10.0, "peak_kb": 100.0, "payload_kb": 50.0}}
+    assert bench_callbacks.compare({"x": dict(base["x"])}, base, 0.25) == []
+    slow = dict(base["x"], p50_ms=20.0)
+    assert bench_callbacks.compare({"x": slow}, base, 0.25) == ["x.p50_ms: 20.0 > 10.0 (+25%)"]
@@ -0,0 +1,111 @@
+import datetime
+import os
+import time
+
+import pytest
+from requests_cache import CachedResponse
+from requests_cache.backends.sqlite import SQLiteCache
+
+from app import cache_manager
+from app.telemetry_store import TelemetryStore
+
+DAY = 86400
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    root = tmp_path / "cache"
+    monkeypatch.setattr(cache_manager, "cache_root", lambda: str(root))
+    monkeypatch.setattr(cache_manager, "telemetry_store", TelemetryStore(str(tmp_path / "derived")))
+    monkeypatch.setattr(cache_manager, "_touched", {})
+    monkeypatch.setattr(cache_manager, "PINNED", "")
+    return root
+
+
+def add_entry(root, rnd, age_days, size=1000):
+    # A FastF1 cache entry opened by the app ``age_days`` ago, with a
+    # derived store of the same size.
+    api_path = f"/static/2024/2024-0{rnd}-01_Grand_Prix/2024-0{rnd}-01_Race/"
+    path = root / api_path[8:]
+    path.mkdir(parents=True)
+    (path / "car_data.ff1pkl").write_bytes(b"x" * size)
+    key = (2024, rnd, "R")
+    cache_manager.open_entry(api_path, key)
+    derived = cache_manager.telemetry_store.session_dir(key)
+    os.makedirs(derived)
+    with open(os.path.join(derived, "digest.json.gz"), "wb") as f:
+        f.write(b"y" * size)
+    stamp = time.time() - age_days * DAY
+    os.utime(path / cache_manager.MARKER, (stamp, stamp))
+    return api_path, str(path)
+
+
+def test_scan_maps_entries_to_sessions(cache):
+    add_entry(cache, 1, age_days=2)
+    (entry,) = cache_manager.scan()
+    assert entry.key == (2024, 1, "R")
+    assert entry.raw_bytes > 1000 and entry.derived_bytes == 1000
+    assert time.time() - entry.last_access == pytest.approx(2 * DAY, abs=60)
+    assert "2024_01_R" in cache_manager.report([entry])
+
+
+def test_enforce_evicts_least_recently_used_except_pinned(cache):
+    paths = {rnd: add_entry(cache, rnd, age_days=age)[1] for rnd, age in ((1, 5), (2, 4), (3, 3), (4, 0))}
+    cache_manager.pin(2024, 1)
+    budget = 2 * 2100 + 500  # room for two entries
+
+    _, evicted = cache_manager.enforce(budget_bytes=budget, compress_after_days=0)
+    assert [e.key for e in evicted] == [(2024, 2, "R"), (2024, 3, "R")]
+    assert os.path.exists(paths[1]) and os.path.exists(paths[4])
+    assert not os.path.exists(paths[2])
+    assert not os.path.exists(cache_manager.telemetry_store.session_dir((2024, 2, "R")))
+
+
+def test_recently_used_entries_are_never_evicted(cache):
+    add_entry(cache, 1, age_days=0)
+    _, evicted = cache_manager.enforce(budget_bytes=0, compress_after_days=0)
+    assert evicted == []
+
+
+def test_cold_entries_are_compressed_and_inflated_on_open(cache):
+    api_path, path = add_entry(cache, 1, age_days=10, size=100_000)
+    pickle_path = os.path.join(path, "car_data.ff1pkl")
+    mtime = os.stat(pickle_path).st_mtime_ns
+
+    compressed, _ = cache_manager.enforce(budget_bytes=10**9, compress_after_days=7)
+    assert [e.key for e in compressed] == [(2024, 1, "R")]
+    assert not os.path.exists(pickle_path)
+    assert cache_manager.scan()[0].raw_bytes < 10_000
+
+    cache_manager.open_entry(api_path)
+    assert os.path.getsize(pickle_path) == 100_000
+    assert os.stat(pickle_path).st_mtime_ns == mtime
+
+
+def add_http_cache(root, expired_size, fresh_size):
+    # FastF1's raw response cache, with one expired and one fresh response.
+    root.mkdir(parents=True, exist_ok=True)
+    cache = SQLiteCache(str(root / cache_manager.HTTP_CACHE))
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    hour = datetime.timedelta(hours=1)
+    for url, size, expires in (("https://livetiming/CarData.z.jsonStream", expired_size, now - hour),
+                               ("https://livetiming/Index.json", fresh_size, now + hour)):
+        cache.responses[url] = CachedResponse(status_code=200, url=url, content=os.urandom(size), expires=expires)
+    cache.close()
+
+
+def test_http_cache_counts_against_the_budget_and_is_purged(cache):
+    add_entry(cache, 1, age_days=5)
+    add_http_cache(cache, expired_size=500_000, fresh_size=1000)
+    before = cache_manager.http_cache_bytes()
+    assert before > 500_000
+    assert "fastf1_http_cache.sqlite" in cache_manager.report(cache_manager.scan())
+
+    # Room for the entry only once the expired responses are gone.
+    _, evicted = cache_manager.enforce(budget_bytes=200_000, compress_after_days=0)
+    assert evicted == []
+    assert cache_manager.http_cache_bytes() < 100_000
+
+    # What is left of the HTTP cache still counts.
+    _, evicted = cache_manager.enforce(budget_bytes=cache_manager.http_cache_bytes(), compress_after_days=0)
+    assert [e.key for e in evicted] == [(2024, 1, "R")]
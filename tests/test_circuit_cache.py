@@ -0,0 +1,53 @@
+import pandas as pd
+
+from app import circuit_cache
+
+
+class FakeEvent:
+    year = 2024
+
+
+class FakeSession:
+    event = FakeEvent()
+    session_info = {'Meeting': {'Circuit': {'Key': 144, 'ShortName': 'Baku'}}}
+
+
+class FakeCircuitInfo:
+    corners = pd.DataFrame({
+        'X': [100.0, 200.0, 300.0],
+        'Y': [10.0, 20.0, 30.0],
+        'Number': [1, 2, 3],
+        'Letter': ['', 'a', ''],
+    })
+
+
+def test_geometry_is_fetched_once_and_persisted(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_info(session):
+        calls.append(session)
+        return FakeCircuitInfo()
+
+    monkeypatch.setattr(circuit_cache, 'CIRCUIT_DIR', str(tmp_path))
+    monkeypatch.setattr(circuit_cache, 'get_circuit_info', fake_info)
+    monkeypatch.setattr(circuit_cache, '_memory', {})
+
+    geometry = circuit_cache.get_circuit_geometry(FakeSession())
+    assert geometry['corners']['number'] == [1, 2, 3]
+    assert geometry['outline'] is None
+
+    tel = pd.DataFrame({'X': [0.0, 1.0], 'Y': [2.0, 3.0]})
+    circuit_cache.get_circuit_geometry(FakeSession(), tel)
+
+    # A fresh process only reads the file.
+    monkeypatch.setattr(circuit_cache, '_memory', {})
+    geometry = circuit_cache.get_circuit_geometry(FakeSession())
+    assert geometry['outline'] == {'x': [0.0, 1.0], 'y': [2.0, 3.0]}
+    assert len(calls) == 1
+
+
+def test_turn_annotations_are_batched():
+    geometry = {'corners': {'x': [1.0, 2.0], 'y': [3.0, 4.0], 'number': [1, 2], 'letter': ['', '']}}
+    annotations = circuit_cache.turn_annotations(geometry)
+    assert [a['text'] for a in annotations] == ['Turn1', 'Turn2']
+    assert annotations[0]['ay'] == 20 and annotations[1]['ay'] == -20
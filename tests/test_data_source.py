@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+from fastf1.core import Laps, Session
+
+from app import utils
+from app.telemetry_store import session_fingerprint
+from benchmarks.synthetic import build_session
+
+KEY = (2024, 1, "R")
+
+
+class CountingSource(utils.DataSource):
+    def __init__(self):
+        self.loads = 0
+
+    def load(self, year, rnd, session_type):
+        self.loads += 1
+        return build_session(year, rnd, session_type, n_drivers=2, n_laps=3)
+
+
+def test_record_then_replay_round_trip(tmp_path):
+    upstream = CountingSource()
+    recorder = utils.RecordingSource(str(tmp_path), upstream=upstream)
+    original = recorder.load(*KEY)
+    recorder.load(*KEY)
+    assert upstream.loads == 1
+
+    replayed = utils.ReplaySource(str(tmp_path)).load(*KEY)
+    assert isinstance(replayed, utils.BundleSession)
+    assert list(replayed.laps['Driver'].unique()) == ['VER', 'PER']
+    pd.testing.assert_series_equal(replayed.laps['LapTime'], original.laps['LapTime'])
+    assert set(replayed.car_data) == set(original.car_data)
+    assert replayed.car_data['1']['Speed'].tolist() == original.car_data['1']['Speed'].tolist()
+    assert len(replayed.pos_data['11']) == len(original.pos_data['11'])
+    assert utils.get_circuit_info(replayed).corners['Number'].tolist() == list(range(1, 13))
+    assert session_fingerprint(replayed).startswith("bundle:")
+    # Everything is preloaded, so per-driver telemetry loading is a no-op.
+    assert utils.load_driver_telemetry(replayed, ['VER', 'PER']) is False
+
+
+def test_replay_without_bundle_fails_fast(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        utils.ReplaySource(str(tmp_path)).load(*KEY)
+
+
+def test_data_source_selected_from_env(monkeypatch):
+    monkeypatch.setattr(utils, "_data_source", None)
+    monkeypatch.setenv("F1_DATA_SOURCE", "replay")
+    assert isinstance(utils.get_data_source(), utils.ReplaySource)
+
+    monkeypatch.setattr(utils, "_data_source", None)
+    monkeypatch.setenv("F1_DATA_SOURCE", "bogus")
+    with pytest.raises(ValueError):
+        utils.get_data_source()
+
+
+T0 = pd.Timestamp("2024-03-02 14:00:00")
+
+
+def fastf1_session(monkeypatch):
+    # A fastf1.core.Session as load(telemetry=False) leaves it: laps but no
+    # car or position data and no t0_date, with the api serving raw
+    # telemetry of every driver.
+    template = build_session(*KEY, n_drivers=3, n_laps=2)
+    session = Session.__new__(Session)
+    session.api_path = "/static/2024/test/"
+    session._laps = Laps(pd.DataFrame(template.laps), session=session)
+
+    def raw(data):
+        frames = {}
+        for number, tel in data.items():
+            frame = pd.DataFrame(tel).drop(columns='SessionTime')
+            frame['Date'] = T0 + tel['SessionTime']
+            frame['Time'] = tel['SessionTime']
+            frame['Source'] = 'car'
+            frames[number] = frame
+        return frames
+
+    requests = []
+    monkeypatch.setattr(utils.api, "car_data", lambda path: requests.append("car") or raw(template.car_data))
+    monkeypatch.setattr(utils.api, "position_data", lambda path: requests.append("pos") or raw(template.pos_data))
+    t0_calls = []
+    calculate = session._calculate_t0_date
+    session._calculate_t0_date = lambda *data: t0_calls.append(1) or calculate(*data)
+    return session, template, requests, t0_calls
+
+
+def test_load_driver_telemetry_builds_requested_drivers_only(monkeypatch):
+    session, template, requests, t0_calls = fastf1_session(monkeypatch)
+    number = {d: n for d, n in zip(session.laps['Driver'], session.laps['DriverNumber'])}
+
+    assert utils.load_driver_telemetry(session, ['VER']) is True
+    assert set(session._car_data) == set(session._pos_data) == {number['VER']}
+    assert session.t0_date == T0
+    pd.testing.assert_series_equal(
+        session.laps['LapStartDate'], session.laps['LapStartTime'] + T0, check_names=False
+    )
+    car = session.car_data[number['VER']]
+    assert car['SessionTime'].tolist() == template.car_data[number['VER']]['SessionTime'].tolist()
+    assert car.session is session and car.driver == number['VER']
+
+    assert utils.load_driver_telemetry(session, ['VER', 'HAM']) is True
+    assert set(session._car_data) == {number['VER'], number['HAM']}
+    assert session.car_data[number['VER']] is car
+    assert len(t0_calls) == 1
+
+    # Nothing missing: no api request at all.
+    assert utils.load_driver_telemetry(session, ['HAM']) is False
+    assert requests == ["car", "pos", "car", "pos"]
+
+
+def test_data_sources_must_implement_load():
+    class Incomplete(utils.DataSource):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,53 @@
+import pytest
+
+from app import callbacks, digest, figures
+from app.session_cache import session_cache, session_key
+
+KEY = session_key(2024, 1, "R")
+
+
+def test_digest_summarizes_session_without_telemetry(synthetic):
+    synthetic._car_data = synthetic._pos_data = None  # must not be touched
+    summary = digest.get_session_digest(*KEY)
+    assert summary["drivers"] == ["VER", "PER", "HAM"]
+    assert summary["lap_numbers"] == [1, 2, 3, 4]
+    assert summary["lap_delta"][0]["Delta"] == 0
+    assert summary["compounds"]["VER"] == ["SOFT", "MEDIUM", "HARD"]
+    fastest = summary["fastest"]["VER"]
+    ver = synthetic.laps.pick_drivers("VER").pick_fastest()
+    assert fastest["LapNumber"] == ver["LapNumber"]
+    assert fastest["Lap"] == pytest.approx(ver["LapTime"].total_seconds())
+    assert len(summary["weather"]["Time"]) == len(synthetic.weather_data)
+
+
+def test_repeat_visit_is_served_from_disk(synthetic, monkeypatch):
+    digest.get_session_digest(*KEY)
+    digest.invalidate_digest()
+    session_cache.invalidate()
+
+    def no_session(*key):
+        raise AssertionError("session loaded despite a digest on disk")
+
+    monkeypatch.setattr(digest, "get_cached_session", no_session)
+    outputs = callbacks.load_session(1, 2024, 1, "R")
+    assert outputs[0] == [{"label": d, "value": d} for d in ("VER", "PER", "HAM")]
+    assert outputs[8] == [1, 2]
+    assert figures.build_weather_figure(KEY).data
+    assert figures.build_sector_chart(KEY, ("VER", "PER")).data
+    assert [r["Driver"] for r in figures.build_sector_table(KEY, ("VER",))]
+
+
+def test_stale_digest_is_rebuilt(synthetic, monkeypatch):
+    digest.get_session_digest(*KEY)
+    monkeypatch.setattr(digest, "session_fingerprint", lambda s, exclude=(): "changed")
+    assert digest.get_session_digest(*KEY)["fingerprint"] == "changed"
+
+
+def test_memory_keeps_the_most_recent_digests(install_session, monkeypatch):
+    monkeypatch.setattr(digest, "MEMORY_ENTRIES", 2)
+    for rnd in (1, 2, 3):
+        install_session((2024, rnd, "R"), n_drivers=2, n_laps=2)
+        digest.get_session_digest(2024, rnd, "R")
+    digest.get_session_digest(2024, 2, "R")
+    digest.session_version(2024, 1, "R")  # read back from disk
+    assert list(digest._memory) == [session_key(2024, 2, "R"), session_key(2024, 1, "R")]
@@ -0,0 +1,50 @@
+import numpy as np
+
+from app.downsample import lttb, reduce_channels, reduce_trace, relayout_x_range
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 200)
+    idx = lttb(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_keeps_spikes():
+    x = np.arange(5000, dtype=float)
+    y = np.zeros_like(x)
+    y[1234] = 100.0
+    assert 1234 in lttb(x, y, 100)
+
+
+def test_lttb_short_input_is_untouched():
+    assert lttb(np.arange(10.0), np.arange(10.0), 100).tolist() == list(range(10))
+
+
+def test_reduce_trace_zoom_window_is_full_resolution():
+    x = np.linspace(0, 5000, 20_000)
+    y = np.cos(x)
+    zx, _ = reduce_trace(x, y, (1000.0, 1100.0), budget=1500)
+    assert zx[0] <= 1000.0 and zx[-1] >= 1100.0
+    assert len(zx) == np.count_nonzero((x >= zx[0]) & (x <= zx[-1]))
+
+
+def test_relayout_x_range():
+    assert relayout_x_range(None) is None
+    assert relayout_x_range({"autosize": True}) is None
+    assert relayout_x_range({"xaxis.autorange": True}) is None
+    assert relayout_x_range({"xaxis.range[0]": 10.4, "xaxis.range[1]": 99.2}) == (10.0, 100.0)
+
+
+def test_reduce_channels_shares_samples_within_budget():
+    x = np.linspace(0, 5000, 20000)
+    channels = {"Speed": 200 + 100 * np.sin(x / 300), "nGear": (x // 700) % 8}
+    rx, reduced = reduce_channels(x, channels, budget=600)
+    assert len(rx) <= 600
+    assert set(reduced) == {"Speed", "nGear"}
+    assert all(len(v) == len(rx) for v in reduced.values())
+    assert np.all(np.diff(rx) > 0)
+    # Every gear change survives the reduction.
+    assert set(np.unique(reduced["nGear"])) == set(np.unique(channels["nGear"]))
@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from app.export import EXPORT_CHANNELS, iter_npz_stream, parse_laps, register_export
+from app.session_cache import session_cache, session_key
+from app.telemetry_store import CHANNELS, telemetry_store
+
+KEY = session_key(2024, 1, "R")
+URL = "/api/v1/sessions/2024/1/R/telemetry"
+
+
+@pytest.fixture
+def client(synthetic):
+    server = Flask(__name__)
+    register_export(server)
+    return server.test_client()
+
+
+def test_session_index(client):
+    body = client.get("/api/v1/sessions/2024/1/R").get_json()
+    assert body["drivers"] == ["VER", "PER", "HAM"]
+    assert body["lap_numbers"] == [1, 2, 3, 4]
+
+
+def test_npz_export_streams_one_frame_per_lap(client):
+    response = client.get(URL + "?drivers=VER,HAM&laps=2-3&channels=Distance,Speed")
+    assert response.status_code == 200 and response.is_streamed
+    frames = list(iter_npz_stream(io.BytesIO(response.get_data())))
+    assert [(str(f["Driver"]), int(f["LapNumber"])) for f in frames] == [
+        ("VER", 2), ("VER", 3), ("HAM", 2), ("HAM", 3)
+    ]
+    assert set(frames[0]) == {"Driver", "LapNumber", "Distance", "Speed"}
+    lap = telemetry_store.get_lap(KEY, session_cache.peek(KEY), "VER", 2, ("Speed",))
+    np.testing.assert_array_equal(frames[0]["Speed"], lap["Speed"])
+
+
+def test_etag_revalidation(client):
+    first = client.get(URL + "?drivers=VER&laps=1")
+    etag = first.headers["ETag"]
+    assert client.get(URL + "?drivers=VER&laps=1", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(URL + "?drivers=PER&laps=1").headers["ETag"] != etag
+
+
+def test_etag_covers_telemetry_fetched_by_the_export(client, monkeypatch):
+    # The first export of a driver downloads its telemetry into the FastF1
+    # cache entry, changing the session fingerprint under the request.
+    from app import extraction
+
+    ensure_shards = extraction.ensure_shards
+
+    def downloading(key, session, drivers):
+        session.fingerprint = "with car data"
+        return ensure_shards(key, session, drivers)
+
+    monkeypatch.setattr(extraction, "ensure_shards", downloading)
+    etag = client.get(URL + "?drivers=VER&laps=1").headers["ETag"]
+    assert client.get(URL + "?drivers=VER&laps=1", headers={"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.parametrize("query, status", [
+    ("", 400),
+    ("?drivers=XXX", 404),
+    ("?drivers=VER&channels=Bogus", 400),
+    ("?drivers=VER&laps=a-b", 400),
+    ("?drivers=VER&format=csv", 400),
+    ("?drivers=VER&laps=100-200", 404),
+])
+def test_invalid_queries(client, query, status):
+    response = client.get(URL + query)
+    assert response.status_code == status
+    assert "error" in response.get_json()
+
+
+def test_lap_ranges_are_clipped_to_the_session():
+    assert parse_laps("2-3000000", [1, 2, 3, 4]) == [2, 3, 4]
+    assert parse_laps("0-2,4,9", [1, 2, 4]) == [1, 2, 4]
+
+
+def test_arrow_export(client):
+    pa = pytest.importorskip("pyarrow")
+    response = client.get(URL + "?drivers=PER&laps=1,4&channels=Speed&format=arrow")
+    table = pa.ipc.open_stream(response.get_data()).read_all()
+    assert table.column_names == ["Driver", "LapNumber", "Speed"]
+    assert sorted(set(table.column("LapNumber").to_pylist())) == [1, 4]
+
+
+def test_export_channels_match_the_store():
+    assert EXPORT_CHANNELS == ('Time',) + CHANNELS
@@ -0,0 +1,17 @@
+from app import extraction
+from app.telemetry_store import TelemetryStore
+
+from tests.test_telemetry_store import FakeSession
+
+
+def test_extract_laps_reports_errors_per_request(tmp_path, monkeypatch):
+    session = FakeSession()
+    session._car_data = session.car_data
+    monkeypatch.setattr(extraction, "telemetry_store", TelemetryStore(str(tmp_path)))
+
+    requests = [("VER", 1), ("VER", 2), ("VER", 9), ("HAM", 1)]
+    result = extraction.extract_laps((2024, 1, "Q"), session, requests, ("Distance", "Speed"))
+
+    assert set(result.data) == {("VER", 1), ("VER", 2)}
+    assert set(result.errors) == {("VER", 9), ("HAM", 1)}
+    assert len(result.data[("VER", 2)]["Speed"]) > 0
@@ -0,0 +1,158 @@
+import os
+
+import pytest
+
+from app import callbacks, figures, utils
+from app.figure_cache import FigureCache, figure_cache, figure_key
+from app.session_cache import session_cache, session_key
+from app.telemetry_store import telemetry_store
+
+KEY = session_key(2024, 1, "R")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting(value):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return value
+    return build, calls
+
+
+def test_key_depends_on_inputs_and_version():
+    assert figure_key("telemetry", "v1", [["VER"], [1]]) == figure_key("telemetry", "v1", [("VER",), (1,)])
+    assert figure_key("telemetry", "v1", [["VER"], [1]]) != figure_key("telemetry", "v2", [["VER"], [1]])
+    assert figure_key("telemetry", "v1", [["VER", "HAM"]]) != figure_key("telemetry", "v1", [["HAM", "VER"]])
+
+
+def test_memory_and_disk_tiers(derived):
+    cache = FigureCache()
+    build, calls = counting({'traces': [1, 2, 3]})
+    assert cache.get_or_build("x", KEY, "v1", [], build) == {'traces': [1, 2, 3]}
+    assert cache.get_or_build("x", KEY, "v1", [], build) == {'traces': [1, 2, 3]}
+    assert cache.stats()["memory_hits"] == 1
+
+    # Another worker: empty memory, same disk.
+    other = FigureCache()
+    assert other.get_or_build("x", KEY, "v1", [], build) == {'traces': [1, 2, 3]}
+    assert other.stats()["disk_hits"] == 1
+    assert len(calls) == 1
+
+    # A new session version is a different entry.
+    cache.get_or_build("x", KEY, "v2", [], build)
+    assert len(calls) == 2
+
+
+def test_nothing_is_cached_without_a_version(derived):
+    cache = FigureCache()
+    build, calls = counting({})
+    cache.get_or_build("x", KEY, None, [], build)
+    cache.get_or_build("x", KEY, None, [], build)
+    assert len(calls) == 2
+    assert not os.listdir(derived)
+
+
+def test_entries_expire(derived):
+    clock = Clock()
+    cache = FigureCache(ttl=60, clock=clock)
+    build, calls = counting([1])
+    cache.get_or_build("x", KEY, "v1", [], build)
+    clock.now += 61
+    cache.get_or_build("x", KEY, "v1", [], build)
+    assert len(calls) == 2
+
+    # Expired disk entries are not served to other workers either.
+    clock.now += 61
+    FigureCache(ttl=60, clock=clock).get_or_build("x", KEY, "v1", [], build)
+    assert len(calls) == 3
+
+
+def test_memory_tier_is_size_bounded(derived):
+    cache = FigureCache(memory_mb=0.01, disk_mb=0)
+    for n in range(20):
+        cache.get_or_build("x", KEY, "v1", [n], lambda n=n: {'n': n, 'data': os.urandom(1000).hex()})
+    stats = cache.stats()
+    assert stats["bytes"] <= 0.01 * 1024 * 1024 and stats["evictions"] > 0
+    build, calls = counting({})
+    cache.get_or_build("x", KEY, "v1", [0], build)  # evicted first
+    assert len(calls) == 1
+
+
+def test_disk_tier_evicts_least_recently_served(derived):
+    clock = Clock()
+    cache = FigureCache(disk_mb=1, clock=clock)
+    for n in range(3):
+        cache.get_or_build("x", KEY, "v1", [n], lambda n=n: {'n': n, 'data': os.urandom(300_000).hex()})
+        clock.now += 1
+    cache.max_disk_bytes = max(p.stat().st_size for p in derived.rglob("*.json.gz"))
+    cache.clear()
+    cache.get_or_build("x", KEY, "v1", [0], lambda: pytest.fail("should be on disk"))
+    assert cache.enforce_disk() == 2
+    names = [p.name for p in derived.rglob("*.json.gz")]
+    assert names == [f"{figure_key('x', 'v1', [0])}.json.gz"]
+
+
+def test_callbacks_share_figures_across_workers(synthetic):
+    callbacks.load_session(1, 2024, 1, "R")
+    first = callbacks.update_telemetry_data(["VER", "HAM"], [1, 2], None, "2024,1,R")
+    assert figure_cache.stats()["misses"] >= 1
+
+    # A fresh worker process: no memos, no cached figures in memory.
+    figures.clear_memo()
+    hits = figure_cache.stats()["disk_hits"]
+    again = callbacks.update_telemetry_data(["VER", "HAM"], [1, 2], None, "2024,1,R")
+    assert figure_cache.stats()["disk_hits"] == hits + 1
+    assert [t['name'] for t in again['traces']] == [t['name'] for t in first['traces']]
+    assert again['traces'][0]['y'] == first['traces'][0]['y']
+
+
+def test_partial_figures_are_not_cached(synthetic, monkeypatch):
+    callbacks.load_session(1, 2024, 1, "R")
+    build_driver = telemetry_store.build_driver
+
+    def flaky(key, session, driver):
+        if driver == "PER":
+            raise OSError("transient")
+        return build_driver(key, session, driver)
+
+    monkeypatch.setattr(telemetry_store, "build_driver", flaky)
+    partial = callbacks.update_telemetry_data(["VER", "PER"], [1], None, "2024,1,R")
+    assert [t['name'] for t in partial['traces']] == ["Lap 1, VER"]
+
+    monkeypatch.setattr(telemetry_store, "build_driver", build_driver)
+    full = callbacks.update_telemetry_data(["VER", "PER"], [1], None, "2024,1,R")
+    assert [t['name'] for t in full['traces']] == ["Lap 1, VER", "Lap 1, PER"]
+
+
+def test_telemetry_figures_follow_the_full_session_fingerprint(synthetic, monkeypatch):
+    # The digest's version ignores the car data; a re-download of it must
+    # still address new telemetry figures.
+    monkeypatch.setattr("app.digest.session_version", lambda *key: "digest")
+    callbacks.update_telemetry_data(["VER"], [1], None, "2024,1,R")
+    misses = figure_cache.stats()["misses"]
+    builds = figures.build_telemetry_data.cache_info().misses
+    synthetic.fingerprint = "car data re-downloaded"
+    callbacks.update_telemetry_data(["VER"], [1], None, "2024,1,R")
+    assert figure_cache.stats()["misses"] == misses + 1
+    # Rebuilt, not served from the builder's in-process memo.
+    assert figures.build_telemetry_data.cache_info().misses == builds + 1
+
+
+def test_fresh_workers_serve_telemetry_figures_without_the_session(synthetic, monkeypatch):
+    callbacks.load_session(1, 2024, 1, "R")
+    first = callbacks.update_telemetry_data(["VER"], [1, 2], None, "2024,1,R")
+
+    # Another worker: nothing in memory, and loading the session would fail.
+    session_cache.invalidate()
+    figures.clear_memo()
+    monkeypatch.setattr(utils, "get_session", lambda *key: pytest.fail("session loaded"))
+    again = callbacks.update_telemetry_data(["VER"], [1, 2], None, "2024,1,R")
+    assert again['traces'][0]['y'] == first['traces'][0]['y']
@@ -0,0 +1,31 @@
+from app import figures
+
+
+DIGEST = {
+    "weather": {
+        "Time": [0.0, 60.0, 120.0],
+        "AirTemp": [25.0, 25.5, 26.0],
+        "TrackTemp": [40.0, 41.0, 42.5],
+    },
+}
+
+
+def test_parse_session_info():
+    assert figures.parse_session_info("2024,17,q") == (2024, 17, "Q")
+
+
+def test_weather_figure_is_memoized_per_session(monkeypatch):
+    calls = []
+
+    def fake_digest(*key):
+        calls.append(key)
+        return DIGEST
+
+    monkeypatch.setattr(figures, "get_session_digest", fake_digest)
+    figures.clear_memo()
+
+    first = figures.build_weather_figure((2024, 17, "Q"))
+    assert figures.build_weather_figure((2024, 17, "Q")) is first
+    figures.build_weather_figure((2024, 18, "Q"))
+    assert calls == [(2024, 17, "Q"), (2024, 18, "Q")]
+    figures.clear_memo()
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app import callbacks, digest, utils
+from app.jobs import LazyDiskcacheManager, reporting_progress
+from app.session_cache import session_key
+from app.telemetry_store import telemetry_store
+
+
+def test_background_load_reports_progress_and_prefetches(synthetic):
+    progress = []
+    outputs = callbacks.load_session_in_background(progress.append, 1, 2024, 1, "R")
+    assert outputs[6] == "2024,1,R"
+    assert progress == [(75, "Preparing telemetry")]
+    key = session_key(2024, 1, "R")
+    assert all(telemetry_store.has_driver(key, synthetic, d) for d in outputs[1])
+
+
+def test_prefetch_runs_in_a_real_job_process(synthetic, derived):
+    pytest.importorskip("diskcache")
+    pytest.importorskip("multiprocess")
+
+    # A plot drawn in the web worker first leaves an idle extraction thread
+    # behind, which the forked job process inherits the count of but not
+    # the thread itself.
+    callbacks.update_telemetry_data(["VER"], [1], None, "2024,1,R")
+    manager = LazyDiskcacheManager(str(derived / "jobs"))
+    job_fn = manager.make_job_fn(callbacks.load_session_in_background, progress=True)
+    pid = manager.call_job_fn("load", job_fn, [1, 2024, 1, "R"], {})
+    deadline = time.monotonic() + 30
+    while not manager.result_ready("load"):
+        if time.monotonic() > deadline:
+            manager.terminate_job(pid)
+            pytest.fail("background load did not finish")
+        time.sleep(0.05)
+    outputs = manager.get_result("load", pid)
+    assert outputs[6] == "2024,1,R"
+    key = session_key(2024, 1, "R")
+    assert all(telemetry_store.has_driver(key, synthetic, d) for d in outputs[1])
+
+
+def test_forked_jobs_do_not_wait_on_the_parents_loads():
+    # A session load in flight, and the locks it holds, when a job process
+    # is forked off the web worker.
+    started, release = threading.Event(), threading.Event()
+
+    def load():
+        with utils._telemetry_lock, digest._lock:
+            started.set()
+            release.wait()
+        return "parent"
+
+    thread = threading.Thread(target=utils.session_loads.do, args=("key", load))
+    thread.start()
+    started.wait()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                ok = (utils.session_loads.do("key", lambda: "child", timeout=1) == "child"
+                      and utils._telemetry_lock.acquire(timeout=1) and digest._lock.acquire(timeout=1))
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        release.set()
+        thread.join()
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_load_timing_reports_stages_in_order():
+    class FakeSession:
+        f1_api_support = True
+
+        def load(self, **kwargs):
+            progress.append(("load", kwargs["weather"]))
+
+        def _load_weather_data(self, livedata=None):
+            progress.append("weather data")
+
+    progress = []
+    with reporting_progress(progress.append):
+        utils._load_timing(FakeSession())
+    assert progress == [(25, "Loading timing and laps"), ("load", False),
+                        (50, "Loading weather"), "weather data"]
+
+
+def test_stages_are_silent_outside_background_jobs():
+    progress = []
+    utils._load_timing(type("S", (), {"f1_api_support": False, "load": lambda self, **kw: progress.append(1)})())
+    assert progress == [1]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from app.lean import CAR_COLUMNS, POS_COLUMNS, slim_laps, slim_session
+from app.session_cache import estimate_session_bytes
+from benchmarks.synthetic import build_session
+
+
+def test_synthetic_sessions_are_slim():
+    session = build_session(n_drivers=2, n_laps=3)
+    car = next(iter(session.car_data.values()))
+    pos = next(iter(session.pos_data.values()))
+    assert list(car.columns) == list(CAR_COLUMNS)
+    assert list(pos.columns) == list(POS_COLUMNS)
+    assert car['Speed'].dtype == np.float32 and car['nGear'].dtype == np.int8
+    assert isinstance(session.laps['Driver'].dtype, pd.CategoricalDtype)
+    assert isinstance(session.laps['Compound'].dtype, pd.CategoricalDtype)
+    # Still FastF1 objects bound to their session.
+    assert car.session is session and session.laps.session is session
+    assert session.laps.pick_drivers('VER').pick_fastest() is not None
+
+
+def test_slimming_shrinks_and_is_idempotent():
+    session = build_session(n_drivers=2, n_laps=3)
+    before = estimate_session_bytes(session)
+    slim_session(session)
+    assert estimate_session_bytes(session) == before
+    laps = slim_laps(session.laps)
+    assert laps['Driver'].dtype == session.laps['Driver'].dtype
+
+
+def test_missing_compounds_stay_missing():
+    laps = pd.DataFrame({'Driver': ['VER', 'VER'], 'Compound': ['SOFT', None], 'TyreLife': [1.0, 2.0]})
+    laps = slim_laps(laps)
+    assert laps['Compound'].isna().tolist() == [False, True]
+    assert laps['TyreLife'].dtype == np.float32
@@ -0,0 +1,77 @@
+import pytest
+
+from app import metrics
+from app.metrics import Registry
+
+
+def test_timed_records_duration_and_errors(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+
+    @metrics.instrument("stage.ok")
+    def ok():
+        return {"data": [1, 2, 3]}
+
+    @metrics.instrument("stage.bad")
+    def bad():
+        raise ValueError("boom")
+
+    ok()
+    ok()
+    with pytest.raises(ValueError):
+        bad()
+
+    assert registry.histogram("f1_stage_duration_seconds", stage="stage.ok").count == 2
+    assert registry.counter_value("f1_stage_errors_total", stage="stage.bad") == 1
+    assert registry.histogram("f1_stage_duration_seconds", stage="stage.bad").count == 1
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    registry.inc("requests_total", 3, result='a"b')
+    registry.observe("latency_seconds", 0.02, buckets=(0.01, 0.1), stage="x")
+    registry.add_collector(lambda: [("cache_entries", "gauge", "Entries", {}, 4)])
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{result="a\\"b"} 3' in text
+    assert 'latency_seconds_bucket{le="0.01",stage="x"} 0' in text
+    assert 'latency_seconds_bucket{le="0.1",stage="x"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf",stage="x"} 1' in text
+    assert 'latency_seconds_count{stage="x"} 1' in text
+    assert 'cache_entries 4' in text
+
+
+def test_metrics_endpoint_and_timing_header(monkeypatch):
+    from app import server
+
+    client = server.test_client()
+    monkeypatch.setattr(metrics, "TIMING_HEADER", True)
+    assert "X-Response-Time" in client.get("/").headers
+    update = client.post("/_dash-update-component", json={
+        "output": "weather-plot.figure",
+        "outputs": {"id": "weather-plot", "property": "figure"},
+        "inputs": [{"id": "session-store", "property": "children", "value": ""}],
+        "changedPropIds": [], "state": [],
+    })
+    assert update.status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'f1_http_request_duration_seconds_count{route="/"}' in body
+    assert 'f1_payload_bytes_count{output="weather-plot.figure"} 1' in body
+    assert 'f1_stage_duration_seconds_count{stage="callback.update_weather_plot"}' in body
+    assert "f1_session_cache_requests_total" in body
+    assert 'f1_figure_memo_requests_total{builder="telemetry",result="hit"}' in body
+
+
+def test_callback_errors_are_logged_with_traceback(synthetic, monkeypatch, caplog):
+    from app import callbacks, figures
+
+    def broken(*args, **kwargs):
+        raise ValueError("no weather")
+
+    monkeypatch.setattr(figures, "build_weather_figure", broken)
+    assert callbacks.update_weather_plot("2024,1,R") == {}
+    record, = [r for r in caplog.records if r.name == "app.callbacks"]
+    assert record.levelname == "ERROR" and record.exc_info[1].args == ("no weather",)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from app import digest, figures
+from app.minisectors import crossing_times, minisector_dominance, minisector_index
+from app.session_cache import session_key
+
+KEY = session_key(2024, 1, "R")
+
+
+@pytest.fixture
+def synthetic(install_session):
+    return install_session(n_drivers=4, n_laps=3)
+
+
+def test_crossing_times_per_driver():
+    # Constant speed over 1000 m in 10 s, and a lap that is slow for the
+    # first half (7 s) and fast for the second (2 s).
+    distance = np.linspace(10, 1000, 100)
+    steady = (distance, distance / 100.0)
+    uneven_time = np.where(distance <= 500, distance / 500 * 7, 7 + (distance - 500) / 500 * 2)
+    crossings = crossing_times([steady, (distance, uneven_time)], 2)
+    assert crossings == pytest.approx(np.array([[0, 5, 10], [0, 7, 9]]))
+    times = np.diff(crossings, axis=1)
+    assert np.argmin(times, axis=0).tolist() == [0, 1]
+
+
+def test_minisector_index_clips_lap_end():
+    assert minisector_index([0.0, 0.49, 0.5, 1.0], 2).tolist() == [0, 0, 1, 1]
+
+
+def test_dominance_covers_every_minisector(synthetic):
+    fastest = digest.get_session_digest(*KEY)['fastest']
+    laps = {driver: lap['LapNumber'] for driver, lap in fastest.items()}
+    result = minisector_dominance(KEY, synthetic, laps, n=10)
+    assert result['drivers'] == list(laps)
+    assert result['times'].shape == (len(laps), 10)
+    assert len(result['winners']) == 10 and set(result['winners']) <= set(laps)
+    assert np.all(np.diff(result['minisector']) >= 0)
+
+    data = figures.build_dominance_data(KEY, 10)
+    assert data['traces'] == []
+    won = [t for t in data['figure']['data'] if t.get('name')]
+    assert sum(int(t['name'].split('(')[1][:-1]) for t in won) == 10
@@ -0,0 +1,55 @@
+import prewarm
+
+
+def fake_work(year, rnd, session_type, telemetry):
+    if rnd == 3:
+        raise RuntimeError("network down")
+    status = "skipped" if session_type == "S" else "ok"
+    return {"status": status, "seconds": 1.5, "bytes": 2**20, "error": None}
+
+
+def test_parse_range():
+    assert prewarm.parse_range("2024") == [2024]
+    assert prewarm.parse_range("1-3,7,5-6") == [1, 2, 3, 5, 6, 7]
+
+
+def test_run_is_resumable(tmp_path, capsys):
+    state = str(tmp_path / "state.json")
+    jobs = [(2024, rnd, t) for rnd in (1, 2, 3) for t in ("S", "R")]
+    results = prewarm.run(jobs, 0, state, work=fake_work)
+    assert results["2024_01_R"]["status"] == "ok"
+    assert results["2024_01_S"]["status"] == "skipped"
+    assert results["2024_03_R"]["status"] == "failed"
+
+    calls = []
+
+    def counting_work(*job):
+        calls.append(job[:3])
+        return fake_work(2024, 1, *job[2:])
+
+    results = prewarm.run(jobs, 0, state, work=counting_work)
+    # Only the failed sessions are retried.
+    assert calls == [(2024, 3, "S"), (2024, 3, "R")]
+    assert all(r["status"] != "failed" for r in results.values())
+
+    text = prewarm.report(results)
+    assert "2024_02_R" in text
+    assert "3 ok, 3 skipped, 0 failed; 4.5s, 3.0 MB" in text
+
+
+def test_process_pool(tmp_path):
+    results = prewarm.run([(2024, 1, "R"), (2024, 2, "R")], 2, str(tmp_path / "s.json"), work=fake_work)
+    assert [r["status"] for r in results.values()] == ["ok", "ok"]
+
+
+def test_prewarm_session_builds_derived_stores(install_session):
+    from app import circuit_cache
+    from app.telemetry_store import telemetry_store
+
+    session = install_session(n_drivers=2, n_laps=3)
+    result = prewarm.prewarm_session(2024, 1, "R")
+    assert result["status"] == "ok" and result["error"] is None
+    assert result["bytes"] > 0
+    key = (2024, 1, "R")
+    assert all(telemetry_store.has_driver(key, session, d) for d in ("VER", "PER"))
+    assert circuit_cache._read(circuit_cache.circuit_key(session))["outline"] is not None
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app import callbacks, race_replay
+from app.race_replay import PositionIndex
+from app.session_cache import session_key
+
+KEY = session_key(2024, 1, "R")
+
+
+def two_cars():
+    # Car A samples every second from t=10 to 20 along x = t; car B only
+    # from t=15, along y = 2t, with a 10 s data gap after t=17.
+    a = np.arange(10.0, 21.0)
+    b = np.array([15.0, 16.0, 17.0, 27.0])
+    return PositionIndex(
+        ["A", "B"], [0, len(a), len(a) + len(b)],
+        np.concatenate([a, b]), np.concatenate([a, np.zeros_like(b)]), np.concatenate([np.zeros_like(a), 2 * b]),
+        [0, 2, 3], [5.0, 15.0, 14.0], [1, 2, 1], "fp",
+    )
+
+
+def test_frames_are_interpolated_per_car():
+    index = two_cars()
+    frame = index.frame(12.5)
+    assert frame["x"][0] == pytest.approx(12.5)
+    assert frame["x"][1] is None  # not on track yet
+    assert frame["lap"] == [1, 0]
+
+    frame = index.frame(16.5)
+    assert frame["x"] == [pytest.approx(16.5), 0.0]
+    assert frame["y"][1] == pytest.approx(33.0)
+    assert frame["lap"] == [2, 1]
+
+    assert index.frame(20.5)["x"][0] is None  # past the last sample
+    assert index.frame(22.0)["y"][1] is None  # inside the data gap
+
+
+def test_index_round_trips_through_disk(tmp_path):
+    index = two_cars()
+    path = str(tmp_path / race_replay.INDEX_FILE)
+    index.save(path)
+    loaded = PositionIndex.load(path)
+    assert loaded.drivers == ["A", "B"] and loaded.fingerprint == "fp"
+    assert loaded.frame(16.5) == index.frame(16.5)
+
+
+def test_session_index_matches_position_data(synthetic):
+    index = race_replay.get_position_index(*KEY)
+    assert index.drivers == ["VER", "PER", "HAM"]
+    pos = synthetic.pos_data[synthetic.laps.pick_drivers("PER")["DriverNumber"].iloc[0]]
+    sample = pos.iloc[len(pos) // 2]
+    frame = index.frame(sample["SessionTime"].total_seconds())
+    assert frame["x"][1] == pytest.approx(sample["X"], abs=0.1)
+    assert frame["y"][1] == pytest.approx(sample["Y"], abs=0.1)
+
+    base, start, end, value = callbacks.update_replay_base(True, "2024,1,R")
+    assert base["drivers"] == index.drivers and (start, end) == (index.start, index.end)
+    assert callbacks.update_replay_frame(value, "2024,1,R")["drivers"] == index.drivers
+
+
+def test_frames_check_freshness_once_per_interval(synthetic, monkeypatch):
+    calls = []
+    fingerprint = race_replay.session_fingerprint
+    monkeypatch.setattr(race_replay, "session_fingerprint", lambda *a, **k: calls.append(1) or fingerprint(*a, **k))
+    index = race_replay.get_position_index(*KEY)
+    built = len(calls)
+    for t in np.linspace(index.start, index.end, 50):
+        callbacks.update_replay_frame(float(t), "2024,1,R")
+    assert len(calls) == built
+
+    # Past the interval the next frame re-checks, and a changed session is
+    # noticed.
+    monkeypatch.setattr(race_replay, "FRESHNESS_INTERVAL", 0.0)
+    synthetic.fingerprint = "position data re-downloaded"
+    assert race_replay.get_position_index(*KEY) is not index
@@ -0,0 +1,77 @@
+import pytest
+
+from app import callbacks, season
+from app.locks import file_lock
+from app.session_cache import session_cache
+
+
+@pytest.fixture
+def rounds(install_session, derived, monkeypatch):
+    # Rounds 1 and 2 of 2024, each with a synthetic Q and R.
+    monkeypatch.setattr(season, "SEASON_DIR", str(derived / "season"))
+    for rnd in (1, 2):
+        for session_type in ("Q", "R"):
+            install_session((2024, rnd, session_type), n_drivers=3, n_laps=6, seed=rnd)
+
+
+def test_round_aggregates(rounds):
+    agg = season.round_aggregates(2024, 1)
+    assert min(agg["gap_to_pole"].values()) == 0
+    assert set(agg["gap_to_pole"]) == {"VER", "PER", "HAM"}
+    field = agg["race_pace"]["field"]
+    assert set(field) <= {"SOFT", "MEDIUM", "HARD"}
+    assert sum(c["laps"] for c in field.values()) > 0
+    assert agg["weather"]["track_temp"] is not None
+
+
+def test_update_is_incremental(rounds):
+    calls = []
+
+    def work(year, rnd):
+        calls.append(rnd)
+        return season.round_aggregates(year, rnd)
+
+    season.update_season(2024, [1], work=work)
+    result = season.update_season(2024, [1, 2], work=work)
+    assert calls == [1, 2]
+    assert [r for r, _ in season.completed_rounds(result)] == [1, 2]
+    assert season.load_season(2024)["rounds"].keys() == {"1", "2"}
+
+    season.update_season(2024, [2], work=work, force=True)
+    assert calls == [1, 2, 2]
+
+
+def test_failed_rounds_are_retried(rounds):
+    def broken(year, rnd):
+        raise RuntimeError("network down")
+
+    assert season.update_season(2024, [1], work=broken)["rounds"]["1"]["status"] == "failed"
+    assert season.update_season(2024, [1])["rounds"]["1"]["status"] == "ok"
+
+
+def test_season_view_renders_from_aggregates(rounds, monkeypatch):
+    gap, pace, weather, status = callbacks.update_season_view(True, 2024)
+    assert gap == {} and "app.season update 2024" in status
+
+    season.update_season(2024, [1, 2])
+    session_cache.invalidate()  # the view must not need any session
+    gap, pace, weather, status = callbacks.update_season_view(True, 2024)
+    assert status == "2 rounds aggregated"
+    assert {t.name for t in gap.data} == {"VER", "PER", "HAM"}
+    assert len(weather.data[0].x) == 2
+
+
+def test_rounds_are_computed_outside_the_lock(rounds):
+    path = season._season_path(2024)
+
+    def work(year, rnd):
+        # Another updater saves a round while this one is computing.
+        with file_lock(f"{path}.lock", timeout=0):
+            other = season.load_season(year) or {"version": season.SEASON_VERSION, "year": year, "rounds": {}}
+            other["rounds"]["9"] = {"status": "ok", "computed": 0}
+            season._save_season(year, other)
+        return season.round_aggregates(year, rnd)
+
+    result = season.update_season(2024, [1], work=work)
+    assert result["rounds"].keys() == {"1", "9"}
+    assert season.load_season(2024)["rounds"].keys() == {"1", "9"}
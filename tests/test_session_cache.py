@@ -0,0 +1,101 @@
+from app.session_cache import SessionCache, release_telemetry, session_key
+
+
+def test_session_key_normalizes_inputs():
+    assert session_key("2024", "17", "q") == (2024, 17, "Q")
+
+
+def test_hits_and_misses():
+    cache = SessionCache(max_mb=1)
+    assert cache.get(("a",)) is None
+    cache.put(("a",), object(), size=10)
+    assert cache.get(("a",)) is not None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_respects_budget():
+    cache = SessionCache(max_mb=1)
+    half = 512 * 1024
+    cache.put("a", object(), size=half)
+    cache.put("b", object(), size=half)
+    cache.get("a")
+    cache.put("c", object(), size=half)
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.evictions == 1
+
+
+def test_oversized_session_is_kept():
+    cache = SessionCache(max_mb=1)
+    cache.put("big", object(), size=10 * 1024 * 1024)
+    assert "big" in cache
+
+
+def test_invalidate():
+    cache = SessionCache(max_mb=1)
+    cache.put("a", object(), size=1)
+    cache.put("b", object(), size=1)
+    cache.invalidate("a")
+    assert "a" not in cache and "b" in cache
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_get_or_load_calls_loader_once():
+    cache = SessionCache(max_mb=1)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return object()
+
+    first = cache.get_or_load("a", loader)
+    assert cache.get_or_load("a", loader) is first
+    assert len(calls) == 1
+
+
+def test_evicted_sessions_are_released():
+    released = []
+    cache = SessionCache(max_mb=1, on_evict=released.append)
+    half = 512 * 1024
+    a, b, c = object(), object(), object()
+    cache.put("a", a, size=half)
+    cache.put("b", b, size=half)
+    cache.put("c", c, size=half)
+    assert released == [a]
+    cache.invalidate()
+    assert released == [a]
+
+
+def test_release_telemetry_keeps_bundle_sessions():
+    class Session:
+        def __init__(self, reloadable):
+            self.reloadable_telemetry = reloadable
+            self._car_data = {"1": "car"}
+            self._pos_data = {"1": "pos"}
+
+    fastf1_session, bundle = Session(True), Session(False)
+    release_telemetry(fastf1_session)
+    release_telemetry(bundle)
+    assert fastf1_session._car_data == {} and fastf1_session._pos_data == {}
+    assert bundle._car_data == {"1": "car"}
+
+
+def test_memory_ceiling_evicts_least_recently_used():
+    rss = [3, 2, 1]  # MB reported before each check; drops after every eviction
+    cache = SessionCache(max_mb=1024, memory_ceiling_mb=1.5, rss=lambda: rss.pop(0) * 2**20 if rss else 0)
+    cache.put("a", object(), size=1)
+    cache.put("b", object(), size=1)
+    cache.put("c", object(), size=1)
+    # put("a") saw 3 MB with nothing else to evict, put("b") evicted "a" at
+    # 2 MB and stopped at 1 MB; put("c") found the process under the ceiling.
+    assert "a" not in cache and "b" in cache and "c" in cache
+    assert cache.stats()["ceiling_evictions"] == 1
+
+
+def test_memory_ceiling_keeps_most_recent_session():
+    cache = SessionCache(max_mb=1024, memory_ceiling_mb=1, rss=lambda: 10 * 2**20)
+    cache.put("a", object(), size=1)
+    cache.put("b", object(), size=1)
+    assert "a" not in cache and "b" in cache
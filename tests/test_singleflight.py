@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight, SingleFlightTimeout
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(2)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", load))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while flight.stats()["coalesced"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(r is results[0] for r in results)
+    assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_propagate_to_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    call()
+    leader.join()
+    assert len(errors) == 2
+    # The failed flight is gone, so the next call retries.
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_waiter_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(2)))
+    leader.start()
+    while flight.stats()["in_flight"] == 0:
+        time.sleep(0.01)
+    with pytest.raises(SingleFlightTimeout):
+        flight.do("k", lambda: None, timeout=0.05)
+    release.set()
+    leader.join()
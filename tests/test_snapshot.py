@@ -0,0 +1,69 @@
+import os
+import threading
+
+from app import snapshot
+from app.locks import file_lock
+from app.telemetry_store import TelemetryStore
+
+
+class FakeSession:
+    loaded = False
+
+
+def test_first_worker_builds_snapshot_others_attach(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "telemetry_store", TelemetryStore(str(tmp_path)))
+    monkeypatch.setattr(snapshot, "session_fingerprint", lambda s, exclude=(): "v1")
+    loads = []
+
+    def load(session):
+        loads.append(1)
+        session.loaded = True
+
+    key = (2024, 1, "R")
+    first = snapshot.attach_session(key, FakeSession(), load)
+    second = snapshot.attach_session(key, FakeSession(), load)
+    assert first.loaded and second.loaded
+    assert second is not first
+    assert len(loads) == 1
+
+    monkeypatch.setattr(snapshot, "session_fingerprint", lambda s, exclude=(): "v2")
+    snapshot.attach_session(key, FakeSession(), load)
+    assert len(loads) == 2
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "x.lock")
+    order = []
+
+    def worker():
+        with file_lock(path, poll=0.01):
+            order.append("second")
+
+    with file_lock(path):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(0.2)
+        order.append("first")
+    thread.join()
+    assert order == ["first", "second"]
+
+
+def test_partial_loads_are_not_snapshotted(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "telemetry_store", TelemetryStore(str(tmp_path)))
+    monkeypatch.setattr(snapshot, "session_fingerprint", lambda s, exclude=(): "v1")
+    loads = []
+
+    def load(session):
+        # Laps load; weather fails and is swallowed, as FastF1 does.
+        loads.append(1)
+        session._laps = "laps"
+
+    def loaded(session):
+        return hasattr(session, "_laps") and hasattr(session, "_weather_data")
+
+    key = (2024, 1, "R")
+    first = snapshot.attach_session(key, FakeSession(), load, loaded)
+    assert first._laps == "laps"
+    assert not os.path.exists(snapshot._snapshot_path(key))
+    snapshot.attach_session(key, FakeSession(), load, loaded)
+    assert len(loads) == 2
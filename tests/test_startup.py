@@ -0,0 +1,82 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Budget for importing the app on top of Dash and Flask themselves, which a
+# Dash server cannot avoid. The data stack (FastF1, pandas, plotly.express)
+# alone takes several times this.
+IMPORT_BUDGET_MS = float(os.environ.get("F1_IMPORT_BUDGET_MS", "250"))
+DEFERRED = ("fastf1", "pandas", "numpy", "plotly.express")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_import(code):
+    env = dict(os.environ, F1_WARMUP="0")
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def test_import_leaves_data_stack_unloaded():
+    result = run_import(f"import sys, app; print([m for m in {DEFERRED!r} if m in sys.modules])")
+    assert result.stdout.strip() == "[]"
+
+
+def test_import_creates_nothing_on_disk(tmp_path):
+    env = dict(os.environ, F1_WARMUP="0", PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, "-c", "import app"], cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_import_time_budget():
+    result = run_import("import dash, dash_bootstrap_components, flask; import app")
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app$", result.stderr, re.MULTILINE)
+    assert match, result.stderr[-2000:]
+    elapsed_ms = int(match.group(1)) / 1000
+    assert elapsed_ms <= IMPORT_BUDGET_MS, f"import app took {elapsed_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+def test_data_modules_load_on_first_use(tmp_path):
+    # A recorded session, replayed by a fresh app process running in
+    # ``tmp_path`` so that its caches land there.
+    from app import utils
+    from benchmarks.synthetic import build_session
+
+    class SyntheticSource(utils.DataSource):
+        def load(self, year, rnd, session_type):
+            return build_session(year, rnd, session_type, n_drivers=2, n_laps=3)
+
+    bundles = tmp_path / "bundles"
+    utils.RecordingSource(str(bundles), upstream=SyntheticSource()).load(2024, 1, "R")
+
+    code = (
+        "import json, sys, app\n"
+        f"before = [m for m in {DEFERRED!r} if m in sys.modules]\n"
+        "from app import callbacks\n"
+        "figure = callbacks.update_weather_plot('2024,1,R')\n"
+        "print(json.dumps({'before': before, 'after': [m for m in %r if m in sys.modules],\n"
+        "                  'cache': sys.modules['fastf1'].Cache._CACHE_DIR, 'plotted': bool(figure)}))\n"
+    ) % (DEFERRED,)
+    env = dict(os.environ, F1_WARMUP="0", F1_DATA_SOURCE="replay", F1_BUNDLE_DIR=str(bundles), PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True)
+    state = json.loads(result.stdout.strip().splitlines()[-1])
+    assert state["before"] == []
+    assert state["plotted"]
+    assert state["after"] == list(DEFERRED)
+    assert os.path.normpath(state["cache"]) == os.path.join("app", "cache_dir")
+    assert (tmp_path / "app" / "cache_dir").is_dir()
+
+
+def test_warmup_imports_callback_modules():
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, app; app.startup._warmup.join(); "
+         "print(all(m in sys.modules for m in app.startup.WARM_MODULES))"],
+        cwd=ROOT, env=dict(os.environ, F1_WARMUP="1"), capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip().endswith("True")
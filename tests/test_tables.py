@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from fastf1.core import Laps
+
+from app.tables import format_laptimes, lap_delta_records, sector_table_records
+
+
+def make_laps():
+    return Laps({
+        "Driver": ["VER", "NOR", "LEC", "VER", "NOR"],
+        "LapTime": pd.to_timedelta([91.234, 90.5, 92.0, 90.9, 140.0], unit="s"),
+        "Compound": ["SOFT", "SOFT", "MEDIUM", "SOFT", "HARD"],
+        "Sector1Time": pd.to_timedelta([30.1, 29.9, 30.5, 30.0, 50.0], unit="s"),
+        "Sector2Time": pd.to_timedelta([31.0, 31.2, 31.1, np.nan, 50.0], unit="s"),
+        "Sector3Time": pd.to_timedelta([30.134, 29.4, 30.4, 30.0, 40.0], unit="s"),
+    })
+
+
+def test_format_laptimes():
+    assert format_laptimes([90.5, 59.999, 61.0, np.nan]).tolist() == ["1:30.50", "0:60.00", "1:01.00", ""]
+
+
+def test_lap_delta_records_sorted_with_deltas():
+    records = lap_delta_records(make_laps())
+    # The 140 s lap is not a quick lap.
+    assert [r["Driver"] for r in records] == ["NOR", "VER", "VER", "LEC"]
+    assert records[0]["Delta"] == 0
+    assert records[1]["LapTime"] == "1:30.90"
+    assert abs(records[-1]["Delta"] - 1.5) < 1e-9
+    assert records[-1]["Compound"] == "MEDIUM"
+
+
+def test_sector_table_records_flags_best_sectors():
+    records = sector_table_records(make_laps(), ["VER", "NOR"])
+    assert [r["Driver"] for r in records] == ["VER", "NOR", "VER"]
+    nor = records[1]
+    assert nor["BestS1"] and nor["BestS3"] and not nor["BestS2"]
+    assert nor["DeltaS1"] == 0
+    assert records[0]["DeltaS2"] == 0 and records[0]["BestS2"]
+    assert records[2]["Sector2"] == ""
+    assert records[0]["DeltaS3"] == 0.734
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from fastf1.core import Laps, Telemetry
+
+from app.telemetry_store import TelemetryStore
+
+
+class FakeSession:
+    api_path = "/static/none/"
+
+    def __init__(self):
+        n = 400
+        session_time = pd.to_timedelta(np.arange(n) * 0.27, unit="s")
+        rng = np.random.default_rng(0)
+        self.car_data = {"1": Telemetry({
+            "SessionTime": session_time,
+            "Time": session_time,
+            "Speed": rng.uniform(80, 320, n),
+            "Throttle": rng.uniform(0, 100, n),
+            "Brake": rng.integers(0, 2, n).astype(bool),
+            "RPM": rng.uniform(8000, 12000, n),
+            "nGear": rng.integers(1, 9, n),
+            "DRS": rng.integers(0, 14, n),
+        })}
+        pos_time = pd.to_timedelta(np.arange(0, n * 0.27, 0.22), unit="s")
+        self._pos_data = self.pos_data = {"1": Telemetry({
+            "SessionTime": pos_time,
+            "X": np.cos(np.arange(len(pos_time)) / 50) * 1000,
+            "Y": np.sin(np.arange(len(pos_time)) / 50) * 1000,
+        })}
+        self.laps = Laps({
+            "Driver": ["VER", "VER", "VER"],
+            "DriverNumber": ["1", "1", "1"],
+            "LapNumber": [1.0, 2.0, 3.0],
+            "LapStartTime": pd.to_timedelta([0.1, 30.0, 70.0], unit="s"),
+            "Time": pd.to_timedelta([30.0, 70.0, 100.0], unit="s"),
+        })
+
+
+def test_lap_matches_fastf1_slicing(tmp_path):
+    session = FakeSession()
+    store = TelemetryStore(str(tmp_path))
+    key = (2024, 1, "Q")
+    assert store.get_lap(key, session, "VER", 2) is None
+
+    store.build_driver(key, session, "VER")
+    lap = store.get_lap(key, session, "VER", 2, ("Distance", "Speed"))
+
+    expected = session.car_data["1"].slice_by_time(
+        pd.Timedelta(30, unit="s"), pd.Timedelta(70, unit="s")
+    ).add_distance()
+    assert lap["Speed"].dtype == np.float32
+    np.testing.assert_allclose(lap["Speed"], expected["Speed"], rtol=1e-6)
+    np.testing.assert_allclose(lap["Distance"], expected["Distance"], rtol=1e-5)
+
+
+def test_store_is_rebuilt_when_fingerprint_changes(tmp_path, monkeypatch):
+    session = FakeSession()
+    store = TelemetryStore(str(tmp_path))
+    key = (2024, 1, "Q")
+    store.build_driver(key, session, "VER")
+    assert store.has_driver(key, session, "VER")
+
+    monkeypatch.setattr("app.telemetry_store.session_fingerprint", lambda s: "changed")
+    assert not store.has_driver(key, session, "VER")
+
+
+def test_lap_positions_with_resampled_channels(tmp_path):
+    session = FakeSession()
+    store = TelemetryStore(str(tmp_path))
+    key = (2024, 1, "Q")
+    store.build_driver(key, session, "VER")
+    pos = store.get_lap_positions(key, session, "VER", 2, ("Speed", "nGear"))
+
+    pos_time = session.pos_data["1"]["SessionTime"].dt.total_seconds()
+    in_lap = (pos_time >= 30) & (pos_time <= 70)
+    assert len(pos["X"]) == in_lap.sum()
+    np.testing.assert_allclose(pos["X"], session.pos_data["1"]["X"][in_lap], rtol=1e-5)
+    assert len(pos["Speed"]) == len(pos["X"])
+    assert set(np.unique(pos["nGear"])) <= set(range(1, 9))
@@ -0,0 +1,18 @@
+import numpy as np
+
+from app.typed_arrays import decode, encode, encode_channel
+
+
+def test_round_trip_and_compact_dtypes():
+    speed = np.array([0.0, 151.6, 330.2])
+    spec = encode_channel("Speed", speed)
+    assert spec["dtype"] == "u2"
+    assert decode(spec).tolist() == [0, 152, 330]
+
+    distance = np.array([0.0, 12.5, 5012.25])
+    assert decode(encode_channel("Distance", distance)).tolist() == distance.tolist()
+
+
+def test_integer_encoding_clips_and_drops_nan():
+    spec = encode([-3.0, np.nan, 300.0], "u1")
+    assert decode(spec).tolist() == [0, 0, 255]